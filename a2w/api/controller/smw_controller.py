@@ -1,9 +1,14 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from datetime import datetime
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 from a2w.api.model import SmwRequest, SmwResponse
 from a2w.utils import setup_logger
 from a2w.api.service import SmwService
+from a2w.api.service.job_manager import JobManager, JobQueueFull
 from a2w.smw.executors import WeatherReportWorkflow
 from a2w.smw.agents import (
     HistoryWeatherAgent,
@@ -19,20 +24,50 @@ from a2w.api.core.dependencies import (
     get_wr_suggest_async,
     get_wr_summary_async,
     get_wr_brief_async,
-    get_db_connector_async
+    get_db_connector_async,
+    get_job_manager_async
     )
 from a2w.api.middleware.db.sql_connector import SQLServerConnector
 
 logger = setup_logger("api.routes.smw")
 smw_router = APIRouter(prefix="/smw", tags=["SMW"])
 
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 可能是逗号分隔的多个标签或 *；代理压缩后会改成弱标签 W/"..."，按弱比较忽略 W/ 前缀"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
 @smw_router.get("/stations", response_model=SmwResponse, summary="获取指定时间范围内的自动站列表")
 async def get_stations(
+    request: Request,
+    response: Response,
     start_date: str = Query(..., description="开始日期 YYYY-MM-DD"),
     end_date: str = Query(..., description="结束日期 YYYY-MM-DD"),
     db: SQLServerConnector = Depends(get_db_connector_async)
-) -> SmwResponse:
+):
     try:
+        for value in (start_date, end_date):
+            datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"invalid date range {start_date} ~ {end_date}, expected YYYY-MM-DD")
+    try:
+        etag = db.availability_index.etag(start_date, end_date)
+        if etag is not None:
+            cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if _etag_matches(request.headers.get("if-none-match", ""), etag):
+                return Response(status_code=304, headers=cache_headers)
+            response.headers.update(cache_headers)
         stations = await db.get_available_stations(start_date, end_date)
         return SmwResponse(
             status="success",
@@ -47,6 +82,27 @@ async def get_stations(
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_detail)
 
+@smw_router.post("/stations/refresh", response_model=SmwResponse, summary="重新加载站点元数据索引")
+async def refresh_station_index(db: SQLServerConnector = Depends(get_db_connector_async)) -> SmwResponse:
+    # 只在这里加载一次(不经 invalidate 唤醒后台刷新，避免重复全表扫描)；加载完成前继续使用旧索引
+    loaded = await db.station_index.load()
+    return SmwResponse(
+        status="success" if loaded else "failed",
+        data=db.station_index.snapshot(),
+        error=None if loaded else "station index reload failed",
+        metadata={}
+    )
+
+@smw_router.post("/climatology/rebuild", response_model=SmwResponse, summary="重建历年同期/气候值预计算库")
+async def rebuild_climatology(full: bool = False, db: SQLServerConnector = Depends(get_db_connector_async)) -> SmwResponse:
+    result = await db.climatology.rebuild(full=full)
+    return SmwResponse(
+        status="failed" if result["failed"] else "success",
+        data={**result, **db.climatology.snapshot()},
+        error=f"climatology build failed for years {result['failed']}" if result["failed"] else None,
+        metadata={}
+    )
+
 # 气象呈阅件接口如下
 @smw_router.post("/WeatherReport", response_model=SmwResponse, summary="气象呈阅件服务总接口")
 async def execute_weather_report(request: SmwRequest, workflow: WeatherReportWorkflow = Depends(get_wr_async),) -> SmwResponse:
@@ -68,6 +124,67 @@ async def execute_weather_report(request: SmwRequest, workflow: WeatherReportWor
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_detail)
 
+def _sse_event(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+@smw_router.post("/WeatherReport/stream", summary="气象呈阅件服务总接口-分段流式输出(SSE)")
+async def stream_weather_report(request: SmwRequest,
+                                tokens: bool = Query(False, description="是否推送各环节 LLM 的增量输出"),
+                                workflow: WeatherReportWorkflow = Depends(get_wr_async)) -> StreamingResponse:
+    """每个环节(forecast/history/suggestion/summary/final_brief)完成后立即推送一条 section 事件，最后推送 done 事件"""
+    async def event_source():
+        async for event in SmwService.stream_weather_report(request=request, workflow=workflow, tokens=tokens):
+            yield _sse_event(event)
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@smw_router.websocket("/WeatherReport/ws")
+async def ws_weather_report(websocket: WebSocket, workflow: WeatherReportWorkflow = Depends(get_wr_async)):
+    """客户端连接后发送一条 SmwRequest JSON(可带 "tokens": true)，服务端逐条推送与 SSE 相同的事件，done 后关闭连接"""
+    await websocket.accept()
+    try:
+        payload = await websocket.receive_json()
+        tokens = bool(payload.pop("tokens", False))
+        request = SmwRequest(**payload)
+        async for event in SmwService.stream_weather_report(request=request, workflow=workflow, tokens=tokens):
+            await websocket.send_text(json.dumps(event, ensure_ascii=False, default=str))
+    except WebSocketDisconnect:
+        logger.info("WeatherReport websocket client disconnected")
+        return
+    except (ValidationError, ValueError, TypeError) as e:
+        await websocket.send_text(json.dumps({"event": "done", "status": "failed", "data": None, "error": str(e)}, ensure_ascii=False))
+    await websocket.close()
+
+@smw_router.post("/jobs", response_model=SmwResponse, summary="气象呈阅件服务-提交异步任务")
+async def submit_weather_report_job(request: SmwRequest, job_manager: JobManager = Depends(get_job_manager_async)) -> SmwResponse:
+    """任务入队后立即返回 job_id，通过 GET /smw/jobs/{job_id} 查询各环节进度与最终结果"""
+    if job_manager is None or not job_manager.config.enabled:
+        raise HTTPException(status_code=503, detail="job api is disabled")
+    try:
+        job_id = await SmwService.submit_weather_report_job(request=request, job_manager=job_manager)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return SmwResponse(
+        status="queued",
+        data={"job_id": job_id},
+        error=None,
+        metadata={}
+    )
+
+@smw_router.get("/jobs/{job_id}", response_model=SmwResponse, summary="气象呈阅件服务-查询异步任务")
+async def get_weather_report_job(job_id: str, job_manager: JobManager = Depends(get_job_manager_async)) -> SmwResponse:
+    if job_manager is None or not job_manager.config.enabled:
+        raise HTTPException(status_code=503, detail="job api is disabled")
+    job = await SmwService.get_weather_report_job(job_id=job_id, job_manager=job_manager)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job {job_id} not found")
+    return SmwResponse(
+        status=job["status"],
+        data={"job_id": job_id, "progress": job["progress"], "result": job["result"]},
+        error=job["error"],
+        metadata={key: job.get(key) for key in ("created_at", "started_at", "finished_at", "queue_size") if job.get(key) is not None}
+    )
+
 @smw_router.post("/WrHistory", response_model=SmwResponse, summary="气象呈阅件服务-前期实况单接口")
 async def ReTryWrHistory(request: SmwRequest, workflow: HistoryWeatherAgent = Depends(get_wr_history_async),) -> SmwResponse:
     try:
@@ -115,12 +232,14 @@ async def ReTryWrForecast(request: SmwRequest, workflow: ForecastWeatherAgent =
 @smw_router.post("/WrSuggest", response_model=SmwResponse, summary="气象呈阅件服务-关注与建议单接口")
 async def ReTryWrSuggest(request: SmwRequest,
                           forecast_workflow: ForecastWeatherAgent = Depends(get_wr_forecast_async),
-                          suggest_workflow: SuggestionAgent = Depends(get_wr_suggest_async),) -> SmwResponse:
+                          suggest_workflow: SuggestionAgent = Depends(get_wr_suggest_async),
+                          report_workflow: WeatherReportWorkflow = Depends(get_wr_async),) -> SmwResponse:
     try:
         result = await SmwService.wr_suggest(
             request=request,
             forecast_workflow = forecast_workflow,
-            suggest_workflow=suggest_workflow
+            suggest_workflow=suggest_workflow,
+            report_workflow=report_workflow
         )
         data = {"suggestion": result.get("response")}
         meta_data = {"think_content": result.get("think_response"), "sql_data": result.get("sql_data"), "recall_template": result.get("recall_template")}
@@ -141,13 +260,15 @@ async def ReTryWrSuggest(request: SmwRequest,
 async def ReTryWrSummary(request: SmwRequest,
                           forecast_workflow: ForecastWeatherAgent = Depends(get_wr_forecast_async),
                           suggest_workflow: SuggestionAgent = Depends(get_wr_suggest_async),
-                          summary_workflow: SummaryAgent = Depends(get_wr_summary_async),) -> SmwResponse:
+                          summary_workflow: SummaryAgent = Depends(get_wr_summary_async),
+                          report_workflow: WeatherReportWorkflow = Depends(get_wr_async),) -> SmwResponse:
     try:
         result = await SmwService.wr_summary(
             request=request,
             forecast_workflow = forecast_workflow,
             suggest_workflow=suggest_workflow,
-            summary_workflow=summary_workflow
+            summary_workflow=summary_workflow,
+            report_workflow=report_workflow
         )
         data = {"summary": result.get("response")}
         meta_data = {"think_content": result.get("think_response"), "sql_data": result.get("sql_data"), "recall_template": result.get("recall_template")}
@@ -169,14 +290,16 @@ async def ReTryWrBrief(request: SmwRequest,
                           forecast_workflow: ForecastWeatherAgent = Depends(get_wr_forecast_async),
                           suggest_workflow: SuggestionAgent = Depends(get_wr_suggest_async),
                           summary_workflow: SummaryAgent = Depends(get_wr_summary_async),
-                          brief_workflow: BriefAgent = Depends(get_wr_brief_async)) -> SmwResponse:
+                          brief_workflow: BriefAgent = Depends(get_wr_brief_async),
+                          report_workflow: WeatherReportWorkflow = Depends(get_wr_async)) -> SmwResponse:
     try:
         result = await SmwService.wr_brief(
             request=request,
             forecast_workflow = forecast_workflow,
             suggest_workflow=suggest_workflow,
             summary_workflow=summary_workflow,
-            brief_workflow=brief_workflow
+            brief_workflow=brief_workflow,
+            report_workflow=report_workflow
         )
         data = {"final_brief": result.get("response")}
         meta_data = {"think_content": result.get("think_response"), "sql_data": result.get("sql_data"), "recall_template": result.get("recall_template")}
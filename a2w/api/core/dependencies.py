@@ -7,6 +7,13 @@ from a2w.configs.smw_config import SmwConfig
 from a2w.smw.executors import WeatherReportWorkflow
 from a2w.smw.agents import HistoryWeatherAgent, ForecastWeatherAgent, SuggestionAgent, SummaryAgent, BriefAgent
 from a2w.api.middleware.db.sql_connector import SQLServerConnector
+from a2w.api.middleware.db.local_connector import SQLiteConnector
+from a2w.api.middleware.db.pool import PoolConfig
+from a2w.api.middleware.db.result_cache import ResultCacheConfig
+from a2w.api.middleware.db.rollup import RollupConfig
+from a2w.api.middleware.db.climatology import ClimatologyConfig
+from a2w.smw.funcalls.db_function_call import set_sqlserver_exe
+from a2w.api.service.job_manager import JobManager, JobConfig
 from a2w.configs import GlobalConfig
 
 class WorkflowFactory(ABC):
@@ -30,55 +37,76 @@ class ProductionWorkflowFactory(WorkflowFactory):
         )
         self.db: Optional[SQLServerConnector] = None
         self.smw_config = SmwConfig()
+        # 进程内共享的工作流与 agent(无请求级状态)，在 lifespan 启动时构建一次
+        self.weather_report_workflow: Optional[WeatherReportWorkflow] = None
+        self.job_manager: Optional[JobManager] = None
 
     async def initialize(self):
         if self.db is None:
-            self.db = SQLServerConnector(
-                self.config.get("db_host"), self.config.get("db_port"), self.config.get("db_name"), self.config.get("db_username"), self.config.get("db_password")
+            common = dict(
+                pool_config=PoolConfig.from_global_config(self.config),
+                station_index_refresh=self.config.get("station_index_refresh_interval"),
+                availability_refresh=self.config.get("station_availability_refresh_interval"),
+                cache_config=ResultCacheConfig.from_global_config(self.config),
+                rollup_config=RollupConfig.from_global_config(self.config),
+                climatology_config=ClimatologyConfig.from_global_config(self.config)
             )
+            if self.config.get("db_backend") == "sqlite":
+                self.db = SQLiteConnector(self.config.get("local_db_path"), **common)
+            else:
+                self.db = SQLServerConnector(
+                    self.config.get("db_host"), self.config.get("db_port"), self.config.get("db_name"), self.config.get("db_username"), self.config.get("db_password"),
+                    **common
+                )
             await self.db.connect()
-
-    def create_weather_report_workflow(self) -> WeatherReportWorkflow:
-        return WeatherReportWorkflow(
+            await self.db.station_index.load()
+            self.db.station_index.start_refresh()
+            self.db.availability_index.start_refresh()  # 后台构建, 构建完成前 /smw/stations 走数据库查询
+            self.db.rollups.start_refresh()  # 后台构建/增量维护汇总表, 就绪前 half/daily 查询仍走小时表
+            self.db.climatology.start_refresh()  # 后台补建缺失年份的气候库, 未覆盖的年份历年同期查询仍走年表
+            set_sqlserver_exe(db_instance=self.db)
+        if self.weather_report_workflow is None:
+            self.build_agents()
+            await self.weather_report_workflow.open_checkpoint()
+        if self.job_manager is None:
+            self.job_manager = JobManager(self.weather_report_workflow, JobConfig.from_global_config(self.config))
+            await self.job_manager.start()  # 重新入队上次未完成的任务
+
+    def build_agents(self) -> None:
+        """
+        构建一次工作流(含各环节 agent、编译好的 LangGraph 图、模板文件)，所有请求共享；
+        单环节接口直接复用工作流里的 agent，请求级数据只存在于每次运行的图状态中
+        """
+        self.weather_report_workflow = WeatherReportWorkflow(
             llm = self.llm_instance,
             db_connector=self.db,
             config=self.smw_config
         )
+        # 提前编译前期实况用的 PECW 图，避免首个请求承担编译开销
+        _ = self.weather_report_workflow.history_agent.pecw_agent
+
+    def create_weather_report_workflow(self) -> WeatherReportWorkflow:
+        return self.weather_report_workflow
 
     def create_wr_history(self) -> HistoryWeatherAgent:
-        return HistoryWeatherAgent(
-            llm = self.llm_instance,
-            db_connector=self.db,
-            config=self.smw_config
-        )
+        return self.weather_report_workflow.history_agent
     def create_wr_forecast(self) -> ForecastWeatherAgent:
-        return ForecastWeatherAgent(
-            llm = self.llm_instance,
-            db_connector=self.db,
-            config=self.smw_config
-        )
+        return self.weather_report_workflow.forecast_agent
     def create_wr_suggest(self) -> SuggestionAgent:
-        return SuggestionAgent(
-            llm = self.llm_instance,
-            embedding_recall_manager=None,
-            config=self.smw_config
-        )
+        return self.weather_report_workflow.suggestion_agent
     def create_wr_summary(self) -> SummaryAgent:
-        return SummaryAgent(
-            llm = self.llm_instance,
-            embedding_recall_manager=None,
-            config=self.smw_config
-        )
+        return self.weather_report_workflow.summary_agent
     def create_wr_brief(self) -> BriefAgent:
-        return BriefAgent(
-            llm = self.llm_instance,
-            config=self.smw_config
-        )
+        return self.weather_report_workflow.brief_agent
     def create_powerful_weather_report_workflow(self) -> WeatherReportWorkflow:
         raise NotImplementedError
     def create_nl2sql_workflow(self) -> WeatherReportWorkflow:
         raise NotImplementedError
     async def close(self):
+        if self.job_manager is not None:
+            await self.job_manager.stop()
+        if self.weather_report_workflow is not None:
+            await self.weather_report_workflow.close_checkpoint()
         await self.db.close()
     
 _factory: Optional[WorkflowFactory] = None
@@ -102,6 +130,10 @@ async def get_wr_async() -> WeatherReportWorkflow:
     factory = await get_factory()
     return factory.create_weather_report_workflow()
 
+async def get_job_manager_async() -> JobManager:
+    factory = await get_factory()
+    return factory.job_manager
+
 async def get_wr_history_async() -> HistoryWeatherAgent:
     factory = await get_factory()
     return factory.create_wr_history()
@@ -18,9 +18,10 @@ os.environ['NO_PROXY'] = '*'
 os.environ['no_proxy'] = '*'
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from a2w.utils import setup_logger
-from a2w.api.core.dependencies import get_config, get_factory, close_factory
+from a2w.api.core.dependencies import get_config, get_factory, close_factory, get_db_connector_async
 from a2w.api.controller.smw_controller import smw_router
 from a2w.api.middleware.exception.exception_handler import register_exception_handlers
+from a2w.smw.agents.pecw.rule_repair import REPAIR_STATS
 
 logger = setup_logger("Agent-2-Weather")
 
@@ -76,6 +77,15 @@ def create_app() -> FastAPI:
             "config_valid": config.validate()
         }
 
+    @app.get("/metrics", tags=["Metrics"])
+    async def metrics():
+        db = await get_db_connector_async()
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "db": db.metrics() if db else {},
+            "pecw_recovery": REPAIR_STATS.snapshot()
+        }
+
     return app
 
 
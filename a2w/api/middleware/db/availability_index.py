@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+import hashlib
+import re
+import time
+from typing import Dict, List, Optional, Set, TYPE_CHECKING
+
+from a2w.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from .base_db import DBConnector
+
+DAY_TABLE_PREFIX = "automatic_station_his_day_data_"
+_DAY_TABLE_PATTERN = re.compile(rf"^{DAY_TABLE_PREFIX}(\d{{4}})$")
+
+LIST_DAY_TABLES_SQL: str = f"""
+SELECT table_name
+FROM information_schema.tables
+WHERE table_name LIKE '{DAY_TABLE_PREFIX}%'
+"""
+
+STATION_MONTHS_SQL: str = """
+SELECT station_name, MONTH(observation_time) AS month
+FROM {table_name}
+WHERE station_name IS NOT NULL
+GROUP BY station_name, MONTH(observation_time)
+"""
+
+
+def month_mask(start_date: str, end_date: str) -> int:
+    """日期范围(忽略年份)覆盖的月份位图, bit(m-1) 表示 m 月; 跨年范围如 12~1 月按环绕处理"""
+    start_month = datetime.datetime.strptime(start_date, "%Y-%m-%d").month
+    end_month = datetime.datetime.strptime(end_date, "%Y-%m-%d").month
+    if start_month <= end_month:
+        months = range(start_month, end_month + 1)
+    else:
+        months = list(range(start_month, 13)) + list(range(1, end_month + 1))
+    mask = 0
+    for m in months:
+        mask |= 1 << (m - 1)
+    return mask
+
+
+class StationAvailabilityIndex:
+    """
+    站点 x 月份 可用性位图: 每个站点一个 12 位整数，记录它在任意年份日表中出现过的月份。
+    启动时后台从全部年份日表构建一次；之后定期只扫描新出现的年份表和当年表(仍在写入)做增量合并。
+    /smw/stations 直接在内存中按月份位图求交，并用 version 生成 ETag 供浏览器缓存
+    """
+    def __init__(self, db: "DBConnector", refresh_interval: float = 3600.0, concurrency: int = 4):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.concurrency = concurrency
+        self.logger = setup_logger(name="StationAvailabilityIndex")
+        self._station_months: Dict[str, int] = {}
+        self._scanned_tables: Set[str] = set()
+        self._answers: Dict[int, List[str]] = {}
+        self.version: Optional[str] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    async def _list_tables(self) -> Dict[str, int]:
+        rows = await self.db.execute_query(LIST_DAY_TABLES_SQL, bypass_cache=True)
+        if rows is None:
+            raise RuntimeError("list day tables failed")
+        tables = {}
+        for row in rows:
+            name = row.get("table_name") or row.get("TABLE_NAME")
+            match = _DAY_TABLE_PATTERN.match(name or "")
+            if match:
+                tables[name] = int(match.group(1))
+        return tables
+
+    async def _scan_table(self, table_name: str, semaphore: asyncio.Semaphore) -> Dict[str, int]:
+        async with semaphore:
+            rows = await self.db.execute_query(STATION_MONTHS_SQL.format(table_name=table_name), bypass_cache=True)
+        if rows is None:
+            raise RuntimeError(f"scan {table_name} failed")
+        months: Dict[str, int] = {}
+        for row in rows:
+            station, month = row.get("station_name"), row.get("month")
+            if station and month:
+                months[station] = months.get(station, 0) | (1 << (int(month) - 1))
+        return months
+
+    async def refresh(self) -> bool:
+        """首次调用全量构建；之后只扫描新年份表与当年表"""
+        async with self._lock:
+            start = time.perf_counter()
+            try:
+                tables = await self._list_tables()
+                current_year = datetime.date.today().year
+                pending = [t for t, year in tables.items() if t not in self._scanned_tables or year >= current_year]
+                if not pending and self.loaded:
+                    return True
+                semaphore = asyncio.Semaphore(self.concurrency)
+                results = await asyncio.gather(*[self._scan_table(t, semaphore) for t in pending])
+            except Exception as e:
+                self.logger.error(f"Station availability refresh failed, keep the previous index: {e}")
+                return False
+            station_months = dict(self._station_months)
+            for months in results:
+                for station, mask in months.items():
+                    station_months[station] = station_months.get(station, 0) | mask
+            changed = station_months != self._station_months or not self.loaded
+            self._station_months = station_months
+            self._scanned_tables.update(pending)
+            if changed:
+                self._answers = {}
+                digest = hashlib.sha1()
+                for station in sorted(station_months):
+                    digest.update(f"{station}:{station_months[station]};".encode("utf-8"))
+                self.version = digest.hexdigest()[:16]
+            self.logger.info(f"Station availability index refreshed: scanned {len(pending)} tables, "
+                             f"{len(station_months)} stations, {time.perf_counter() - start:.2f}s")
+            return True
+
+    def start_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await self.refresh()
+            if self.refresh_interval <= 0:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def stations_for(self, start_date: str, end_date: str) -> List[str]:
+        return self.stations_for_mask(month_mask(start_date, end_date))
+
+    def stations_for_mask(self, mask: int) -> List[str]:
+        """返回副本: 调用方修改结果不会污染按月份位图缓存的答案"""
+        answer = self._answers.get(mask)
+        if answer is None:
+            answer = sorted(s for s, months in self._station_months.items() if months & mask)
+            self._answers[mask] = answer
+        return list(answer)
+
+    def etag(self, start_date: str, end_date: str) -> Optional[str]:
+        if not self.loaded:
+            return None
+        return f'"{self.version}-{month_mask(start_date, end_date):03x}"'
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "loaded": self.loaded,
+            "version": self.version,
+            "stations": len(self._station_months),
+            "scanned_tables": len(self._scanned_tables),
+        }
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Any, List, Dict, Optional
+from typing import Any, AsyncIterator, List, Dict, Optional, Sequence, Tuple
 import logging
 from abc import ABC, abstractmethod
 
@@ -13,8 +13,13 @@ class DBConnector(ABC):
         raise NotImplementedError
     
     @abstractmethod
-    async def execute_query(self, sql: str) -> Optional[List[Dict[str, Any]]]:
+    async def execute_query(self, sql: str, params: Optional[Sequence[Any]] = None,
+                            bypass_cache: bool = False) -> Optional[List[Dict[str, Any]]]:
         raise NotImplementedError
+
+    async def execute_query_batch(self, statements: Sequence[Tuple[str, Optional[Sequence[Any]]]]) -> List[Optional[List[Dict[str, Any]]]]:
+        """多条查询按顺序返回各自结果；默认逐条执行，支持多结果集批次的连接器可合并为一次往返"""
+        return [await self.execute_query(sql, params) for sql, params in statements]
     
     @abstractmethod
     async def query_weather_metrics(self, regions: str, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
@@ -31,6 +36,16 @@ class DBConnector(ABC):
         """查询小时表数据"""
         raise NotImplementedError
     
+    async def stream_hourly_weather_from_hourTable(self, regions: List[str], start_date: str, end_date: str,
+                                                   batch_size: int = 5000, normalize_nulls: bool = True) -> AsyncIterator[List[Dict[str, Any]]]:
+        """按批次流式返回小时表逐小时数据(含区县)"""
+        raise NotImplementedError
+        yield
+
     async def query_cnty_by_regions(self, regions: List[str]) -> List[str]:
         """根据 station_name 查询对应的区县"""
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def metrics(self) -> Dict[str, Any]:
+        """连接器运行指标(连接池等)，供 /metrics 接口展示"""
+        return {}
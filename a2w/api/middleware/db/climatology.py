@@ -0,0 +1,255 @@
+import asyncio
+import datetime
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, TYPE_CHECKING
+
+from .dialect import SQLITE, SQLSERVER
+from a2w.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from .sql_connector import SQLServerConnector
+
+DAY_TABLE_PREFIX = "automatic_station_his_day_data_"
+_DAY_TABLE_PATTERN = re.compile(rf"^{DAY_TABLE_PREFIX}(\d{{4}})$")
+CLIMATOLOGY_TABLE = "automatic_station_climatology_day"
+
+LIST_DAY_TABLES_SQL: str = f"""
+SELECT table_name
+FROM information_schema.tables
+WHERE table_name LIKE '{DAY_TABLE_PREFIX}%'
+"""
+
+# 区县 x 日 的可加部分聚合(SUM/COUNT/MAX/MIN)，任意年份集合、任意日期窗口上的 AVG/SUM/极值都能由它精确还原；
+# month_day = MM * 100 + DD，用于"历年同期"按月日筛选
+CLIMATOLOGY_COLUMNS: List[str] = [
+    "city", "cnty", "obs_date", "year", "month_day", "station_count",
+    "tem_avg_sum", "tem_avg_cnt", "tem_max", "tem_min",
+    "precip_sum", "precip_cnt", "pre_max_1h",
+    "rhu_avg_sum", "rhu_avg_cnt", "rhu_min",
+    "win_s_2mi_avg_sum", "win_s_2mi_avg_cnt", "win_s_max",
+]
+
+_DAY_KEY = "CAST(observation_time AS date), YEAR(observation_time), MONTH(observation_time) * 100 + DAY(observation_time)"
+
+CLIMATOLOGY_INSERT_SQL: str = f"""
+INSERT INTO {CLIMATOLOGY_TABLE} ({", ".join(CLIMATOLOGY_COLUMNS)})
+SELECT
+    city,
+    cnty,
+    {_DAY_KEY},
+    COUNT(DISTINCT station_name),
+    SUM(tem_avg), COUNT(tem_avg), MAX(tem_max), MIN(tem_min),
+    SUM(COALESCE(pre_time_2020, 0) + COALESCE(pre_time_0808, 0)), COUNT(*), MAX(pre_max_1h),
+    SUM(rhu_avg), COUNT(rhu_avg), MIN(rhu_min),
+    SUM(win_s_2mi_avg), COUNT(win_s_2mi_avg), MAX(win_s_max)
+FROM {{table_name}}
+GROUP BY city, cnty, {_DAY_KEY}
+"""
+
+
+def climatology_ddl(dialect: str) -> List[str]:
+    """建表 + (month_day, year) / obs_date 两个索引，已存在则跳过"""
+    sums = ["tem_avg_sum", "precip_sum", "rhu_avg_sum", "win_s_2mi_avg_sum"]
+    counts = ["station_count", "tem_avg_cnt", "precip_cnt", "rhu_avg_cnt", "win_s_2mi_avg_cnt"]
+    indexes = [(f"IX_{CLIMATOLOGY_TABLE}_md_year", "month_day, year"), (f"IX_{CLIMATOLOGY_TABLE}_date", "obs_date")]
+    if dialect == SQLSERVER:
+        def column_type(name: str) -> str:
+            if name in ("city", "cnty"):
+                return "NVARCHAR(64) NULL"
+            if name == "obs_date":
+                return "DATE NOT NULL"
+            if name in ("year", "month_day"):
+                return "INT NOT NULL"
+            return "INT NULL" if name in counts else "FLOAT NULL"
+        columns = ", ".join(f"{c} {column_type(c)}" for c in CLIMATOLOGY_COLUMNS)
+        statements = [f"IF OBJECT_ID(N'{CLIMATOLOGY_TABLE}', N'U') IS NULL CREATE TABLE {CLIMATOLOGY_TABLE} ({columns})"]
+        statements += [f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{name}') "
+                       f"CREATE INDEX {name} ON {CLIMATOLOGY_TABLE} ({key})" for name, key in indexes]
+        return statements
+    if dialect == SQLITE:
+        def column_type(name: str) -> str:
+            if name in ("city", "cnty", "obs_date"):
+                return "TEXT"
+            return "INTEGER" if name in counts or name in ("year", "month_day") else "REAL"
+        columns = ", ".join(f"{c} {column_type(c)}" for c in CLIMATOLOGY_COLUMNS)
+        statements = [f"CREATE TABLE IF NOT EXISTS {CLIMATOLOGY_TABLE} ({columns})"]
+        statements += [f"CREATE INDEX IF NOT EXISTS {name} ON {CLIMATOLOGY_TABLE} ({key})" for name, key in indexes]
+        return statements
+    raise ValueError(f"Unsupported SQL dialect: {dialect}")
+
+
+@dataclass
+class ClimatologyConfig:
+    enabled: bool = True
+    first_year: int = 1961            # 早于该年份的日表不进入气候库
+    refresh_interval: float = 86400.0  # 秒, 定期补建新结束的年份; <=0 表示只在启动时补建一次
+    rebuild_concurrency: int = 2      # 同时重建的年份数(SQLite 固定为 1)
+
+    @classmethod
+    def from_global_config(cls, config) -> "ClimatologyConfig":
+        return cls(
+            enabled=bool(config.get("climatology_enabled", cls.enabled)),
+            first_year=int(config.get("climatology_first_year", cls.first_year)),
+            refresh_interval=float(config.get("climatology_refresh_interval", cls.refresh_interval)),
+            rebuild_concurrency=int(config.get("climatology_rebuild_concurrency", cls.rebuild_concurrency)),
+        )
+
+
+class ClimatologyStore:
+    """
+    历年同期/气候值查询用的预计算库 automatic_station_climatology_day:
+        - 每个已结束年份的日表汇总成 区县 x 日 一行(可加的 SUM/COUNT/MAX/MIN)，按 (month_day, year)、obs_date 建索引
+        - query_comparison_data(climatology) / query_historical_same_period 读这一张表，代替对 N 张年表的 UNION 全表扫描
+        - 当年日表仍在写入，不进入气候库，相关部分继续查原表
+    重建在数据库端完成(每年一个事务内 DELETE + INSERT ... SELECT)；重建后清空结果缓存
+    """
+    def __init__(self, db: "SQLServerConnector", config: Optional[ClimatologyConfig] = None):
+        self.db = db
+        config = config or ClimatologyConfig()
+        self.enabled = config.enabled
+        self.first_year = config.first_year
+        self.refresh_interval = config.refresh_interval
+        self.rebuild_concurrency = max(1, config.rebuild_concurrency)
+        self.logger = setup_logger(name="ClimatologyStore")
+        self.years: Set[int] = set()        # 已构建的年份
+        self.table_years: Set[int] = set()  # 库中存在日表的年份
+        self.last_build_at: Optional[float] = None
+        self.last_build_seconds: Optional[float] = None
+        self.routed = 0
+        self.fallbacks = 0
+        self._tables_ready = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and bool(self.years)
+
+    async def ensure_table(self) -> None:
+        if not self._tables_ready:
+            await self.db.execute_write([(sql, None) for sql in climatology_ddl(self.db.dialect)])
+            self._tables_ready = True
+
+    async def load(self) -> bool:
+        """读取已构建的年份与现有日表年份，不做重建"""
+        if not self.enabled:
+            return False
+        try:
+            await self.ensure_table()
+            rows, _ = await self.db._fetch(f"SELECT DISTINCT year FROM {CLIMATOLOGY_TABLE}", bypass_cache=True)
+            self.years = {int(row[0]) for row in rows}
+            self.table_years = await self._list_table_years()
+        except Exception as e:
+            self.logger.error(f"Climatology store load failed: {e}")
+            return False
+        return True
+
+    async def _list_table_years(self) -> Set[int]:
+        rows, _ = await self.db._fetch(LIST_DAY_TABLES_SQL, bypass_cache=True)
+        years = set()
+        for row in rows:
+            match = _DAY_TABLE_PATTERN.match(row[0] or "")
+            if match:
+                years.add(int(match.group(1)))
+        return years
+
+    def _closed_years(self) -> List[int]:
+        current_year = datetime.date.today().year
+        return sorted(y for y in self.table_years if self.first_year <= y < current_year)
+
+    async def _build_year(self, year: int, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await self.db.execute_write([
+                (f"DELETE FROM {CLIMATOLOGY_TABLE} WHERE year = ?", [year]),
+                (CLIMATOLOGY_INSERT_SQL.format(table_name=f"{DAY_TABLE_PREFIX}{year}"), None),
+            ])
+            self.years.add(year)
+            self.logger.info(f"Climatology year {year} built in {time.perf_counter() - start:.2f}s")
+
+    async def rebuild(self, years: Optional[Iterable[int]] = None, full: bool = False) -> Dict[str, Any]:
+        """
+        years 为空时: full=True 重建全部已结束年份(日表有订正时使用)，否则只补建缺失的年份。
+        单个年份失败不影响其他年份，失败年份查询时回退到原表
+        """
+        if not self.enabled:
+            return {"built": [], "failed": []}
+        async with self._lock:
+            start = time.perf_counter()
+            await self.ensure_table()
+            self.table_years = await self._list_table_years()
+            if years is not None:
+                targets = sorted(y for y in set(years) if y in self.table_years)
+            elif full:
+                targets = self._closed_years()
+            else:
+                targets = [y for y in self._closed_years() if y not in self.years]
+            if not targets:
+                return {"built": [], "failed": []}
+
+            for year in targets:
+                self.years.discard(year)
+            concurrency = 1 if self.db.dialect == SQLITE else self.rebuild_concurrency
+            semaphore = asyncio.Semaphore(concurrency)
+            results = await asyncio.gather(*(self._build_year(y, semaphore) for y in targets), return_exceptions=True)
+            failed = []
+            for year, result in zip(targets, results):
+                if isinstance(result, Exception):
+                    self.logger.error(f"Climatology year {year} build failed: {result}")
+                    failed.append(year)
+            self.db.invalidate_cache()
+            self.last_build_at = time.time()
+            self.last_build_seconds = time.perf_counter() - start
+            built = [y for y in targets if y not in failed]
+            self.logger.info(f"Climatology store rebuilt {len(built)} years ({len(failed)} failed) "
+                             f"in {self.last_build_seconds:.2f}s")
+            return {"built": built, "failed": failed}
+
+    def covers(self, years: Iterable[int]) -> bool:
+        """
+        这些年份都可以从气候库读取: 已构建，或者该年份没有日表(原 UNION 查询会直接报错，气候库中按无数据处理)。
+        当年及构建失败的年份返回 False，由调用方回退到原表
+        """
+        if not self.ready:
+            return False
+        current_year = datetime.date.today().year
+        return all(y in self.years or (y not in self.table_years and y < current_year) for y in years)
+
+    def start_refresh(self) -> None:
+        if self.enabled and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                if await self.load():
+                    await self.rebuild()
+            except Exception as e:
+                self.logger.error(f"Climatology refresh failed: {e}")
+            if self.refresh_interval <= 0:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "years": len(self.years),
+            "first_year": min(self.years) if self.years else None,
+            "last_year": max(self.years) if self.years else None,
+            "last_build_at": self.last_build_at,
+            "last_build_seconds": self.last_build_seconds,
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,61 @@
+import re
+from typing import Any, Optional, Sequence
+
+SQLSERVER = "sqlserver"
+SQLITE = "sqlite"
+
+_CAST_DATE = re.compile(r"CAST\(\s*([\w.]+)\s+AS\s+date\s*\)", re.IGNORECASE)
+_DATEPART_HOUR = re.compile(r"DATEPART\(\s*hour\s*,\s*([\w.]+)\s*\)", re.IGNORECASE)
+_DATE_PART_FUNCS = re.compile(r"\b(YEAR|MONTH|DAY)\(\s*([\w.]+)\s*\)", re.IGNORECASE)
+_INFORMATION_SCHEMA_TABLES = re.compile(r"\binformation_schema\.tables\b", re.IGNORECASE)
+_SELECT_TOP = re.compile(r"^(\s*(?:--[^\n]*\n\s*)*SELECT\s+(?:DISTINCT\s+)?)TOP\s*\(?\s*(\d+)\s*\)?\s+", re.IGNORECASE)
+_TRAILING_SEMICOLON = re.compile(r";\s*$")
+# funcall 在不按城市分组时生成 GROUP BY 1(整体聚合)，SQLite 会把 1 当作列序号
+_GROUP_BY_CONSTANT = re.compile(r"\bGROUP\s+BY\s+1\b(?=\s*(?:$|\)|;|ORDER\b))", re.IGNORECASE)
+# observation_time 与纯日期字面量比较: SQL Server 把 '2024-01-31' 隐式转换为 2024-01-31 00:00:00
+_DATE_LITERAL = r"'(\d{4}-\d{2}-\d{2})'"
+_BETWEEN_DATES = re.compile(rf"(observation_time\s+BETWEEN\s+){_DATE_LITERAL}(\s+AND\s+){_DATE_LITERAL}", re.IGNORECASE)
+_COMPARE_DATE = re.compile(rf"(observation_time\s*(?:>=|<=|<>|=|>|<)\s*){_DATE_LITERAL}", re.IGNORECASE)
+_DATETIME_PARAM = re.compile(r"^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(?:\.\d+)?$")
+
+_STRFTIME = {"YEAR": "%Y", "MONTH": "%m", "DAY": "%d"}
+
+
+def to_sqlite(sql: str) -> str:
+    """
+    把本仓库用到的 SQL Server 写法改写成 SQLite 可执行的等价形式(只覆盖 SQL_TEMPLATE 与 funcall 中出现的构造):
+        CAST(x AS date) / DATEPART(hour, x) / YEAR() MONTH() DAY() / information_schema.tables / SELECT TOP n / GROUP BY 1
+    SQLite 中 observation_time 以 'YYYY-MM-DD HH:MM:SS' 文本存储，纯日期字面量补齐为当天 00:00:00，保持 SQL Server 的比较语义
+    """
+    sql = _CAST_DATE.sub(r"DATE(\1)", sql)
+    sql = _DATEPART_HOUR.sub(r"CAST(strftime('%H', \1) AS INTEGER)", sql)
+    sql = _DATE_PART_FUNCS.sub(lambda m: f"CAST(strftime('{_STRFTIME[m.group(1).upper()]}', {m.group(2)}) AS INTEGER)", sql)
+    sql = _GROUP_BY_CONSTANT.sub("", sql)
+    sql = _INFORMATION_SCHEMA_TABLES.sub("(SELECT name AS table_name FROM sqlite_master WHERE type = 'table')", sql)
+    sql = _BETWEEN_DATES.sub(r"\1'\2 00:00:00'\3'\4 00:00:00'", sql)
+    sql = _COMPARE_DATE.sub(r"\1'\2 00:00:00'", sql)
+    top = _SELECT_TOP.match(sql)
+    if top:
+        sql = _TRAILING_SEMICOLON.sub("", top.group(1) + sql[top.end():]).rstrip()
+        sql = f"{sql}\nLIMIT {top.group(2)}"
+    return sql
+
+
+def normalize_param(value: Any) -> Any:
+    """
+    时间参数统一成 'YYYY-MM-DD HH:MM:SS'(去掉毫秒)，与本地库的存储格式按字符串比较时结果一致；
+    纯日期参数原样保留(用于与 DATE 列比较，如汇总表的 obs_date)
+    """
+    if isinstance(value, str):
+        match = _DATETIME_PARAM.match(value)
+        if match:
+            return f"{match.group(1)} {match.group(2)}"
+    return value
+
+
+def translate(sql: str, params: Optional[Sequence[Any]] = None, dialect: str = SQLSERVER):
+    if dialect == SQLSERVER:
+        return sql, params
+    if dialect == SQLITE:
+        return to_sqlite(sql), [normalize_param(p) for p in params] if params else params
+    raise ValueError(f"Unsupported SQL dialect: {dialect}")
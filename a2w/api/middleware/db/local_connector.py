@@ -0,0 +1,273 @@
+import asyncio
+import csv
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .climatology import ClimatologyConfig
+from .dialect import SQLITE, translate
+from .rollup import RollupConfig
+from .pool import PoolConfig
+from .result_cache import ResultCacheConfig
+from .sql_connector import SQLServerConnector
+from a2w.utils.logger import setup_logger
+
+DAY_TABLE_PREFIX = "automatic_station_his_day_data_"
+HOUR_TABLE_NAME = "automatic_station_data"
+
+# 与线上库一致的列(只包含代码中实际读取的列)，observation_time 以 'YYYY-MM-DD HH:MM:SS' 文本存储
+DAY_TABLE_COLUMNS: List[Tuple[str, str]] = [
+    ("station_name", "TEXT"), ("city", "TEXT"), ("cnty", "TEXT"), ("observation_time", "TEXT"), ("year", "INTEGER"),
+    ("tem_avg", "REAL"), ("tem_max", "REAL"), ("tem_min", "REAL"), ("tem_max_otime", "TEXT"), ("tem_min_otime", "TEXT"),
+    ("rain", "REAL"), ("pre_max_1h", "REAL"), ("pre_max_1h_otime", "TEXT"),
+    ("pre_time_2008", "REAL"), ("pre_time_0820", "REAL"), ("pre_time_2020", "REAL"), ("pre_time_0808", "REAL"),
+    ("win_s_max", "REAL"), ("win_s_max_otime", "TEXT"), ("win_s_inst_max", "REAL"), ("win_s_inst_max_otime", "TEXT"),
+    ("win_s_2mi_avg", "REAL"), ("win_s_10mi_avg", "REAL"), ("win_d_s_max", "REAL"), ("win_d_inst_max", "REAL"),
+    ("win_d_avg_2mi_c", "TEXT"),
+    ("vis_min", "REAL"), ("vis_min_otime", "TEXT"),
+    ("rhu_avg", "REAL"), ("rhu_min", "REAL"), ("rhu_min_otime", "TEXT"),
+    ("prs_avg", "REAL"), ("prs_max", "REAL"), ("prs_max_otime", "TEXT"), ("prs_min", "REAL"), ("prs_min_otime", "TEXT"),
+    ("prs_sea_avg", "REAL"),
+    ("clo_cov_avg", "REAL"), ("clo_cov_low_avg", "REAL"),
+    ("gst_avg", "REAL"), ("gst_max", "REAL"), ("gst_min", "REAL"),
+    ("fog", "TEXT"), ("snow", "TEXT"), ("hail", "TEXT"), ("thunder", "TEXT"), ("glaze", "TEXT"),
+]
+
+HOUR_TABLE_COLUMNS: List[Tuple[str, str]] = [
+    ("station_name", "TEXT"), ("city", "TEXT"), ("cnty", "TEXT"), ("observation_time", "TEXT"),
+    ("temperature", "REAL"), ("pressure", "REAL"), ("pressure_sea", "REAL"), ("relative_humidity", "REAL"),
+    ("rainfall", "REAL"), ("wind_speed", "REAL"), ("visibility", "REAL"),
+]
+
+
+def day_table_name(year: int) -> str:
+    return f"{DAY_TABLE_PREFIX}{year}"
+
+
+def table_columns(table_name: str) -> List[str]:
+    columns = HOUR_TABLE_COLUMNS if table_name == HOUR_TABLE_NAME else DAY_TABLE_COLUMNS
+    return [name for name, _ in columns]
+
+
+def create_schema(conn: sqlite3.Connection, years: Iterable[int], hour_table: bool = True, indexes: bool = True) -> List[str]:
+    """建表(已存在则跳过)；indexes=False 时不建索引，供大批量导入后再调用 create_indexes"""
+    tables = [(day_table_name(y), DAY_TABLE_COLUMNS) for y in years]
+    if hour_table:
+        tables.append((HOUR_TABLE_NAME, HOUR_TABLE_COLUMNS))
+    with conn:
+        for table_name, columns in tables:
+            column_sql = ", ".join(f"{name} {sql_type}" for name, sql_type in columns)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({column_sql})")
+    names = [table_name for table_name, _ in tables]
+    if indexes:
+        create_indexes(conn, names)
+    return names
+
+
+def create_indexes(conn: sqlite3.Connection, tables: Iterable[str]) -> None:
+    with conn:
+        for table_name in tables:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_station_time "
+                         f"ON {table_name} (station_name, observation_time)")
+
+
+def bulk_insert(conn: sqlite3.Connection, table_name: str, rows: Iterable[Sequence[Any]],
+                columns: Optional[Sequence[str]] = None) -> int:
+    """单事务 executemany 批量写入, rows 的列顺序与 columns(默认该表全部列) 一致"""
+    columns = list(columns or table_columns(table_name))
+    sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    with conn:
+        cursor = conn.executemany(sql, rows)
+    return cursor.rowcount
+
+
+def load_csv(conn: sqlite3.Connection, table_name: str, path: str, batch_size: int = 50000) -> int:
+    """导入从线上库导出的 CSV(首行为列名)，只保留本地表中存在的列，空串视为 NULL"""
+    known = set(table_columns(table_name))
+    total = 0
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        keep = [i for i, name in enumerate(header) if name in known]
+        columns = [header[i] for i in keep]
+        batch = []
+        for record in reader:
+            batch.append([record[i] if record[i] != "" else None for i in keep])
+            if len(batch) >= batch_size:
+                total += bulk_insert(conn, table_name, batch, columns)
+                batch = []
+        if batch:
+            total += bulk_insert(conn, table_name, batch, columns)
+    return total
+
+
+def open_sqlite(path: str) -> sqlite3.Connection:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def remove_sqlite_files(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+class _AsyncCursor:
+    """模拟 aioodbc cursor 的接口: 执行前做方言改写，阻塞调用放到线程中执行"""
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    async def execute(self, sql: str, params: Optional[Sequence[Any]] = None):
+        sql, params = translate(sql, params, dialect=SQLITE)
+        await asyncio.to_thread(self._cursor.execute, sql, params or ())
+
+    async def fetchall(self) -> List[Tuple[Any, ...]]:
+        return await asyncio.to_thread(self._cursor.fetchall)
+
+    async def fetchmany(self, size: int) -> List[Tuple[Any, ...]]:
+        return await asyncio.to_thread(self._cursor.fetchmany, size)
+
+
+class _AsyncConnection:
+    def __init__(self, conn: sqlite3.Connection):
+        self.raw = conn
+
+    @asynccontextmanager
+    async def cursor(self):
+        cursor = self.raw.cursor()
+        try:
+            yield _AsyncCursor(cursor)
+        finally:
+            cursor.close()
+
+    async def commit(self) -> None:
+        await asyncio.to_thread(self.raw.commit)
+
+    async def rollback(self) -> None:
+        await asyncio.to_thread(self.raw.rollback)
+
+
+class SQLitePool:
+    """
+    固定大小的 sqlite3 连接池，对外与 InstrumentedPool 一样用 `async with pool.acquire() as conn`。
+    path 为 ":memory:" 时使用关闭后即删除的临时文件库: 共享缓存的内存库是表级锁，读写并发时报 "database table is locked"，
+    临时文件开启 WAL 后读写互不阻塞，与文件库的行为一致
+    """
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = max(1, size)
+        self._temp_path: Optional[str] = None
+        self._queue: "asyncio.Queue[_AsyncConnection]" = asyncio.Queue()
+        self._connections: List[_AsyncConnection] = []
+        self.acquired_total = 0
+        self.in_use = 0
+        self.max_in_use = 0
+
+    async def open(self) -> None:
+        path = self.path
+        if path == ":memory:":
+            fd, self._temp_path = tempfile.mkstemp(prefix="a2w_local_", suffix=".db")
+            os.close(fd)
+            path = self._temp_path
+        for _ in range(self.size):
+            conn = _AsyncConnection(await asyncio.to_thread(open_sqlite, path))
+            self._connections.append(conn)
+            self._queue.put_nowait(conn)
+
+    @asynccontextmanager
+    async def acquire(self):
+        conn = await self._queue.get()
+        self.acquired_total += 1
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        try:
+            yield conn
+        finally:
+            self.in_use -= 1
+            self._queue.put_nowait(conn)
+
+    async def close(self) -> None:
+        for conn in self._connections:
+            await asyncio.to_thread(conn.raw.close)
+        self._connections = []
+        if self._temp_path is not None:
+            await asyncio.to_thread(remove_sqlite_files, self._temp_path)
+            self._temp_path = None
+
+    @property
+    def idle(self) -> int:
+        return self._queue.qsize()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": "sqlite",
+            "path": self.path,
+            "size": self.size,
+            "idle": self.idle,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "acquired_total": self.acquired_total,
+        }
+
+
+class SQLiteConnector(SQLServerConnector):
+    """
+    本地替身数据库(SQLite)，表结构与线上 automatic_station_his_day_data_YYYY / automatic_station_data 一致。
+    查询构造、跨年分区、single-flight、结果缓存全部复用 SQLServerConnector，只替换连接池，
+    SQL 在 cursor 层经 dialect.to_sqlite 改写，用于在没有 SQL Server 的机器上做压测/基准测试
+    """
+    dialect = SQLITE
+
+    def __init__(self, path: str, pool_config: Optional[PoolConfig] = None, station_index_refresh: float = 3600.0,
+                 availability_refresh: float = 3600.0, cache_config: Optional[ResultCacheConfig] = None,
+                 rollup_config: Optional[RollupConfig] = None, climatology_config: Optional[ClimatologyConfig] = None):
+        self.path = path
+        self.logger = setup_logger(name="SQLiteExecutor")
+        self._init_components(pool_config, station_index_refresh, availability_refresh, cache_config, rollup_config,
+                              climatology_config)
+        self.logger.info(f"DB will use SQLite as Connector: {path}")
+
+    async def connect(self):
+        try:
+            pool = SQLitePool(self.path, size=self.pool_config.max_size)
+            await pool.open()
+            self.pool = pool
+            self.logger.info(f"SQLite connection pool has been established ({pool.size} connections).")
+        except Exception as e:
+            self.logger.error(f"SQLite connect failed: {e}")
+            raise
+
+    async def _run_sync(self, fn, *args):
+        if not self.pool:
+            await self.connect()
+        async with self.pool.acquire() as conn:
+            return await asyncio.to_thread(fn, conn.raw, *args)
+
+    async def ensure_schema(self, years: Iterable[int], hour_table: bool = True) -> None:
+        await self._run_sync(create_schema, list(years), hour_table)
+
+    async def load_rows(self, table_name: str, rows: Iterable[Sequence[Any]], columns: Optional[Sequence[str]] = None) -> int:
+        start = time.perf_counter()
+        count = await self._run_sync(bulk_insert, table_name, rows, columns)
+        self.invalidate_cache()
+        self.logger.info(f"Loaded {count} rows into {table_name} in {time.perf_counter() - start:.2f}s")
+        return count
+
+    async def load_csv(self, table_name: str, path: str) -> int:
+        count = await self._run_sync(load_csv, table_name, path)
+        self.invalidate_cache()
+        self.logger.info(f"Loaded {count} rows into {table_name} from {path}")
+        return count
@@ -0,0 +1,89 @@
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DAY_TABLE_PREFIX = "automatic_station_his_day_data_"
+
+
+@dataclass(frozen=True)
+class YearPartition:
+    table_name: str
+    start_date: str  # YYYY-MM-DD, 已裁剪到本年份内
+    end_date: str
+
+
+def year_partitions(start_date: str, end_date: str, table_prefix: str = DAY_TABLE_PREFIX) -> List[YearPartition]:
+    """
+    将日期范围按年份切分到各年日表，例如 2024-12-20 ~ 2025-01-10 ->
+        [(..._2024, 2024-12-20, 2024-12-31), (..._2025, 2025-01-01, 2025-01-10)]
+    """
+    start = datetime.datetime.strptime(start_date[:10], "%Y-%m-%d").date()
+    end = datetime.datetime.strptime(end_date[:10], "%Y-%m-%d").date()
+    if start > end:  # 非法范围保持原有行为: 交给起始年份的表(查询结果为空)
+        return [YearPartition(f"{table_prefix}{start.year}", start.isoformat(), end.isoformat())]
+    partitions = []
+    for year in range(start.year, end.year + 1):
+        part_start = max(start, datetime.date(year, 1, 1))
+        part_end = min(end, datetime.date(year, 12, 31))
+        partitions.append(YearPartition(f"{table_prefix}{year}", part_start.isoformat(), part_end.isoformat()))
+    return partitions
+
+
+def _combine(values: List[Any], how: str) -> Any:
+    present = [v for v in values if v is not None]
+    if not present:
+        return None
+    if how == "sum":
+        return sum(present)
+    if how == "min":
+        return min(present)
+    if how == "max":
+        return max(present)
+    raise ValueError(f"Unsupported combine function: {how}")
+
+
+def merge_partial_aggregates(partials: Iterable[List[Dict[str, Any]]], group_key: str,
+                             spec: Dict[str, Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    """
+    合并各分区的部分聚合结果(按 group_key 分组)，并按 group_key 排序
+    spec: 输出列 -> 聚合方式
+        ("min", col) / ("max", col) / ("sum", col): 直接合并分区值
+        ("avg", sum_col, count_col): 用各分区的 SUM / COUNT 求加权平均，而不是对分区平均值再取平均
+    与 SQL 聚合一致：NULL 被忽略，全为 NULL 时结果为 None
+    """
+    grouped: Dict[Any, List[Dict[str, Any]]] = {}
+    for rows in partials:
+        for row in rows:
+            grouped.setdefault(row[group_key], []).append(row)
+
+    merged = []
+    for key in sorted(grouped):
+        members = grouped[key]
+        out: Dict[str, Any] = {group_key: key}
+        for column, rule in spec.items():
+            how = rule[0]
+            if how == "avg":
+                total = _combine([m.get(rule[1]) for m in members], "sum")
+                count = sum(m.get(rule[2]) or 0 for m in members)
+                out[column] = _average(total, count)
+            else:
+                out[column] = _combine([m.get(rule[1]) for m in members], how)
+        merged.append(out)
+    return merged
+
+
+def _average(total: Any, count: int) -> Optional[Any]:
+    if total is None or not count:
+        return None
+    if isinstance(total, Decimal):
+        return total / Decimal(count)
+    return total / count
+
+
+def merge_station_order(parts: Sequence[List[Dict[str, Any]]]) -> List[Any]:
+    """
+    各分区已按数据库排序规则(如中文拼音)排好序，按分区先后取站点首次出现的顺序；
+    各年份站点相同时与单表查询的顺序一致，后续年份新增的站点排在已出现的站点之后
+    """
+    return list(dict.fromkeys(row.get("station_name") for part in parts for row in part))
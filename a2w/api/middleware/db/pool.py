@@ -0,0 +1,169 @@
+import asyncio
+import bisect
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from a2w.utils.logger import setup_logger
+
+# 获取连接耗时直方图的桶上限(秒)，最后一个桶为 +Inf
+ACQUIRE_LATENCY_BUCKETS: List[float] = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class PoolAcquireTimeout(TimeoutError):
+    """在 acquire_timeout 内未能从连接池拿到连接"""
+
+
+@dataclass
+class PoolConfig:
+    min_size: int = 2
+    max_size: int = 10
+    acquire_timeout: float = 10.0
+    max_lifetime: float = 1800.0  # 连接最大存活时间(秒)，<=0 表示不回收
+    prewarm: bool = True
+
+    @classmethod
+    def from_global_config(cls, config) -> "PoolConfig":
+        return cls(
+            min_size=int(config.get("db_pool_min_size", cls.min_size)),
+            max_size=int(config.get("db_pool_max_size", cls.max_size)),
+            acquire_timeout=float(config.get("db_pool_acquire_timeout", cls.acquire_timeout)),
+            max_lifetime=float(config.get("db_pool_max_lifetime", cls.max_lifetime)),
+            prewarm=bool(config.get("db_pool_prewarm", cls.prewarm)),
+        )
+
+
+@dataclass
+class PoolMetrics:
+    acquired_total: int = 0
+    timeouts_total: int = 0
+    waiters: int = 0
+    max_waiters: int = 0
+    in_use: int = 0
+    max_in_use: int = 0
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+    latency_buckets: List[int] = field(default_factory=lambda: [0] * (len(ACQUIRE_LATENCY_BUCKETS) + 1))
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        self.latency_buckets[bisect.bisect_left(ACQUIRE_LATENCY_BUCKETS, seconds)] += 1
+
+
+class InstrumentedPool:
+    """
+    aioodbc 连接池的包装：
+        - 最小/最大连接数、最大存活时间回收(aioodbc 的 pool_recycle)
+        - 获取连接超时
+        - 启动预热
+        - 实时指标: 使用中 / 空闲 / 等待者 / 获取耗时直方图
+    对外保持 `async with pool.acquire() as conn` 的用法不变
+    """
+    def __init__(self, dsn: str, config: PoolConfig, name: str = "sqlserver"):
+        self.dsn = dsn
+        self.config = config
+        self.name = name
+        self.metrics = PoolMetrics()
+        self._pool = None
+        self.logger = setup_logger(name=f"InstrumentedPool[{name}]")
+
+    async def open(self) -> None:
+        import aioodbc
+        self._pool = await aioodbc.create_pool(
+            dsn=self.dsn,
+            autocommit=True,
+            minsize=self.config.min_size,
+            maxsize=self.config.max_size,
+            pool_recycle=self.config.max_lifetime if self.config.max_lifetime > 0 else -1,
+        )
+        self.logger.info(f"Pool opened: min={self.config.min_size}, max={self.config.max_size}, "
+                         f"acquire_timeout={self.config.acquire_timeout}s, max_lifetime={self.config.max_lifetime}s")
+        if self.config.prewarm:
+            await self.prewarm()
+
+    async def prewarm(self) -> None:
+        """并发取出 min_size 个连接并执行一次 SELECT 1，确保首批请求不用现场建连"""
+        async def _touch():
+            async with self.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute("SELECT 1")
+                    await cursor.fetchall()
+        start = time.perf_counter()
+        results = await asyncio.gather(*[_touch() for _ in range(self.config.min_size)], return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            self.logger.warning(f"Pool prewarm: {len(failed)}/{len(results)} connections failed: {failed[0]}")
+        self.logger.info(f"Pool prewarmed {len(results) - len(failed)} connections in {time.perf_counter() - start:.3f}s")
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._pool is None:
+            raise RuntimeError(f"Pool {self.name} is not opened")
+        m = self.metrics
+        m.waiters += 1
+        m.max_waiters = max(m.max_waiters, m.waiters)
+        start = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), timeout=self.config.acquire_timeout)
+        except asyncio.TimeoutError:
+            m.timeouts_total += 1
+            raise PoolAcquireTimeout(
+                f"Acquire connection from pool {self.name} timed out after {self.config.acquire_timeout}s "
+                f"(in_use={m.in_use}, waiters={m.waiters - 1})"
+            )
+        finally:
+            m.waiters -= 1
+        m.observe_latency(time.perf_counter() - start)
+        m.acquired_total += 1
+        m.in_use += 1
+        m.max_in_use = max(m.max_in_use, m.in_use)
+        try:
+            yield conn
+        finally:
+            m.in_use -= 1
+            await self._pool.release(conn)
+
+    @property
+    def size(self) -> int:
+        return self._pool.size if self._pool is not None else 0
+
+    @property
+    def idle(self) -> int:
+        return self._pool.freesize if self._pool is not None else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        m = self.metrics
+        cumulative, buckets = 0, {}
+        for bound, count in zip(ACQUIRE_LATENCY_BUCKETS + [float("inf")], m.latency_buckets):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "name": self.name,
+            "min_size": self.config.min_size,
+            "max_size": self.config.max_size,
+            "acquire_timeout": self.config.acquire_timeout,
+            "max_lifetime": self.config.max_lifetime,
+            "size": self.size,
+            "in_use": m.in_use,
+            "idle": self.idle,
+            "waiters": m.waiters,
+            "max_in_use": m.max_in_use,
+            "max_waiters": m.max_waiters,
+            "acquired_total": m.acquired_total,
+            "timeouts_total": m.timeouts_total,
+            "acquire_latency": {
+                "count": m.acquired_total,
+                "sum": round(m.latency_sum, 6),
+                "max": round(m.latency_max, 6),
+                "avg": round(m.latency_sum / m.acquired_total, 6) if m.acquired_total else 0.0,
+                "buckets": buckets,
+            },
+        }
@@ -0,0 +1,49 @@
+import re
+from typing import Any, Dict, List, Mapping, Tuple
+
+from .dialect import SQLITE, SQLSERVER
+
+# 命名占位符 :name；字符串字面量整体匹配后原样保留，避免误改 '08:00:00' 之类的文本
+_NAMED_PARAM = re.compile(r"'(?:[^']|'')*'|(?<![:\w]):([A-Za-z_]\w*)")
+
+
+def bind_named(sql: str, params: Mapping[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    把 :name 占位符改写为驱动使用的 ? 占位符，并按出现顺序展开参数列表。
+    同一个名字可以出现多次(如逐年 UNION 的每个分支都引用 :start_date)，每次出现都对应一个 ?
+    """
+    values: List[Any] = []
+    missing: List[str] = []
+
+    def replace(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        if name is None:
+            return match.group(0)
+        if name not in params:
+            missing.append(name)
+            return match.group(0)
+        values.append(params[name])
+        return "?"
+
+    bound = _NAMED_PARAM.sub(replace, sql)
+    if missing:
+        raise ValueError(f"Missing SQL parameters: {', '.join(sorted(set(missing)))}")
+    return bound, values
+
+
+def in_clause(column: str, name: str, values: List[Any]) -> Tuple[str, Dict[str, Any]]:
+    """column IN (:name_0, :name_1, ...) 及对应的参数"""
+    names = [f"{name}_{i}" for i in range(len(values))]
+    return f"{column} IN ({', '.join(':' + n for n in names)})", dict(zip(names, values))
+
+
+def limit_clause(dialect: str, name: str = "limit") -> str:
+    """
+    放在 ORDER BY 之后的"取前 N 行"子句，N 为命名参数 :name:
+        SQL Server 不支持 LIMIT，用 OFFSET 0 ROWS FETCH NEXT N ROWS ONLY(要求有 ORDER BY)；本地 SQLite 用 LIMIT
+    """
+    if dialect == SQLSERVER:
+        return f"OFFSET 0 ROWS FETCH NEXT :{name} ROWS ONLY"
+    if dialect == SQLITE:
+        return f"LIMIT :{name}"
+    raise ValueError(f"Unsupported SQL dialect: {dialect}")
@@ -0,0 +1,221 @@
+import asyncio
+import datetime
+import pickle
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from a2w.utils.logger import setup_logger
+
+try:
+    import diskcache
+except ImportError:  # 磁盘层可选
+    diskcache = None
+
+_DAY_TABLE_PATTERN = re.compile(r"automatic_station_his_day_data_(\d{4})", re.IGNORECASE)
+_HOUR_TABLE_PATTERN = re.compile(r"\bautomatic_station_(?:data|rollup_\w+)\b", re.IGNORECASE)
+_CATALOG_PATTERN = re.compile(r"\binformation_schema\b", re.IGNORECASE)
+# 气候库只包含已结束年份，只在重建时变化(重建后整体清空缓存)
+_CLIMATOLOGY_PATTERN = re.compile(r"\bautomatic_station_climatology_day\b", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+# ttl 取值: None 表示永不过期, 0 表示不缓存
+NEVER_EXPIRE = None
+# 内存层大小估算时抽样序列化的行数
+SIZE_SAMPLE_ROWS = 64
+
+CachedResult = Tuple[List[Tuple[Any, ...]], Tuple[Tuple[Any, Any], ...]]
+
+
+def estimate_size(value: CachedResult) -> int:
+    """按等间隔抽样的行序列化后的字节数外推整个结果集的大小，避免在事件循环上序列化大结果集"""
+    rows, description = value
+    step = max(1, len(rows) // SIZE_SAMPLE_ROWS)
+    sample = rows[::step][:SIZE_SAMPLE_ROWS]
+    sample_bytes = len(pickle.dumps((sample, description), protocol=pickle.HIGHEST_PROTOCOL))
+    if len(sample) >= len(rows):
+        return sample_bytes
+    return int(sample_bytes * len(rows) / len(sample))
+
+
+def normalize_sql(sql: str) -> str:
+    """折叠空白，使仅缩进/换行不同的同一条 SQL 命中同一缓存项"""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class ResultCacheConfig:
+    enabled: bool = True
+    max_bytes: int = 256 * 1024 * 1024
+    current_ttl: float = 300.0  # 当年日表 / 表目录
+    hour_ttl: float = 60.0      # 小时表 automatic_station_data 持续写入
+    disk_dir: str = ""          # 为空表示不启用磁盘层
+    disk_size_limit: int = 2 * 1024 * 1024 * 1024
+
+    @classmethod
+    def from_global_config(cls, config) -> "ResultCacheConfig":
+        return cls(
+            enabled=bool(config.get("result_cache_enabled", cls.enabled)),
+            max_bytes=int(config.get("result_cache_max_bytes", cls.max_bytes)),
+            current_ttl=float(config.get("result_cache_current_ttl", cls.current_ttl)),
+            hour_ttl=float(config.get("result_cache_hour_ttl", cls.hour_ttl)),
+            disk_dir=config.get("result_cache_disk_dir", cls.disk_dir) or "",
+            disk_size_limit=int(config.get("result_cache_disk_size_limit", cls.disk_size_limit)),
+        )
+
+
+@dataclass
+class ResultCacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expired: int = 0
+    uncacheable: int = 0
+    oversized: int = 0
+
+
+class ResultCache:
+    """
+    查询结果缓存(连接器 _fetch 之前)，key = 折叠空白后的 SQL + 参数
+    TTL 按 SQL 涉及的表决定，取所有表中最短的一个:
+        - 往年日表 automatic_station_his_day_data_<过去年份>: 数据不再变化, 永不过期
+        - 当年及以后的日表、information_schema: current_ttl
+        - 小时表 automatic_station_data 及其汇总表 automatic_station_rollup_*: hour_ttl
+        - 识别不出表名的 SQL 不缓存
+    内存层按(抽样估算的)序列化字节数计量，超过 max_bytes 时按 LRU 淘汰；可选的 diskcache 磁盘层保存相同内容，进程重启后仍可命中
+    缓存的 rows/description 被所有命中者共享，只读
+    """
+    def __init__(self, config: Optional[ResultCacheConfig] = None):
+        self.config = config or ResultCacheConfig()
+        self.logger = setup_logger(name="ResultCache")
+        self.stats = ResultCacheStats()
+        # key -> (expire_at, size, value)
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], int, CachedResult]]" = OrderedDict()
+        self._bytes = 0
+        self._disk = None
+        if self.config.enabled and self.config.disk_dir:
+            if diskcache is None:
+                self.logger.warning("diskcache is not installed, the on-disk result cache tier is disabled.")
+            else:
+                self._disk = diskcache.Cache(self.config.disk_dir, size_limit=self.config.disk_size_limit)
+
+    def ttl_for(self, sql: str) -> Optional[float]:
+        ttls: List[float] = []
+        current_year = datetime.date.today().year
+        day_years = [int(year) for year in _DAY_TABLE_PATTERN.findall(sql)]
+        if any(year >= current_year for year in day_years):
+            ttls.append(self.config.current_ttl)
+        if _HOUR_TABLE_PATTERN.search(sql):
+            ttls.append(self.config.hour_ttl)
+        if _CATALOG_PATTERN.search(sql):
+            ttls.append(self.config.current_ttl)
+        if ttls:
+            return min(ttls)
+        return NEVER_EXPIRE if day_years or _CLIMATOLOGY_PATTERN.search(sql) else 0
+
+    @staticmethod
+    def make_key(sql: str, params: Optional[Sequence[Any]] = None) -> Tuple[str, Tuple[Any, ...]]:
+        return normalize_sql(sql), tuple(params) if params else ()
+
+    async def get(self, key: Hashable) -> Optional[CachedResult]:
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None:
+            expire_at, _, value = entry
+            if expire_at is None or expire_at > now:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return value
+            self._remove(key)
+            self.stats.expired += 1
+
+        if self._disk is not None:
+            payload = await asyncio.to_thread(self._disk.get, key)
+            if payload is not None:
+                expire_at, value = pickle.loads(payload)
+                if expire_at is None or expire_at > now:
+                    self.stats.disk_hits += 1
+                    self._store_memory(key, expire_at, len(payload), value)
+                    return value
+        self.stats.misses += 1
+        return None
+
+    async def put(self, key: Hashable, sql: str, rows: Sequence[Any], description: Sequence[Sequence[Any]]) -> CachedResult:
+        """按表策略写入缓存，返回可共享的只读结果 (行转为 tuple, description 只保留列名和类型)"""
+        value: CachedResult = (
+            [tuple(row) for row in rows],
+            tuple((col[0], col[1] if len(col) > 1 else None) for col in description),
+        )
+        ttl = self.ttl_for(sql)
+        if ttl == 0:
+            self.stats.uncacheable += 1
+            return value
+        expire_at = None if ttl is None else time.time() + ttl
+        try:
+            size = estimate_size(value)
+        except Exception as e:
+            self.logger.warning(f"Result is not picklable, skip caching: {e}")
+            self.stats.uncacheable += 1
+            return value
+        if size > self.config.max_bytes:
+            self.stats.oversized += 1
+            return value
+        self._store_memory(key, expire_at, size, value)
+        self.stats.stores += 1
+        if self._disk is not None:
+            # 磁盘层需要完整序列化，放到线程中和写盘一起执行
+            def _write_disk():
+                payload = pickle.dumps((expire_at, value), protocol=pickle.HIGHEST_PROTOCOL)
+                self._disk.set(key, payload, expire=ttl)
+            try:
+                await asyncio.to_thread(_write_disk)
+            except Exception as e:
+                self.logger.warning(f"Write disk result cache failed: {e}")
+        return value
+
+    def _store_memory(self, key: Hashable, expire_at: Optional[float], size: int, value: CachedResult) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expire_at, size, value)
+        self._bytes += size
+        while self._bytes > self.config.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self, include_disk: bool = True) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        if include_disk and self._disk is not None:
+            self._disk.clear()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.disk_hits + self.stats.misses
+        return {
+            "enabled": self.config.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.config.max_bytes,
+            "disk": self._disk is not None,
+            "hits": self.stats.hits,
+            "disk_hits": self.stats.disk_hits,
+            "misses": self.stats.misses,
+            "hit_rate": round((self.stats.hits + self.stats.disk_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stats.stores,
+            "evictions": self.stats.evictions,
+            "expired": self.stats.expired,
+            "uncacheable": self.stats.uncacheable,
+            "oversized": self.stats.oversized,
+        }
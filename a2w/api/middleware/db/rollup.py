@@ -0,0 +1,218 @@
+import asyncio
+import datetime
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from .dialect import SQLITE, SQLSERVER
+from a2w.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from .sql_connector import SQLServerConnector
+
+HOUR_TABLE_NAME = "automatic_station_data"
+ROLLUP_TABLES: Dict[str, str] = {
+    "half": "automatic_station_rollup_half",
+    "daily": "automatic_station_rollup_daily",
+}
+ROLLUP_METRICS: List[str] = ["temperature", "pressure", "pressure_sea", "relative_humidity", "rainfall", "wind_speed", "visibility"]
+
+_PERIOD_EXPR = "CASE WHEN DATEPART(hour, observation_time) < 12 THEN '上午' ELSE '下午' END"
+# 与 TABLE_HOUR_HALF / TABLE_HOUR_DAY 的站点级聚合口径一致: 降水求和, 其余求平均, 均 ROUND 到 1 位
+_METRIC_EXPRS = ",\n    ".join(
+    f"ROUND({'SUM' if m == 'rainfall' else 'AVG'}({m}), 1)" for m in ROLLUP_METRICS
+)
+
+ROLLUP_INSERT_SQL: Dict[str, str] = {
+    "half": f"""
+INSERT INTO {ROLLUP_TABLES["half"]} (station_name, cnty, obs_date, period, {", ".join(ROLLUP_METRICS)})
+SELECT
+    station_name,
+    MAX(cnty),
+    CAST(observation_time AS date),
+    {_PERIOD_EXPR},
+    {_METRIC_EXPRS}
+FROM {HOUR_TABLE_NAME}
+WHERE observation_time >= ?
+GROUP BY station_name, CAST(observation_time AS date), {_PERIOD_EXPR}
+""",
+    "daily": f"""
+INSERT INTO {ROLLUP_TABLES["daily"]} (station_name, cnty, obs_date, {", ".join(ROLLUP_METRICS)})
+SELECT
+    station_name,
+    MAX(cnty),
+    CAST(observation_time AS date),
+    {_METRIC_EXPRS}
+FROM {HOUR_TABLE_NAME}
+WHERE observation_time >= ?
+GROUP BY station_name, CAST(observation_time AS date)
+""",
+}
+
+
+def rollup_ddl(aggregation: str, dialect: str) -> str:
+    table = ROLLUP_TABLES[aggregation]
+    half = aggregation == "half"
+    if dialect == SQLSERVER:
+        metrics = ", ".join(f"{m} FLOAT NULL" for m in ROLLUP_METRICS)
+        period = "period NVARCHAR(4) NOT NULL, " if half else ""
+        key = "station_name, obs_date, period" if half else "station_name, obs_date"
+        return (f"IF OBJECT_ID(N'{table}', N'U') IS NULL "
+                f"CREATE TABLE {table} (station_name NVARCHAR(64) NOT NULL, cnty NVARCHAR(64) NULL, obs_date DATE NOT NULL, "
+                f"{period}{metrics}, CONSTRAINT PK_{table} PRIMARY KEY ({key}))")
+    if dialect == SQLITE:
+        metrics = ", ".join(f"{m} REAL" for m in ROLLUP_METRICS)
+        period = "period TEXT NOT NULL, " if half else ""
+        key = "station_name, obs_date, period" if half else "station_name, obs_date"
+        return (f"CREATE TABLE IF NOT EXISTS {table} (station_name TEXT NOT NULL, cnty TEXT, obs_date TEXT NOT NULL, "
+                f"{period}{metrics}, PRIMARY KEY ({key}))")
+    raise ValueError(f"Unsupported SQL dialect: {dialect}")
+
+
+@dataclass
+class RollupConfig:
+    enabled: bool = True
+    refresh_interval: float = 300.0  # 秒, <=0 表示只在启动时构建一次
+    lookback_days: int = 3
+    backfill_days: int = 0           # 首次构建回溯天数, 0 表示小时表全部数据
+
+    @classmethod
+    def from_global_config(cls, config) -> "RollupConfig":
+        return cls(
+            enabled=bool(config.get("rollup_enabled", cls.enabled)),
+            refresh_interval=float(config.get("rollup_refresh_interval", cls.refresh_interval)),
+            lookback_days=int(config.get("rollup_lookback_days", cls.lookback_days)),
+            backfill_days=int(config.get("rollup_backfill_days", cls.backfill_days)),
+        )
+
+
+def _as_date(value: Any) -> Optional[datetime.date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+class RollupManager:
+    """
+    小时表上午/下午、逐日汇总表的维护者:
+        - 首次: 建表，汇总表为空时从小时表全量(或最近 backfill_days 天)构建
+        - 之后: 每次只重算 "今天 - lookback_days" 与上次最大日期中较早者之后的日期(删除后重新 INSERT ... SELECT)，
+          覆盖新到达的小时数据、近几天的订正数据以及未来日期的预报数据更新
+    重算在数据库端完成(一个事务内 DELETE + INSERT)，数据不经过应用。
+    连接器在汇总表覆盖请求日期范围时，half/daily 查询改读汇总表；数据相对小时表最多滞后一个刷新周期
+    """
+    def __init__(self, db: "SQLServerConnector", config: Optional[RollupConfig] = None):
+        self.db = db
+        config = config or RollupConfig()
+        self.refresh_interval = config.refresh_interval
+        self.lookback_days = config.lookback_days
+        self.backfill_days = config.backfill_days
+        self.enabled = config.enabled
+        self.logger = setup_logger(name="RollupManager")
+        self.min_date: Optional[datetime.date] = None
+        self.max_date: Optional[datetime.date] = None
+        self.last_refresh_at: Optional[float] = None
+        self.last_refresh_seconds: Optional[float] = None
+        self.routed = 0
+        self.fallbacks = 0
+        self._tables_ready = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self.last_refresh_at is not None and self.min_date is not None
+
+    async def ensure_tables(self) -> None:
+        if not self._tables_ready:
+            await self.db.execute_write([(rollup_ddl(agg, self.db.dialect), None) for agg in ROLLUP_TABLES])
+            self._tables_ready = True
+
+    async def _date_bounds(self) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+        rows, _ = await self.db._fetch(f"SELECT MIN(obs_date), MAX(obs_date) FROM {ROLLUP_TABLES['daily']}", bypass_cache=True)
+        if not rows:
+            return None, None
+        return _as_date(rows[0][0]), _as_date(rows[0][1])
+
+    def _refresh_start(self, today: datetime.date) -> Optional[datetime.date]:
+        """None 表示全量构建"""
+        if self.max_date is None:
+            return today - datetime.timedelta(days=self.backfill_days) if self.backfill_days > 0 else None
+        return min(today - datetime.timedelta(days=self.lookback_days), self.max_date)
+
+    async def refresh(self) -> bool:
+        if not self.enabled:
+            return False
+        async with self._lock:
+            start = time.perf_counter()
+            try:
+                await self.ensure_tables()
+                if self.max_date is None:
+                    self.min_date, self.max_date = await self._date_bounds()
+                since = self._refresh_start(datetime.date.today())
+                statements: List[Tuple[str, Optional[Sequence[Any]]]] = []
+                for agg, table in ROLLUP_TABLES.items():
+                    if since is None:
+                        statements.append((f"DELETE FROM {table}", None))
+                        statements.append((ROLLUP_INSERT_SQL[agg], ["1900-01-01 00:00:00"]))
+                    else:
+                        statements.append((f"DELETE FROM {table} WHERE obs_date >= ?", [since.isoformat()]))
+                        statements.append((ROLLUP_INSERT_SQL[agg], [f"{since.isoformat()} 00:00:00"]))
+                await self.db.execute_write(statements)
+                self.min_date, self.max_date = await self._date_bounds()
+            except Exception as e:
+                self.logger.error(f"Rollup refresh failed, keep serving from the previous rollups: {e}")
+                return False
+            self.last_refresh_at = time.time()
+            self.last_refresh_seconds = time.perf_counter() - start
+            self.logger.info(f"Rollups refreshed since {since or 'the beginning'}: "
+                             f"{self.min_date}~{self.max_date}, {self.last_refresh_seconds:.2f}s")
+            return True
+
+    def covers(self, start_date: str, end_date: str) -> bool:
+        """
+        汇总表已构建，且请求日期范围落在汇总表的 [最早日期, 最晚日期] 内:
+        backfill 之前的数据、上次刷新之后才到达的日期仍查小时表
+        """
+        if not self.ready or self.max_date is None:
+            return False
+        try:
+            return _as_date(start_date) >= self.min_date and _as_date(end_date) <= self.max_date
+        except ValueError:
+            return False
+
+    def start_refresh(self) -> None:
+        if self.enabled and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await self.refresh()
+            if self.refresh_interval <= 0:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "min_date": self.min_date.isoformat() if self.min_date else None,
+            "max_date": self.max_date.isoformat() if self.max_date else None,
+            "last_refresh_at": self.last_refresh_at,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,139 @@
+import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+VISIBILITY_SENTINEL = 999999  # 库中能见度缺测/无限远的哨兵值
+VISIBILITY_DEFAULT = 10000
+
+
+def _format_datetime(value: datetime.datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _format_date(value: datetime.date) -> str:
+    return value.strftime("%Y-%m-%d")
+
+
+# 以 type(value) 精确匹配: datetime 是 date 的子类，不能用 isinstance 的顺序依赖
+_VALUE_FORMATTERS: Dict[type, Callable[[Any], Any]] = {
+    Decimal: float,
+    datetime.datetime: _format_datetime,
+    datetime.date: _format_date,
+}
+
+
+def _format_any(value: Any) -> Any:
+    formatter = _VALUE_FORMATTERS.get(type(value))
+    return formatter(value) if formatter else value
+
+
+def day_table_null_default(col_name: str) -> Any:
+    """日表列的空值默认值"""
+    if any(keyword in col_name for keyword in ["precip", "rain", "prcp"]):
+        return 0.0
+    if "temp" in col_name or "tem" in col_name:
+        return 0.0 if "_time" not in col_name else None
+    if "wind" in col_name or "win" in col_name:
+        return 0.0 if "_time" not in col_name else None
+    if "visibility" in col_name or "vis" in col_name:
+        return VISIBILITY_DEFAULT if "_time" not in col_name else None
+    return None
+
+
+def hour_table_null_default(col_name: str) -> Any:
+    """小时表(中文列名)的空值默认值"""
+    if "降水" in col_name:
+        return 0.0
+    if "温度" in col_name:
+        return 0.0
+    if "风速" in col_name:
+        return 0.0
+    if "能见度" in col_name:
+        return VISIBILITY_DEFAULT
+    return None
+
+
+class RowNormalizer:
+    """
+    把 cursor 结果集规整成 List[Dict]：
+        - 空值按列名给默认值
+        - 能见度哨兵值 999999 -> 10000
+        - Decimal -> float, datetime/date -> 字符串
+    列规则只依赖列名和列类型，所以按 cursor.description 编译一次列计划(每列一个转换函数)并缓存，
+    之后整列转换，不再对每个单元格重复做列名子串判断。
+    """
+    def __init__(self, sentinel_columns: Sequence[str], null_default: Callable[[str], Any]):
+        self.sentinel_columns = frozenset(sentinel_columns)
+        self.null_default = null_default
+        self._plans: Dict[Tuple, List[Optional[Callable[[Sequence[Any]], List[Any]]]]] = {}
+
+    def compile(self, description: Sequence[Sequence[Any]]) -> Tuple[List[str], List[Optional[Callable[[Sequence[Any]], List[Any]]]]]:
+        columns = [col[0] for col in description]
+        key = tuple((col[0], col[1] if len(col) > 1 else None) for col in description)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = [self._compile_column(name, type_code) for name, type_code in key]
+            self._plans[key] = plan
+        return columns, plan
+
+    def _compile_column(self, name: str, type_code: Any) -> Optional[Callable[[Sequence[Any]], List[Any]]]:
+        """返回整列转换函数; None 表示该列原样返回"""
+        default = self.null_default(name)
+        sentinel = name in self.sentinel_columns
+        # pyodbc 的 type_code 就是 Python 类型; sqlite 等没有类型信息的驱动为 None，按值分派
+        if sentinel:
+            fmt = float if type_code in (Decimal, float) else _format_any
+            def convert(values, _default=default, _fmt=fmt):
+                return [_default if v is None else VISIBILITY_DEFAULT if v == VISIBILITY_SENTINEL else _fmt(v)
+                        for v in values]
+            return convert
+        if type_code in (str, int, bool, bytes):
+            if default is None:
+                return None
+            return lambda values, _default=default: [_default if v is None else v for v in values]
+        if type_code in (Decimal, float):
+            return lambda values, _default=default: [_default if v is None else float(v) for v in values]
+        if type_code in (datetime.date, datetime.datetime):
+            # 日期列在结果集中大量重复(站点 x 时段)，按值缓存格式化结果
+            def convert_dates(values, _default=default):
+                formatted: Dict[Any, Any] = {None: _default}
+                out = []
+                append = out.append
+                for v in values:
+                    f = formatted.get(v, formatted)
+                    if f is formatted:
+                        f = formatted[v] = _format_any(v)
+                    append(f)
+                return out
+            return convert_dates
+        return lambda values, _default=default: [_default if v is None else _format_any(v) for v in values]
+
+    def normalize(self, rows: Sequence[Sequence[Any]], description: Sequence[Sequence[Any]],
+                  extra: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        columns, plan = self.compile(description)
+        converted = [
+            col_values if convert is None else convert(col_values)
+            for convert, col_values in zip(plan, zip(*rows))
+        ]
+        if extra:
+            return [{**dict(zip(columns, values)), **extra} for values in zip(*converted)]
+        return [dict(zip(columns, values)) for values in zip(*converted)]
+
+
+DAY_TABLE_NORMALIZER = RowNormalizer(
+    sentinel_columns=["min_visibility", "vis_min"],
+    null_default=day_table_null_default,
+)
+
+HOUR_TABLE_NORMALIZER = RowNormalizer(
+    sentinel_columns=["日平均水平能见度", "平均水平能见度"],
+    null_default=hour_table_null_default,
+)
+
+# 只做类型转换(Decimal/日期)，保留 NULL，供应用侧聚合使用(与 SQL 聚合函数忽略 NULL 的语义一致)
+TYPE_ONLY_NORMALIZER = RowNormalizer(
+    sentinel_columns=[],
+    null_default=lambda col_name: None,
+)
@@ -0,0 +1,87 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+@dataclass
+class SingleFlightStats:
+    calls: int = 0
+    executed: int = 0
+    shared: int = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "shared": self.shared,
+            "hit_rate": round(self.shared / self.calls, 4) if self.calls else 0.0,
+            "in_flight": 0,
+        }
+
+
+class SingleFlight:
+    """
+    合并并发的相同请求: 同一个 key 正在执行时，后到的调用者直接等待第一次执行的结果，不再重复访问数据库。
+    只合并"同时在途"的请求，执行结束即移除 key，不做结果缓存。
+    fn 在独立的 task 中执行，所有调用者(包括发起者)都只是等待者: 任一调用者被取消(如单个子查询超时)只会让它自己退出，
+    其它调用者照常拿到结果；最后一个等待者也被取消时才取消执行。
+    调用方自行执行的查询(如合并成一个批次)用 claim() 登记为在途，执行结束后由调用方给出结果，期间相同请求同样只等待。
+    共享的结果对所有调用者是同一个对象，调用方不应原地修改(连接器层共享的是只读的 rows/description)
+    """
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.stats = SingleFlightStats()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats.shared += 1
+        else:
+            self.stats.executed += 1
+            task = asyncio.create_task(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # claim() 登记的执行由登记方负责完成，不随等待者取消
+            if not task.done() and self._waiters.get(task) == 1 and isinstance(task, asyncio.Task):
+                # 没有其它等待者, 不再需要这次执行；先移除 key, 之后到达的调用者重新发起
+                if self._in_flight.get(key) is task:
+                    del self._in_flight[key]
+                task.cancel()
+            raise
+        finally:
+            remaining = self._waiters.get(task, 1) - 1
+            if remaining > 0:
+                self._waiters[task] = remaining
+            else:
+                self._waiters.pop(task, None)
+
+    def claim(self, key: Hashable) -> Optional[asyncio.Future]:
+        """
+        key 已在途时返回 None，调用方应改用 do() 等待已有的执行；否则把返回的 future 登记为该 key 的执行，
+        调用方必须对它 set_result / set_exception，之后到达的相同请求经 do() 等待它的结果
+        """
+        if key in self._in_flight:
+            return None
+        self.stats.calls += 1
+        self.stats.executed += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        future.add_done_callback(lambda done, key=key: self._finish(key, done))
+        return future
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # 标记已读取: 没有等待者时避免 "Task exception was never retrieved"
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = self.stats.snapshot()
+        data["in_flight"] = len(self._in_flight)
+        return data
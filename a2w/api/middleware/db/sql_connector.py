@@ -1,14 +1,29 @@
+import asyncio
 import datetime
 from decimal import Decimal
-from typing import List, Optional, Dict, Any
-import aiomysql
+from typing import AsyncIterator, List, Optional, Dict, Any, Sequence, Tuple
 
 from .base_db import DBConnector
+from .pool import InstrumentedPool, PoolConfig
+from .row_normalizer import DAY_TABLE_NORMALIZER, HOUR_TABLE_NORMALIZER, TYPE_ONLY_NORMALIZER
 from .sql_template import SQL_TEMPLATE
+from .station_index import StationIndex
+from .availability_index import StationAvailabilityIndex
+from .single_flight import SingleFlight
+from .result_cache import ResultCache, ResultCacheConfig
+from .rollup import ROLLUP_TABLES, RollupConfig, RollupManager
+from .climatology import ClimatologyConfig, ClimatologyStore
+from .dialect import SQLSERVER
+from .partition_router import YearPartition, merge_partial_aggregates, merge_station_order, year_partitions
 from a2w.utils.logger import setup_logger
 
 class SQLServerConnector(DBConnector):
-    def __init__(self, host: str, port: str, database: str, username: str, password: str):
+    dialect = SQLSERVER
+
+    def __init__(self, host: str, port: str, database: str, username: str, password: str, pool_config: Optional[PoolConfig] = None,
+                 station_index_refresh: float = 3600.0, availability_refresh: float = 3600.0,
+                 cache_config: Optional[ResultCacheConfig] = None, rollup_config: Optional[RollupConfig] = None,
+                 climatology_config: Optional[ClimatologyConfig] = None):
         self.connection_string = (
                 "DRIVER={ODBC Driver 18 for SQL Server};"
                 f"SERVER={host},{port};"
@@ -18,42 +33,240 @@ class SQLServerConnector(DBConnector):
                 "TrustServerCertificate=yes;"
             )
         self.logger = setup_logger(name="SQLServerExecutor")
-        self.pool = None
+        self._init_components(pool_config, station_index_refresh, availability_refresh, cache_config, rollup_config,
+                              climatology_config)
         self.logger.info(f"DB will use SQLServer as Connector: Host:{host} --> Database{database}")
+
+    def _init_components(self, pool_config: Optional[PoolConfig], station_index_refresh: float,
+                         availability_refresh: float, cache_config: Optional[ResultCacheConfig],
+                         rollup_config: Optional[RollupConfig] = None,
+                         climatology_config: Optional[ClimatologyConfig] = None) -> None:
+        """与具体数据库无关的组件: 连接池配置、站点索引、single-flight、结果缓存、汇总表、气候库(本地替身连接器复用)"""
+        self.pool_config = pool_config or PoolConfig()
+        self.pool: Optional[InstrumentedPool] = None
+        self.station_index = StationIndex(self, refresh_interval=station_index_refresh)
+        self.availability_index = StationAvailabilityIndex(self, refresh_interval=availability_refresh)
+        self.single_flight = SingleFlight()
+        self.result_cache = ResultCache(cache_config)
+        self.batch_stats: Dict[str, int] = {"batches": 0, "statements": 0, "fallbacks": 0}
+        self.rollups = RollupManager(self, rollup_config)
+        self.climatology = ClimatologyStore(self, climatology_config)
     
     async def connect(self):
         try:
-            import aioodbc
-            self.pool = await aioodbc.create_pool(dsn=self.connection_string, autocommit=True)
+            pool = InstrumentedPool(dsn=self.connection_string, config=self.pool_config, name="sqlserver")
+            await pool.open()
+            self.pool = pool
             self.logger.info("SQL Server connection pool has been established.")
         except Exception as e:
             self.logger.error(f"SQL Server connect failed: {e}")
             raise
     
     async def close(self):
+        await self.station_index.stop()
+        await self.availability_index.stop()
+        await self.rollups.stop()
+        await self.climatology.stop()
         if self.pool:
-            self.pool.close()
-            await self.pool.wait_closed()
+            await self.pool.close()
+            self.pool = None
             self.logger.info("SQL Server connection pool is closed.")
+        self.result_cache.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "pool": self.pool.snapshot() if self.pool else None,
+            "station_index": self.station_index.snapshot(),
+            "availability_index": self.availability_index.snapshot(),
+            "single_flight": self.single_flight.snapshot(),
+            "result_cache": self.result_cache.snapshot(),
+            "rollups": self.rollups.snapshot(),
+            "climatology": self.climatology.snapshot(),
+            "query_batches": dict(self.batch_stats),
+        }
+
+    async def _fetch(self, sql: str, params: Optional[Sequence[Any]] = None, bypass_cache: bool = False) -> Tuple[List[Any], Sequence[Any]]:
+        """
+        执行查询并返回 (rows, cursor.description)。先查结果缓存；未命中时相同 SQL + 参数的并发请求经 single-flight
+        合并为一次数据库往返，结果按表 TTL 策略写入缓存。rows 在调用者之间共享，各调用方只读取并各自构造结果字典
+        """
+        key = ResultCache.make_key(sql, params)
+        use_cache = self.result_cache.config.enabled and not bypass_cache
+        if use_cache:
+            cached = await self.result_cache.get(key)
+            if cached is not None:
+                return cached
+        return await self.single_flight.do(key if not bypass_cache else ("bypass", key),
+                                           lambda: self._query(key, sql, params, use_cache))
+
+    async def _query(self, key: Any, sql: str, params: Optional[Sequence[Any]], use_cache: bool) -> Tuple[List[Any], Sequence[Any]]:
+        """实际访问数据库执行一条查询(调用方已经过 single-flight)，use_cache 时结果写入缓存"""
+        if not self.pool:
+            await self.connect()
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                if params:
+                    await cursor.execute(sql, params)
+                else:
+                    await cursor.execute(sql)
+                rows = await cursor.fetchall()
+                description = cursor.description
+        if use_cache:
+            return await self.result_cache.put(key, sql, rows, description)
+        return rows, description
     
-    async def execute_query(self, sql: str) -> Optional[List[Dict[str, Any]]]:
+    async def execute_write(self, statements: Sequence[Tuple[str, Optional[Sequence[Any]]]]) -> None:
+        """
+        在同一个事务中依次执行写语句(DDL/DELETE/INSERT ... SELECT)，失败时回滚；不经过 single-flight 与结果缓存。
+        连接池的连接是 autocommit 模式(每条语句单独提交)，这里临时关闭，结束后恢复
+        """
         if not self.pool:
             await self.connect()
-        
-        try:
-            async with self.pool.acquire() as conn:
+        async with self.pool.acquire() as conn:
+            autocommit = getattr(conn, "autocommit", False)
+            if autocommit:
+                conn.autocommit = False
+            try:
                 async with conn.cursor() as cursor:
-                    await cursor.execute(sql)
-                    rows = await cursor.fetchall()
-                    columns = [column[0] for column in cursor.description]
-                    return [dict(zip(columns, row)) for row in rows] if rows else []
+                    for sql, params in statements:
+                        if params:
+                            await cursor.execute(sql, params)
+                        else:
+                            await cursor.execute(sql)
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+            finally:
+                if autocommit:
+                    conn.autocommit = True
+
+    def invalidate_cache(self, include_disk: bool = True) -> None:
+        self.result_cache.clear(include_disk=include_disk)
+
+    async def execute_query(self, sql: str, params: Optional[Sequence[Any]] = None,
+                            bypass_cache: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        params 对应 sql 中的 ? 占位符；参数化的 SQL 文本固定，数据库端执行计划可以复用。
+        bypass_cache=True 时不读写结果缓存(站点/可用性索引等需要拿到数据库最新数据的加载)
+        """
+        try:
+            rows, description = await self._fetch(sql, params, bypass_cache=bypass_cache)
+            columns = [column[0] for column in description]
+            return [dict(zip(columns, row)) for row in rows] if rows else []
         except Exception as e:
             self.logger.error(f"SQL execution failed: {e}")
             return None
+
+    async def execute_query_batch(self, statements: Sequence[Tuple[str, Optional[Sequence[Any]]]]) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        多条查询合并为一次数据库往返，按输入顺序返回各自的结果(失败的语句为 None，与 execute_query 一致)。
+        先查结果缓存；未命中的语句在 single-flight 中登记: 相同查询已在途的直接等待它，其余的一起执行，
+        执行期间到达的相同请求(包括其他报告的批次)等待本批次的结果。批次整体失败时逐条重试，单条语句出错不影响其他语句
+        """
+        fetched: List[Optional[Tuple[List[Any], Sequence[Any]]]] = [None] * len(statements)
+        use_cache = self.result_cache.config.enabled
+        led = []      # 由本批次执行: (i, key, sql, params, flight)
+        joined = []   # 相同查询已在途: (i, key, sql, params)
+        for i, (sql, params) in enumerate(statements):
+            key = ResultCache.make_key(sql, params)
+            cached = await self.result_cache.get(key) if use_cache else None
+            if cached is not None:
+                fetched[i] = cached
+                continue
+            flight = self.single_flight.claim(key)
+            if flight is None:
+                joined.append((i, key, sql, params))
+            else:
+                led.append((i, key, sql, params, flight))
+
+        async def run_led():
+            try:
+                if len(led) > 1:
+                    try:
+                        results = await self._fetch_batch([(sql, params) for _, _, sql, params, _ in led])
+                        self.batch_stats["batches"] += 1
+                        self.batch_stats["statements"] += len(led)
+                        for (_, key, sql, _, flight), (rows, description) in zip(led, results):
+                            flight.set_result(await self.result_cache.put(key, sql, rows, description) if use_cache
+                                              else (rows, description))
+                    except Exception as e:
+                        self.batch_stats["fallbacks"] += 1
+                        self.logger.warning(f"Batched query failed, retry the {len(led)} statements one by one: {e}")
+                for _, key, sql, params, flight in led:
+                    if flight.done():
+                        continue
+                    try:
+                        flight.set_result(await self._query(key, sql, params, use_cache))
+                    except Exception as e:
+                        flight.set_exception(e)
+            finally:
+                # 本批次被取消时，等待这些查询的其他请求也要结束等待
+                for *_, flight in led:
+                    if not flight.done():
+                        flight.set_exception(RuntimeError("batched query was cancelled"))
+
+        async def join(i, key, sql, params):
+            try:
+                fetched[i] = await self.single_flight.do(key, lambda: self._query(key, sql, params, use_cache))
+            except Exception as e:
+                self.logger.error(f"SQL execution failed: {e}")
+
+        await asyncio.gather(run_led(), *(join(*item) for item in joined))
+        for i, _, _, _, flight in led:
+            if flight.exception() is None:
+                fetched[i] = flight.result()
+            else:
+                self.logger.error(f"SQL execution failed: {flight.exception()}")
+
+        results: List[Optional[List[Dict[str, Any]]]] = []
+        for item in fetched:
+            if item is None:
+                results.append(None)
+                continue
+            rows, description = item
+            columns = [column[0] for column in description]
+            results.append([dict(zip(columns, row)) for row in rows] if rows else [])
+        return results
+
+    async def _fetch_batch(self, statements: Sequence[Tuple[str, Optional[Sequence[Any]]]]) -> List[Tuple[List[Any], Sequence[Any]]]:
+        """
+        一次取连接执行多条查询: SQL Server 拼成一个多结果集批次(一次网络往返，逐个 nextset 读取)，
+        本地 SQLite 不支持多语句批次，在同一连接上依次执行
+        """
+        if not self.pool:
+            await self.connect()
+        fetched = []
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                if self.dialect == SQLSERVER:
+                    sql = "SET NOCOUNT ON;\n" + ";\n".join(sql for sql, _ in statements)
+                    params = [value for _, values in statements for value in (values or [])]
+                    if params:
+                        await cursor.execute(sql, params)
+                    else:
+                        await cursor.execute(sql)
+                    while True:
+                        fetched.append((await cursor.fetchall(), cursor.description))
+                        if len(fetched) == len(statements) or not await cursor.nextset():
+                            break
+                else:
+                    for sql, params in statements:
+                        if params:
+                            await cursor.execute(sql, params)
+                        else:
+                            await cursor.execute(sql)
+                        fetched.append((await cursor.fetchall(), cursor.description))
+        if len(fetched) != len(statements):
+            raise RuntimeError(f"expected {len(statements)} result sets, got {len(fetched)}")
+        return fetched
     
     async def query_weather_metrics(self, regions: List[str], start_date: str, end_date: str) -> List[Dict[str, Any]]:
         placeholders = ",".join(["?"] * len(regions))
-        table_name = f"automatic_station_his_day_data_{start_date[:4]}"  # 使用开始日期年份的日表作为天气类型的固定SQL查询
+        partitions = year_partitions(start_date, end_date)
+        if len(partitions) > 1:
+            return await self._query_weather_metrics_partitioned(regions, partitions, placeholders)
+        table_name = partitions[0].table_name
 
         sql = f"""
         SELECT 
@@ -77,18 +290,56 @@ class SQLServerConnector(DBConnector):
         params = regions + [start_datetime, end_datetime]
 
         try:
-            async with self.pool.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(sql, params)
-                    rows = await cursor.fetchall()
-                    if not rows:
-                        return []
+            rows, description = await self._fetch(sql, params)
+            if not rows:
+                return []
 
-                    columns = [col[0] for col in cursor.description]
-                    return [dict(zip(columns, row)) for row in rows]
+            columns = [col[0] for col in description]
+            return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             self.logger.error(f"查询日表天气指标数据失败: {e}")
             return None
+
+    async def _query_weather_metrics_partitioned(self, regions: List[str], partitions: List[YearPartition],
+                                                 placeholders: str) -> Optional[List[Dict[str, Any]]]:
+        """跨年范围: 各年份日表并发执行部分聚合(AVG 拆为 SUM/COUNT)，在应用侧按站点合并"""
+        sql = f"""
+        SELECT 
+            station_name,
+            SUM(tem_avg) as tem_avg_sum,
+            COUNT(tem_avg) as tem_avg_cnt,
+            MIN(tem_min) as min_temp,
+            MAX(tem_max) as max_temp,
+            SUM(rain) as total_precip,
+            MAX(win_s_max) as max_wind_speed,
+            MIN(vis_min) as min_visibility,
+            SUM(rhu_avg) as rhu_avg_sum,
+            COUNT(rhu_avg) as rhu_avg_cnt
+        FROM {{table_name}}
+        WHERE station_name IN ({placeholders}) AND observation_time BETWEEN ? AND ?
+        GROUP BY station_name
+        """
+
+        async def run(partition: YearPartition) -> List[Dict[str, Any]]:
+            params = regions + [f"{partition.start_date} 00:00:00.000", f"{partition.end_date} 23:59:59.999"]
+            rows, description = await self._fetch(sql.format(table_name=partition.table_name), params)
+            columns = [col[0] for col in description]
+            return [dict(zip(columns, row)) for row in rows]
+
+        try:
+            partials = await asyncio.gather(*[run(p) for p in partitions])
+        except Exception as e:
+            self.logger.error(f"查询日表天气指标数据失败(跨年 {[p.table_name for p in partitions]}): {e}")
+            return None
+        return merge_partial_aggregates(partials, "station_name", {
+            "avg_temp": ("avg", "tem_avg_sum", "tem_avg_cnt"),
+            "min_temp": ("min", "min_temp"),
+            "max_temp": ("max", "max_temp"),
+            "total_precip": ("sum", "total_precip"),
+            "max_wind_speed": ("max", "max_wind_speed"),
+            "min_visibility": ("min", "min_visibility"),
+            "avg_humidity": ("avg", "rhu_avg_sum", "rhu_avg_cnt"),
+        })
     
     async def query_detailed_weather_from_dayTable(self,  regions: List[str],  start_date: str,  end_date: str, detail_level: str = "standard") -> List[Dict[str, Any]]:
         """
@@ -98,12 +349,8 @@ class SQLServerConnector(DBConnector):
             'extreme' - 极端天气相关
         """
         placeholders = ",".join(["?"] * len(regions))
-        year = start_date[:4]
-        table_name = f"automatic_station_his_day_data_{year}"
-        
-        start_datetime = f"{start_date} 00:00:00"
-        end_datetime = f"{end_date} 23:59:59"
-        params = regions + [start_datetime, end_datetime]
+        # 跨年范围按年份日表拆分，各分区并发查询后按 站点/时间 顺序拼接
+        partitions = year_partitions(start_date, end_date)
         
         if detail_level == "standard":
             sql = f"""
@@ -141,7 +388,7 @@ class SQLServerConnector(DBConnector):
                     ELSE ''
                 END as weather_desc
                 
-            FROM {table_name}
+            FROM {{table_name}}
             WHERE station_name IN ({placeholders}) 
             AND observation_time BETWEEN ? AND ?
             ORDER BY station_name, observation_time
@@ -226,7 +473,7 @@ class SQLServerConnector(DBConnector):
                     ELSE ''
                 END as has_thunder
                 
-            FROM {table_name}
+            FROM {{table_name}}
             WHERE station_name IN ({placeholders}) 
             AND observation_time BETWEEN ? AND ?
             ORDER BY station_name, observation_time
@@ -300,65 +547,38 @@ class SQLServerConnector(DBConnector):
                 CASE WHEN thunder IS NOT NULL AND thunder != '' THEN 1 ELSE 0 END as thunder_flag,
                 CASE WHEN glaze IS NOT NULL AND glaze != '' THEN 1 ELSE 0 END as glaze_flag
                 
-            FROM {table_name}
+            FROM {{table_name}}
             WHERE station_name IN ({placeholders}) 
             AND observation_time BETWEEN ? AND ?
             ORDER BY station_name, observation_time
             """
         
-        try:
-            async with self.pool.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(sql, params)
-                    rows = await cursor.fetchall()
-                    
-                    if not rows:
-                        self.logger.warning(f"日表未找到数据: regions={regions}, date={start_date}~{end_date}")
-                        return []
-                    
-                    columns = [col[0] for col in cursor.description]
-                    results = []
-                    
-                    for row in rows:
-                        record = {}
-                        for col_name, value in zip(columns, row):
-                            # 处理特殊值
-                            if col_name in ["min_visibility", "vis_min"] and value == 999999:
-                                record[col_name] = 10000
-                            elif value is None:
-                                if any(keyword in col_name for keyword in ["precip", "rain", "prcp"]):
-                                    record[col_name] = 0.0
-                                elif "temp" in col_name or "tem" in col_name:
-                                    record[col_name] = 0.0 if "_time" not in col_name else None
-                                elif "wind" in col_name or "win" in col_name:
-                                    record[col_name] = 0.0 if "_time" not in col_name else None
-                                elif "visibility" in col_name or "vis" in col_name:
-                                    record[col_name] = 10000 if "_time" not in col_name else None
-                                elif "humidity" in col_name or "rhu" in col_name:
-                                    record[col_name] = None
-                                elif "time" in col_name or "otime" in col_name:
-                                    record[col_name] = None
-                                else:
-                                    record[col_name] = None
-                            elif isinstance(value, Decimal):
-                                record[col_name] = float(value)
-                            elif isinstance(value, datetime.datetime):
-                                record[col_name] = value.strftime("%Y-%m-%d %H:%M:%S")
-                            elif isinstance(value, datetime.date):
-                                record[col_name] = value.strftime("%Y-%m-%d")
-                            else:
-                                record[col_name] = value
-                        record["data_source"] = "day_table"
-                        record["table_name"] = table_name
-                        
-                        results.append(record)
-                    return results
-                    
-        except Exception as e:
-            self.logger.error(f"查询日表数据失败: {e}")
-            if "doesn't exist" in str(e) or "no such table" in str(e):
-                self.logger.warning(f"表 {table_name} 不存在")
-            raise
+        async def run(partition: YearPartition) -> List[Dict[str, Any]]:
+            table_name = partition.table_name
+            params = regions + [f"{partition.start_date} 00:00:00", f"{partition.end_date} 23:59:59"]
+            try:
+                rows, description = await self._fetch(sql.format(table_name=table_name), params)
+            except Exception as e:
+                self.logger.error(f"查询日表数据失败: {e}")
+                if "doesn't exist" in str(e) or "no such table" in str(e):
+                    self.logger.warning(f"表 {table_name} 不存在")
+                raise
+            return DAY_TABLE_NORMALIZER.normalize(
+                rows, description,
+                extra={"data_source": "day_table", "table_name": table_name}
+            )
+
+        parts = await asyncio.gather(*[run(p) for p in partitions])
+        if len(parts) == 1:
+            results = parts[0]
+        else:
+            # 每个分区内已按 station_name, observation_time 排序(数据库排序规则，如中文拼音)；站点顺序取自分区自身的顺序，
+            # 不按 Python 码点重排，稳定排序按站点归并即可保持时间顺序
+            rank = {station: i for i, station in enumerate(merge_station_order(parts))}
+            results = sorted((row for part in parts for row in part), key=lambda row: rank[row.get("station_name")])
+        if not results:
+            self.logger.warning(f"日表未找到数据: regions={regions}, date={start_date}~{end_date}")
+        return results
         
     async def query_detailed_weather_from_hourTable(self, regions: List[str], start_date: str, end_date: str,aggregation: str = "hourly", station_name_to_cnty: bool = False) -> List[Dict[str, Any]]:
         """
@@ -369,65 +589,75 @@ class SQLServerConnector(DBConnector):
         station_name_to_cnty: 是否要将station_name转换成对应的区/县
         """
         placeholders = ",".join(["?"] * len(regions))
-        start_datetime = f"{start_date} 00:00:00"
-        end_datetime = f"{end_date} 23:59:59"
-        params = regions + [start_datetime, end_datetime]
-        table_name = f"automatic_station_data"
         key_county = "by_county" if station_name_to_cnty else "by_station"
-        sql = SQL_TEMPLATE["hour_table"][aggregation][key_county].format(
-            table_name=table_name, placeholders=placeholders
-        )
+        if aggregation in ROLLUP_TABLES and self.rollups.covers(start_date, end_date):
+            # 上午/下午、逐日聚合直接读汇总表，不再对原始小时数据做两级 GROUP BY
+            self.rollups.routed += 1
+            table_name = ROLLUP_TABLES[aggregation]
+            params = regions + [start_date, end_date]
+            sql = SQL_TEMPLATE["rollup"][aggregation][key_county].format(
+                table_name=table_name, placeholders=placeholders
+            )
+        else:
+            if aggregation in ROLLUP_TABLES and self.rollups.enabled:
+                self.rollups.fallbacks += 1
+            start_datetime = f"{start_date} 00:00:00"
+            end_datetime = f"{end_date} 23:59:59"
+            params = regions + [start_datetime, end_datetime]
+            table_name = f"automatic_station_data"
+            sql = SQL_TEMPLATE["hour_table"][aggregation][key_county].format(
+                table_name=table_name, placeholders=placeholders
+            )
 
         try:
-            async with self.pool.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(sql, params)
-                    rows = await cursor.fetchall()
-                    if not rows:
-                        self.logger.warning(f"未找到数据: regions={regions}, date={start_date}~{end_date}")
-                        return []
-                    columns = [col[0] for col in cursor.description]
-                    results = []
-                    for row in rows:
-                        record = {}
-                        for col_name, value in zip(columns, row):
-                            # 特殊值处理
-                            if col_name in ["日平均水平能见度", "平均水平能见度"] and value == 999999:
-                                record[col_name] = 10000
-                            elif value is None:
-                                if "降水" in col_name:
-                                    record[col_name] = 0.0
-                                elif "温度" in col_name:
-                                    record[col_name] = 0.0
-                                elif "风速" in col_name:
-                                    record[col_name] = 0.0
-                                elif "能见度" in col_name:
-                                    record[col_name] = 10000
-                                elif "湿度" in col_name:
-                                    record[col_name] = None
-                                else:
-                                    record[col_name] = None
-                            elif isinstance(value, Decimal):
-                                record[col_name] = float(value)
-                            elif isinstance(value, datetime.datetime):
-                                record[col_name] = value.strftime("%Y-%m-%d %H:%M:%S")
-                            elif isinstance(value, datetime.date):
-                                record[col_name] = value.strftime("%Y-%m-%d")
-                            else:
-                                record[col_name] = value
-                        results.append(record)
-                    
-                    self.logger.info(f"The query returned {len(results)} records of \"{aggregation}\".")
-                    return results
-                    
+            rows, description = await self._fetch(sql, params)
+            if not rows:
+                self.logger.warning(f"未找到数据: regions={regions}, date={start_date}~{end_date}")
+                return []
+            results = HOUR_TABLE_NORMALIZER.normalize(rows, description)
+            self.logger.info(f"The query returned {len(results)} records of \"{aggregation}\".")
+            return results
+
         except Exception as e:
             self.logger.error(f"查询{aggregation}数据失败: {e}")
             if "doesn't exist" in str(e) or "no such table" in str(e):
                 self.logger.warning(f"表 {table_name} 不存在，尝试其他表名格式...")
             raise
         
+    async def stream_hourly_weather_from_hourTable(self, regions: List[str], start_date: str, end_date: str,
+                                                   batch_size: int = 5000, normalize_nulls: bool = True) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        流式读取小时表逐小时数据: fetchmany 分批取回, 每批规整后 yield, 内存占用与时间跨度无关
+        normalize_nulls: True 时按小时表规则填充空值; False 时只做类型转换、保留 NULL(供应用侧聚合)
+        """
+        placeholders = ",".join(["?"] * len(regions))
+        params = regions + [f"{start_date} 00:00:00", f"{end_date} 23:59:59"]
+        table_name = "automatic_station_data"
+        sql = SQL_TEMPLATE["hour_table"]["stream"].format(table_name=table_name, placeholders=placeholders)
+        normalizer = HOUR_TABLE_NORMALIZER if normalize_nulls else TYPE_ONLY_NORMALIZER
+        if not self.pool:
+            await self.connect()
+
+        total = 0
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
+                    while True:
+                        rows = await cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        total += len(rows)
+                        yield normalizer.normalize(rows, cursor.description)
+        except Exception as e:
+            self.logger.error(f"流式查询小时表数据失败: {e}")
+            raise
+        self.logger.info(f"The hourly stream returned {total} records.")
+
     async def query_cnty_by_regions(self, regions: List[str]) -> List[str]:
-        """根据 station_name 查询对应的区县"""
+        """根据 station_name 查询对应的区县: 优先走内存站点索引，索引中缺失站点时回退到数据库查询"""
+        if self.station_index.loaded and all(self.station_index.cnty_of(r) for r in regions):
+            return self.station_index.counties_for(regions)
         table_name = f"automatic_station_data"
         placeholders = ",".join(["?"] * len(regions))
         params = regions
@@ -440,15 +670,11 @@ class SQLServerConnector(DBConnector):
         AND cnty <> ''
         """
         try:
-            async with self.pool.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(sql, params)
-                    rows = await cursor.fetchall()
-
-                    if not rows:
-                        raise
-                    cnty_list = [row[0] for row in rows if row[0]]
-                    return cnty_list
+            rows, _ = await self._fetch(sql, params)
+            if not rows:
+                raise
+            cnty_list = [row[0] for row in rows if row[0]]
+            return cnty_list
 
         except Exception as e:
             raise
@@ -458,7 +684,10 @@ class SQLServerConnector(DBConnector):
         获取指定日期范围（忽略年份）在所有历史表中出现过的站点名称
         start_date: YYYY-MM-DD
         end_date: YYYY-MM-DD
+        已构建站点可用性位图时直接从内存返回，否则回退到跨年份表 UNION 查询
         """
+        if self.availability_index.loaded:
+            return self.availability_index.stations_for(start_date, end_date)
         try:
             start_dt = datetime.datetime.strptime(start_date, "%Y-%m-%d")
             end_dt = datetime.datetime.strptime(end_date, "%Y-%m-%d")
@@ -478,14 +707,8 @@ class SQLServerConnector(DBConnector):
             WHERE table_name LIKE 'automatic_station_his_day_data_%'
             """
             
-            if not self.pool:
-                await self.connect()
-
-            async with self.pool.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(check_tables_sql)
-                    rows = await cursor.fetchall()
-                    existing_tables = set(row[0] for row in rows)
+            rows, _ = await self._fetch(check_tables_sql)
+            existing_tables = set(row[0] for row in rows)
             
             # 2. 构建查询
             union_parts = []
@@ -502,11 +725,8 @@ class SQLServerConnector(DBConnector):
             full_sql = " UNION ".join(union_parts)
             final_sql = f"SELECT DISTINCT station_name FROM ({full_sql}) AS T ORDER BY station_name"
             
-            async with self.pool.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(final_sql)
-                    rows = await cursor.fetchall()
-                    return [row[0] for row in rows if row[0]]
+            rows, _ = await self._fetch(final_sql)
+            return [row[0] for row in rows if row[0]]
 
         except Exception as e:
             self.logger.error(f"获取站点列表失败: {e}")
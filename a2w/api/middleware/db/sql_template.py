@@ -170,9 +170,110 @@ GROUP BY cnty, 日期
 ORDER BY cnty, 日期;
 """
 
+# 小时表逐小时原始数据(带区县, 不做ROUND), 供流式读取后在应用侧增量聚合
+TABLE_HOUR_HOURLY_STREAM: str = """
+SELECT
+    station_name,
+    cnty,
+    observation_time,
+    temperature AS 气温,
+    pressure AS 气压,
+    pressure_sea AS 海平面气压,
+    relative_humidity AS 相对湿度,
+    rainfall AS 降水量,
+    wind_speed AS 风速,
+    visibility AS 水平能见度
+FROM {table_name}
+WHERE station_name IN ({placeholders})
+AND observation_time >= ?
+AND observation_time <= ?
+ORDER BY station_name, observation_time
+"""
+
+# ---- 汇总表(rollup) ----
+# 汇总表按 站点-日期(-时段) 保存已 ROUND 的站点聚合值，由 rollup.RollupManager 从小时表增量维护。
+# 查询输出列名与上面的 TABLE_HOUR_HALF(_CNTY) / TABLE_HOUR_DAY(_CNTY) 完全一致；
+# 按县查询时对站点值再求 AVG/SUM 并 ROUND，与原模板两级 GROUP BY 的口径相同
+ROLLUP_HALF: str = """
+SELECT
+    station_name,
+    obs_date AS 日期,
+    period AS 时段,
+    temperature AS 平均温度,
+    pressure AS 平均气压,
+    pressure_sea AS 平均海平面气压,
+    relative_humidity AS 平均相对湿度,
+    rainfall AS 总降水量,
+    wind_speed AS 平均风速,
+    visibility AS 平均水平能见度
+FROM {table_name}
+WHERE station_name IN ({placeholders})
+AND obs_date >= ?
+AND obs_date <= ?
+ORDER BY station_name, obs_date, period
+"""
+
+ROLLUP_HALF_CNTY: str = """
+SELECT
+    cnty AS 站名,
+    obs_date AS 日期,
+    period AS 时段,
+    ROUND(AVG(temperature), 1) AS 平均温度,
+    ROUND(AVG(pressure), 1) AS 平均气压,
+    ROUND(AVG(pressure_sea), 1) AS 平均海平面气压,
+    ROUND(AVG(relative_humidity), 1) AS 平均相对湿度,
+    ROUND(SUM(rainfall), 1) AS 总降水量,
+    ROUND(AVG(wind_speed), 1) AS 平均风速,
+    ROUND(AVG(visibility), 1) AS 平均水平能见度
+FROM {table_name}
+WHERE station_name IN ({placeholders})
+AND obs_date >= ?
+AND obs_date <= ?
+GROUP BY cnty, obs_date, period
+ORDER BY cnty, obs_date, period
+"""
+
+ROLLUP_DAY: str = """
+SELECT
+    station_name,
+    obs_date AS 日期,
+    temperature AS 日平均温度,
+    pressure AS 日平均气压,
+    pressure_sea AS 日平均海平面雅琪,
+    relative_humidity AS 日平均相对湿度,
+    rainfall AS 日平均降水量,
+    wind_speed AS 日平均风速,
+    visibility AS 日平均水平能见度
+FROM {table_name}
+WHERE station_name IN ({placeholders})
+AND obs_date >= ?
+AND obs_date <= ?
+ORDER BY station_name, obs_date
+"""
+
+ROLLUP_DAY_CNTY: str = """
+SELECT
+    cnty AS 站名,
+    obs_date AS 日期,
+    ROUND(AVG(temperature), 1) AS 日平均温度,
+    ROUND(AVG(pressure), 1) AS 日平均气压,
+    ROUND(AVG(pressure_sea), 1) AS 日平均海平面气压,
+    ROUND(AVG(relative_humidity), 1) AS 日平均相对湿度,
+    ROUND(SUM(rainfall), 1) AS 日降水量,
+    ROUND(AVG(wind_speed), 1) AS 日平均风速,
+    ROUND(AVG(visibility), 1) AS 日平均水平能见度
+FROM {table_name}
+WHERE station_name IN ({placeholders})
+AND obs_date >= ?
+AND obs_date <= ?
+GROUP BY cnty, obs_date
+ORDER BY cnty, obs_date
+"""
+
 
 SQL_TEMPLATE = {
     "hour_table": {
+        "stream": TABLE_HOUR_HOURLY_STREAM,
         "hourly": {
             "by_station": TABLE_HOUR_HOURLY,
             "by_county": TABLE_HOUR_HOURLY_CNTY
@@ -185,5 +286,15 @@ SQL_TEMPLATE = {
             "by_station": TABLE_HOUR_DAY,
             "by_county": TABLE_HOUR_DAY_CNTY
         }
+    },
+    "rollup": {
+        "half": {
+            "by_station": ROLLUP_HALF,
+            "by_county": ROLLUP_HALF_CNTY
+        },
+        "daily": {
+            "by_station": ROLLUP_DAY,
+            "by_county": ROLLUP_DAY_CNTY
+        }
     }
 }
\ No newline at end of file
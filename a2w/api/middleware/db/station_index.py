@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Set, TYPE_CHECKING
+
+from a2w.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from .base_db import DBConnector
+
+STATION_META_SQL: str = """
+SELECT DISTINCT station_name, city, cnty
+FROM automatic_station_data
+WHERE station_name IS NOT NULL AND station_name <> ''
+"""
+
+
+class StationIndex:
+    """
+    站点元数据内存索引: station -> cnty / city, cnty -> stations
+    站点与区县的对应关系基本不变，启动时加载一次，之后后台定期刷新；invalidate() 用于显式触发重新加载。
+    重新加载期间继续使用旧索引，新索引构建完成后整体替换
+    """
+    def __init__(self, db: "DBConnector", refresh_interval: float = 3600.0):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.logger = setup_logger(name="StationIndex")
+        self._station_to_cnty: Dict[str, str] = {}
+        self._station_to_city: Dict[str, str] = {}
+        self._cnty_to_stations: Dict[str, List[str]] = {}
+        self._city_to_cntys: Dict[str, List[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._stale = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._reload_event = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    async def load(self) -> bool:
+        async with self._lock:
+            rows = await self.db.execute_query(STATION_META_SQL, bypass_cache=True)
+            if rows is None:
+                self.logger.error("Station index load failed, keep the previous index.")
+                return False
+            station_to_cnty, station_to_city = {}, {}
+            cnty_to_stations: Dict[str, List[str]] = {}
+            city_to_cntys: Dict[str, List[str]] = {}
+            for row in rows:
+                station, city, cnty = row.get("station_name"), row.get("city"), row.get("cnty")
+                if cnty:
+                    station_to_cnty.setdefault(station, cnty)
+                    stations = cnty_to_stations.setdefault(cnty, [])
+                    if station not in stations:
+                        stations.append(station)
+                if city:
+                    station_to_city.setdefault(station, city)
+                    if cnty and cnty not in city_to_cntys.setdefault(city, []):
+                        city_to_cntys[city].append(cnty)
+            # 整体替换引用，读者不会看到半更新的索引
+            self._station_to_cnty, self._station_to_city = station_to_cnty, station_to_city
+            self._cnty_to_stations, self._city_to_cntys = cnty_to_stations, city_to_cntys
+            self._loaded_at = time.time()
+            self._stale = False
+            self.logger.info(f"Station index loaded: {len(station_to_cnty)} stations, {len(cnty_to_stations)} counties.")
+            return True
+
+    def invalidate(self) -> None:
+        """显式失效：后台刷新任务立即重新加载(未启动后台任务时由下一次 ensure_loaded 加载)，加载完成前仍使用旧索引"""
+        self._stale = True
+        self._reload_event.set()
+
+    async def ensure_loaded(self) -> None:
+        if not self.loaded or self._stale:
+            await self.load()
+
+    def start_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            timeout = self.refresh_interval if self.refresh_interval > 0 else None
+            try:
+                await asyncio.wait_for(self._reload_event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._reload_event.clear()
+            try:
+                await self.load()
+            except Exception as e:
+                self.logger.error(f"Station index refresh failed: {e}")
+
+    # ---- lookups ----
+    def cnty_of(self, station_name: str) -> Optional[str]:
+        return self._station_to_cnty.get(station_name)
+
+    def city_of(self, station_name: str) -> Optional[str]:
+        return self._station_to_city.get(station_name)
+
+    def stations_in(self, cnty: str) -> List[str]:
+        return list(self._cnty_to_stations.get(cnty, []))
+
+    def cntys_in_city(self, city: str) -> List[str]:
+        return list(self._city_to_cntys.get(city, []))
+
+    def counties_for(self, station_names: Iterable[str]) -> List[str]:
+        """按输入站点顺序返回去重后的区县列表，未知站点忽略"""
+        seen: Set[str] = set()
+        result = []
+        for station in station_names:
+            cnty = self._station_to_cnty.get(station)
+            if cnty and cnty not in seen:
+                seen.add(cnty)
+                result.append(cnty)
+        return result
+
+    def cntys_matching(self, name: str) -> List[str]:
+        """
+        与 city LIKE '%name%' OR cnty LIKE '%name%' 对应的区县精确取值: 名称包含 name 的区县，
+        以及名称包含 name 的城市下的全部区县(去重、保持索引顺序)
+        """
+        result = [cnty for cnty in self._cnty_to_stations if name in cnty]
+        for city, cntys in self._city_to_cntys.items():
+            if name in city:
+                result.extend(cnty for cnty in cntys if cnty not in result)
+        return result
+
+    def is_station(self, name: str) -> bool:
+        return name in self._station_to_cnty or name in self._station_to_city
+
+    def is_cnty(self, name: str) -> bool:
+        return name in self._cnty_to_stations
+
+    def is_city(self, name: str) -> bool:
+        return name in self._city_to_cntys
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "loaded": self.loaded,
+            "loaded_at": self._loaded_at,
+            "stations": len(self._station_to_cnty),
+            "counties": len(self._cnty_to_stations),
+            "refresh_interval": self.refresh_interval,
+        }
@@ -37,6 +37,11 @@ class SmwRequest(BaseModel):
         "",
         description="如果依赖于前序结果 必须提供摘要文本"
     )
+    run_id: Optional[str] = Field(
+        None,
+        description="呈阅件运行 id(由 /smw/WeatherReport 的 metadata.run_id 返回): 总接口传入时从该次运行最后成功的环节继续；"
+                    "单环节接口传入时复用该次运行已生成的上游环节"
+    )
     @field_validator("start_date", "end_date", mode="before")
     @classmethod
     def parse_datetime(cls, v):
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from a2w.smw.executors import WeatherReportWorkflow
+from a2w.smw.executors.weather_report_executor import SECTION_NODES
+from a2w.smw.agents.state import SmwReturn
+from a2w.utils.logger import setup_logger
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCESS = "success"
+FAILED = "failed"
+
+JOB_DDL = """
+CREATE TABLE IF NOT EXISTS smw_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    progress TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+@dataclass
+class JobConfig:
+    enabled: bool = True
+    db_path: str = "data/local/a2w_jobs.db"   # 任务与结果持久化的本地 SQLite 文件
+    workers: int = 2                          # 同时执行的呈阅件任务数
+    queue_size: int = 100                     # 排队上限, 超出时拒绝新任务
+    retention_days: float = 7.0               # 已结束任务的保留天数, <=0 表示不清理
+
+    @classmethod
+    def from_global_config(cls, config) -> "JobConfig":
+        return cls(
+            enabled=bool(config.get("job_enabled", cls.enabled)),
+            db_path=str(config.get("job_db_path", cls.db_path)),
+            workers=int(config.get("job_workers", cls.workers)),
+            queue_size=int(config.get("job_queue_size", cls.queue_size)),
+            retention_days=float(config.get("job_retention_days", cls.retention_days)),
+        )
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobStore:
+    """smw_jobs 表的读写；sqlite3 是同步接口，统一放到线程里执行，单连接上的操作由锁串行化"""
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(JOB_DDL)
+        self._conn.commit()
+
+    async def _run(self, sql: str, params: tuple = (), fetch: bool = False) -> List[sqlite3.Row]:
+        def work():
+            cursor = self._conn.execute(sql, params)
+            rows = cursor.fetchall() if fetch else []
+            self._conn.commit()
+            return rows
+        async with self._lock:
+            return await asyncio.to_thread(work)
+
+    async def open(self) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._open)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._conn is not None:
+                await asyncio.to_thread(self._conn.close)
+                self._conn = None
+
+    async def insert(self, job_id: str, request: Dict[str, Any], progress: Dict[str, str]) -> None:
+        await self._run(
+            "INSERT INTO smw_jobs (job_id, status, request, progress, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(request, ensure_ascii=False), json.dumps(progress), time.time())
+        )
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        columns = []
+        values = []
+        for name, value in fields.items():
+            columns.append(f"{name} = ?")
+            values.append(json.dumps(value, ensure_ascii=False, default=str) if name in ("progress", "result") else value)
+        await self._run(f"UPDATE smw_jobs SET {', '.join(columns)} WHERE job_id = ?", (*values, job_id))
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run("SELECT * FROM smw_jobs WHERE job_id = ?", (job_id,), fetch=True)
+        if not rows:
+            return None
+        row = dict(rows[0])
+        for name in ("request", "progress", "result"):
+            row[name] = json.loads(row[name]) if row[name] else None
+        return row
+
+    async def unfinished(self) -> List[Dict[str, Any]]:
+        rows = await self._run(
+            "SELECT job_id, request FROM smw_jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING), fetch=True
+        )
+        return [{"job_id": row["job_id"], "request": json.loads(row["request"])} for row in rows]
+
+    async def purge(self, before: float) -> None:
+        await self._run("DELETE FROM smw_jobs WHERE status IN (?, ?) AND finished_at < ?", (SUCCESS, FAILED, before))
+
+
+class JobManager:
+    """
+    呈阅件异步任务: POST 只入队并返回 job_id，固定数量的 worker 从有界队列中取任务执行 WeatherReportWorkflow；
+    各环节未开始时为 queued，开始执行时记为 running，完成后更新为该环节的状态，最终结果(SmwReturn)写入本地 SQLite。
+    job_id 同时作为工作流的 run_id: 服务重启后未完成(排队中/执行中)的任务重新入队，启用检查点时从最后成功的环节继续
+    """
+    def __init__(self, workflow: WeatherReportWorkflow, config: Optional[JobConfig] = None):
+        self.workflow = workflow
+        self.config = config or JobConfig()
+        self.store = JobStore(self.config.db_path)
+        self.logger = setup_logger(name="JobManager")
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if not self.config.enabled or self._workers:
+            return
+        await self.store.open()
+        if self.config.retention_days > 0:
+            await self.store.purge(time.time() - self.config.retention_days * 86400)
+        self._queue = asyncio.Queue()
+        resumed = await self.store.unfinished()
+        for job in resumed:
+            await self.store.update(job["job_id"], status=QUEUED, started_at=None)
+            self._queue.put_nowait((job["job_id"], job["request"]))
+        if resumed:
+            self.logger.info(f"Resumed {len(resumed)} unfinished jobs")
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(max(1, self.config.workers))]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        await self.store.close()
+
+    async def submit(self, request: Dict[str, Any]) -> str:
+        if not self._workers:
+            raise RuntimeError("job manager is not running")
+        if self._queue.qsize() >= self.config.queue_size:
+            raise JobQueueFull(f"job queue is full ({self.config.queue_size} queued)")
+        job_id = uuid.uuid4().hex
+        await self.store.insert(job_id, request, {key: QUEUED for key in SECTION_NODES.values()})
+        self._queue.put_nowait((job_id, request))
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await self.store.get(job_id)
+        if job is not None and job["status"] == QUEUED:
+            job["queue_size"] = self._queue.qsize() if self._queue is not None else None
+        return job
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id, request = await self._queue.get()
+            try:
+                await self._execute(job_id, request)
+            except asyncio.CancelledError:
+                # 服务关闭: 任务保持 running 状态，下次启动时重新入队
+                raise
+            except Exception as e:
+                self.logger.error(f"Job {job_id} failed in worker {index}: {e}")
+                await self.store.update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job_id: str, request: Dict[str, Any]) -> None:
+        progress = {key: QUEUED for key in SECTION_NODES.values()}
+        await self.store.update(job_id, status=RUNNING, progress=progress, started_at=time.time())
+        async for event in self.workflow.stream(user_input=request, run_id=job_id):
+            if event["event"] == "start":
+                progress[event["section"]] = RUNNING
+                await self.store.update(job_id, progress=progress)
+            elif event["event"] == "section":
+                progress[event["section"]] = event["data"].get("status") or SUCCESS
+                await self.store.update(job_id, progress=progress)
+            elif event["event"] == "done":
+                for key, state in progress.items():
+                    if state == RUNNING:
+                        progress[key] = FAILED
+                result = SmwReturn(status=event["status"], data=event["data"], error=event["error"],
+                                   meta_data={"duration": event["duration"], "run_id": event["run_id"]})
+                await self.store.update(job_id, status=event["status"], progress=progress, result=result.model_dump(),
+                                        error=event["error"], finished_at=time.time())
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from a2w.utils import setup_logger
 from a2w.smw.executors import WeatherReportWorkflow
 from a2w.smw.agents import HistoryWeatherAgent, ForecastWeatherAgent, SuggestionAgent, SummaryAgent, BriefAgent
@@ -6,6 +6,7 @@ from a2w.smw.agents.state import WeatherReportState
 from a2w.smw.managers.weather_classifier import WeatherClassifier
 from a2w.api.core import BusinessError, DependencyError
 from a2w.api.core.constants import BusinessErrorInformation
+from a2w.api.service.job_manager import JobManager
 
 class SmwService:
     def __init__(self):
@@ -18,9 +19,34 @@ class SmwService:
             "end_date": request.end_date,
             "station_names": request.station_names
         }
-        agent_result = await workflow.run(user_input=user_input)
+        agent_result = await workflow.run(user_input=user_input, run_id=request.run_id)
         return agent_result
 
+    @staticmethod
+    async def stream_weather_report(request, workflow: WeatherReportWorkflow, tokens: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        user_input = {
+            "task_type": request.task_type,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "station_names": request.station_names
+        }
+        async for event in workflow.stream(user_input=user_input, tokens=tokens, run_id=request.run_id):
+            yield event
+
+    @staticmethod
+    async def submit_weather_report_job(request, job_manager: JobManager) -> str:
+        user_input = {
+            "task_type": request.task_type,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "station_names": request.station_names
+        }
+        return await job_manager.submit(user_input)
+
+    @staticmethod
+    async def get_weather_report_job(job_id: str, job_manager: JobManager) -> Optional[Dict[str, Any]]:
+        return await job_manager.get(job_id)
+
     @staticmethod
     async def wr_history(request, workflow: HistoryWeatherAgent):
         metrics_data = await workflow.db.query_weather_metrics(
@@ -68,7 +94,29 @@ class SmwService:
         return agent_result.get("forecast")
 
     @staticmethod
-    async def wr_suggest(request, forecast_workflow: ForecastWeatherAgent, suggest_workflow: SuggestionAgent):
+    async def _cached_sections(request, report_workflow: Optional[WeatherReportWorkflow]) -> Dict[str, Dict[str, Any]]:
+        if report_workflow is None:
+            return {}
+        user_input = {
+            "task_type": request.task_type,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "station_names": request.station_names
+        }
+        return await report_workflow.get_sections(request.run_id, user_input)
+
+    @staticmethod
+    async def _fill_upstream(state: WeatherReportState, key: str, agent, cached: Dict[str, Dict[str, Any]]) -> None:
+        """上游环节: 优先复用 run_id 对应运行中已成功的结果，否则重新生成"""
+        if key in cached:
+            state[key] = dict(cached[key])
+        else:
+            agent_result = await agent.run(state)
+            state[key] = agent_result.get(key)
+
+    @staticmethod
+    async def wr_suggest(request, forecast_workflow: ForecastWeatherAgent, suggest_workflow: SuggestionAgent,
+                         report_workflow: Optional[WeatherReportWorkflow] = None):
         state = WeatherReportState(
             task_type="气象呈阅件",
             start_date=request.start_date,
@@ -88,13 +136,14 @@ class SmwService:
         if request.depends:
             state["forecast"]["response"] = request.forecast
         else:
-            forecast_result = await forecast_workflow.run(state)
-            state["forecast"] = forecast_result.get("forecast")
+            cached = await SmwService._cached_sections(request, report_workflow)
+            await SmwService._fill_upstream(state, "forecast", forecast_workflow, cached)
         agent_result = await suggest_workflow.run(state)
         return agent_result.get("suggestion")
 
     @staticmethod
-    async def wr_summary(request, forecast_workflow: ForecastWeatherAgent, suggest_workflow: SuggestionAgent, summary_workflow: SummaryAgent):
+    async def wr_summary(request, forecast_workflow: ForecastWeatherAgent, suggest_workflow: SuggestionAgent, summary_workflow: SummaryAgent,
+                         report_workflow: Optional[WeatherReportWorkflow] = None):
         state = WeatherReportState(
             task_type="气象呈阅件",
             start_date=request.start_date,
@@ -115,10 +164,9 @@ class SmwService:
             state["forecast"]["response"] = request.forecast
             state["suggestion"]["response"] = request.suggestion
         else:
-            forecast_result = await forecast_workflow.run(state)
-            state["forecast"] = forecast_result.get("forecast")
-            suggestion_result = await suggest_workflow.run(state)
-            state["suggestion"] = suggestion_result.get("suggestion")
+            cached = await SmwService._cached_sections(request, report_workflow)
+            await SmwService._fill_upstream(state, "forecast", forecast_workflow, cached)
+            await SmwService._fill_upstream(state, "suggestion", suggest_workflow, cached)
         agent_result = await summary_workflow.run(state)
         return agent_result.get("summary")
 
@@ -126,7 +174,8 @@ class SmwService:
     async def wr_brief(request, forecast_workflow: ForecastWeatherAgent,
                        suggest_workflow: SuggestionAgent,
                        summary_workflow: SummaryAgent,
-                       brief_workflow: BriefAgent):
+                       brief_workflow: BriefAgent,
+                       report_workflow: Optional[WeatherReportWorkflow] = None):
         state = WeatherReportState(
             task_type="气象呈阅件",
             start_date=request.start_date,
@@ -148,11 +197,9 @@ class SmwService:
             state["suggestion"]["response"] = request.suggestion
             state["summary"]["response"] = request.summary
         else:
-            forecast_result = await forecast_workflow.run(state)
-            state["forecast"] = forecast_result.get("forecast")
-            suggestion_result = await suggest_workflow.run(state)
-            state["suggestion"] = suggestion_result.get("suggestion")
-            summary_result = await summary_workflow.run(state)
-            state["summary"] = summary_result.get("summary")
+            cached = await SmwService._cached_sections(request, report_workflow)
+            await SmwService._fill_upstream(state, "forecast", forecast_workflow, cached)
+            await SmwService._fill_upstream(state, "suggestion", suggest_workflow, cached)
+            await SmwService._fill_upstream(state, "summary", summary_workflow, cached)
         agent_result = await brief_workflow.run(state)
         return agent_result.get("final_brief")
\ No newline at end of file
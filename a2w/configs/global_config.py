@@ -29,11 +29,48 @@ class GlobalConfig:
             "verbose": os.getenv("VERBOSE", "false").lower() == "true",
 
             # db配置
+            # sqlserver: 线上库; sqlite: 本地替身库(压测/基准测试, 见 pre_work/data_generate.py)
+            "db_backend": os.getenv("DB_BACKEND", "sqlserver").lower(),
+            "local_db_path": os.getenv("LOCAL_DB_PATH", "data/local/a2w_weather.db"),
             "db_host": os.getenv("DATABASE_HOST", "127.0.0.1"),
             "db_port": int(os.getenv("DATABASE_PORT", "1433")),
             "db_name": os.getenv("DATABASE_NAME", "A2W_YiChun"),
             "db_username": os.getenv("DATABASE_USERNAME", "sa"),
             "db_password": os.getenv("DATABASE_PASSWORD", "YourStrong!Passw0rd"),
+
+            # db连接池配置
+            "db_pool_min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "db_pool_max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "db_pool_acquire_timeout": float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10")),
+            "db_pool_max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+            "db_pool_prewarm": os.getenv("DB_POOL_PREWARM", "true").lower() == "true",
+            # 站点元数据索引后台刷新间隔(秒), <=0 表示只在显式失效时刷新
+            "station_index_refresh_interval": float(os.getenv("STATION_INDEX_REFRESH_INTERVAL", "3600")),
+            # 站点 x 月份可用性位图检查新年份表的间隔(秒)
+            "station_availability_refresh_interval": float(os.getenv("STATION_AVAILABILITY_REFRESH_INTERVAL", "3600")),
+            # 查询结果缓存: 往年日表永不过期, 当年日表/小时表按 TTL 过期; 内存层按字节 LRU, 可选磁盘层(diskcache)
+            "result_cache_enabled": os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true",
+            "result_cache_max_bytes": int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            "result_cache_current_ttl": float(os.getenv("RESULT_CACHE_CURRENT_TTL", "300")),
+            "result_cache_hour_ttl": float(os.getenv("RESULT_CACHE_HOUR_TTL", "60")),
+            "result_cache_disk_dir": os.getenv("RESULT_CACHE_DISK_DIR", ""),
+            "result_cache_disk_size_limit": int(os.getenv("RESULT_CACHE_DISK_SIZE_LIMIT", str(2 * 1024 * 1024 * 1024))),
+            # 小时表上午/下午、逐日汇总表: 定期增量重算最近 lookback_days 天; backfill_days=0 表示首次全量构建
+            "rollup_enabled": os.getenv("ROLLUP_ENABLED", "true").lower() == "true",
+            "rollup_refresh_interval": float(os.getenv("ROLLUP_REFRESH_INTERVAL", "300")),
+            "rollup_lookback_days": int(os.getenv("ROLLUP_LOOKBACK_DAYS", "3")),
+            "rollup_backfill_days": int(os.getenv("ROLLUP_BACKFILL_DAYS", "0")),
+            # 历年同期/气候值预计算库: 启动后及每个刷新周期补建新结束的年份, 全量重建见 pre_work/climatology_build.py
+            "climatology_enabled": os.getenv("CLIMATOLOGY_ENABLED", "true").lower() == "true",
+            "climatology_first_year": int(os.getenv("CLIMATOLOGY_FIRST_YEAR", "1961")),
+            "climatology_refresh_interval": float(os.getenv("CLIMATOLOGY_REFRESH_INTERVAL", "86400")),
+            "climatology_rebuild_concurrency": int(os.getenv("CLIMATOLOGY_REBUILD_CONCURRENCY", "2")),
+            # 呈阅件异步任务(/smw/jobs): 任务与结果持久化到本地 SQLite, 重启后未完成的任务重新执行
+            "job_enabled": os.getenv("JOB_ENABLED", "true").lower() == "true",
+            "job_db_path": os.getenv("JOB_DB_PATH", "data/local/a2w_jobs.db"),
+            "job_workers": int(os.getenv("JOB_WORKERS", "2")),
+            "job_queue_size": int(os.getenv("JOB_QUEUE_SIZE", "100")),
+            "job_retention_days": float(os.getenv("JOB_RETENTION_DAYS", "7")),
         }
     
     def get(self, key: str, default: Any = None) -> Any:
@@ -18,7 +18,24 @@ class SmwConfig:
             "smw_weather_classify_path": os.getenv("SMW_WEATHER_CLASSIFY_PATH", ""),
             # basecase data save path
             "badcase_data_path": os.getenv("BADCASE_DATA_PATH", ""),
-            
+            # forecast: 流式读取逐小时数据并在应用侧增量聚合(大时间跨度时内存有界)
+            "forecast_stream_hourly": os.getenv("SMW_FORECAST_STREAM_HOURLY", "false").lower() == "true",
+            "forecast_stream_batch_size": int(os.getenv("SMW_FORECAST_STREAM_BATCH_SIZE", "5000")),
+            # 呈阅件: 前期实况与预报两个分支并行执行
+            "parallel_branches": os.getenv("SMW_PARALLEL_BRANCHES", "true").lower() == "true",
+            # pecw: 子查询并发执行; 并发数<=0 时与数据库连接池大小一致; 单个子查询超时(秒), <=0 不限制
+            "pecw_parallel_tools": os.getenv("SMW_PECW_PARALLEL_TOOLS", "true").lower() == "true",
+            "pecw_tool_concurrency": int(os.getenv("SMW_PECW_TOOL_CONCURRENCY", "0")),
+            "pecw_tool_timeout": float(os.getenv("SMW_PECW_TOOL_TIMEOUT", "60")),
+            # pecw: 失败子查询的可解判断与重新规划合并为一次 LLM 调用; false 回退为两次调用
+            "pecw_single_call_recovery": os.getenv("SMW_PECW_SINGLE_CALL_RECOVERY", "true").lower() == "true",
+            # pecw: LLM 恢复之前先按错误特征做规则修复(参数校验失败/日期解析失败/工具名不存在)
+            "pecw_rule_repair": os.getenv("SMW_PECW_RULE_REPAIR", "true").lower() == "true",
+            # 呈阅件: 按 run_id 写入 LangGraph 检查点(本地 SQLite), 失败后用同一 run_id 从最后成功的环节续跑; 启动时只保留最近 max_runs 次运行
+            "checkpoint_enabled": os.getenv("SMW_CHECKPOINT_ENABLED", "true").lower() == "true",
+            "checkpoint_path": os.getenv("SMW_CHECKPOINT_PATH", "data/local/a2w_checkpoints.db"),
+            "checkpoint_max_runs": int(os.getenv("SMW_CHECKPOINT_MAX_RUNS", "1000")),
+
         }
     
     def get(self, key: str, default: Any = None) -> Any:
@@ -21,8 +21,16 @@ class BaseAgent(ABC):
         self.name = name
         self.config = config
         self.badcase_path = self.config.get("badcase_data_path")
-        available_tools = {tool.name: tool for tool in TOOLS}
-        self.pecw_agent = PECWAgent(tool_registry=available_tools, llm=self.llm)
+        self._pecw_agent: Optional[PECWAgent] = None
+
+    @property
+    def pecw_agent(self) -> PECWAgent:
+        # 只有需要数据查询的 agent 才会用到: 首次访问时构建(编译 StateGraph)，之后随 agent 实例复用；
+        # PECWAgent 无请求级状态，每次 run 的状态都在图状态里
+        if self._pecw_agent is None:
+            available_tools = {tool.name: tool for tool in TOOLS}
+            self._pecw_agent = PECWAgent(tool_registry=available_tools, llm=self.llm, config=self.config)
+        return self._pecw_agent
     
     @abstractmethod
     async def build_prompt(self) -> str:
@@ -6,6 +6,7 @@ from a2w.configs.smw_config import SmwConfig
 from a2w.smw.agents.state import WeatherReportState, StepStatus
 from a2w.smw.agents.base_agent import BaseAgent
 from a2w.api.middleware.db.base_db import DBConnector
+from a2w.smw.managers.hour_aggregator import HourlyAggregator
 from a2w.smw.templates.fixed_template.smw import SPECIFIC_WEATHER_TEMPLATE
 from a2w.smw.templates.weather_report import WR_PROMPT
 from a2w.smw.utils.smw_util import parse_think_content
@@ -32,13 +33,7 @@ class ForecastWeatherAgent(BaseAgent):
             # here we use a fixed template for recall.
             recall_template = SPECIFIC_WEATHER_TEMPLATE
             state["forecast"]["recall_template"] = recall_template
-            forecast_data = await self.db.query_detailed_weather_from_hourTable(
-                regions=state["station_names"],
-                start_date=state["start_date"],
-                end_date=state["end_date"],
-                aggregation="half", # optional["hourly", "half", "daily"]
-                station_name_to_cnty = True
-            )
+            forecast_data = await self.load_forecast_data(state)
             if not forecast_data:
                 state["forecast"]["sql_data"] = ""
                 self.logger.error("Forecast Weather Data Query is None")
@@ -64,6 +59,28 @@ class ForecastWeatherAgent(BaseAgent):
             raise
         return state
         
+    async def load_forecast_data(self, state: WeatherReportState):
+        if self.config is not None and self.config.get("forecast_stream_hourly"):
+            # 逐小时数据分批流入, 边读边聚合成 上午/下午-区县 粒度, 不在内存里保留原始小时行
+            aggregator = HourlyAggregator(aggregation="half", by_county=True)
+            async for batch in self.db.stream_hourly_weather_from_hourTable(
+                regions=state["station_names"],
+                start_date=state["start_date"],
+                end_date=state["end_date"],
+                batch_size=self.config.get("forecast_stream_batch_size", 5000),
+                normalize_nulls=False
+            ):
+                aggregator.add_batch(batch)
+            self.logger.info(f"Aggregated {aggregator.rows_seen} hourly rows from stream.")
+            return aggregator.result()
+        return await self.db.query_detailed_weather_from_hourTable(
+            regions=state["station_names"],
+            start_date=state["start_date"],
+            end_date=state["end_date"],
+            aggregation="half", # optional["hourly", "half", "daily"]
+            station_name_to_cnty = True
+        )
+
     async def call_llm(self, prompt: ChatPromptTemplate, state: WeatherReportState) -> str:
         try:
             chain = prompt | self.llm
@@ -18,7 +18,7 @@ from a2w.smw.templates.weather_report import WR_PROMPT
 # test environment
 from a2w.smw.agents.pecw.tool_executor import ToolExecutor
 from a2w.smw.utils.smw_util import parse_think_content, parse_json_util, normalize_subquery_params
-from a2w.smw.agents.pecw import SubQueryOutput
+from a2w.smw.agents.pecw import SubQueryOutput, to_plain_data
 
 
 
@@ -94,7 +94,7 @@ class HistoryWeatherAgent(BaseAgent):
             state["history"]["response"] = history_report
             state["history"]["think_response"] = think_text
             state["history"]["status"] = StepStatus.SUCCESS
-            state["history"]["sql_data"] = pecw_result
+            state["history"]["sql_data"] = to_plain_data(pecw_result)
             state["history"]["error"] = None
             self.logger.info("-"*60)
             self.logger.info(f"《The History Weather》:\n {history_report}")
@@ -1,4 +1,4 @@
 from .data_planner import DataPlanner
 from .tool_executor import ToolExecutor
 from .recovery_mechanism import RecoveryMechanism
-from .pecw_workflow import PECWAgent, SubQueryOutput
\ No newline at end of file
+from .pecw_workflow import PECWAgent, SubQueryOutput, to_plain_data
\ No newline at end of file
@@ -1,21 +1,40 @@
 import json
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields, is_dataclass
 from enum import Enum
 
 from langgraph.graph import StateGraph, END
 from langchain_openai.chat_models.base import BaseChatOpenAI
 
 from a2w.smw.funcalls import TOOLS
+from a2w.configs.smw_config import SmwConfig
 from a2w.utils.logger import setup_logger
 from a2w.smw.utils.smw_util import log_execution_time
-from .data_planner import DataPlanner, QueryPlan
+from .data_planner import DataPlanner, QueryPlan, SubQuery
 from .tool_executor import ToolExecutor, ExecutionResult
 from .recovery_mechanism import RecoveryMechanism, RecoveryOutput
+from .rule_repair import RuleRepairer, REPAIR_STATS
 from a2w.smw.utils.smw_util import remove_huoqu
 
 
+def to_plain_data(value: Any) -> Any:
+    """
+    PECW 结果中的 dataclass(QueryPlan、ExecutionResult 等) 转为 dict、Enum 转为取值；
+    写入呈阅件状态的 sql_data 只含基础类型，检查点可直接序列化与恢复
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        return {f.name: to_plain_data(getattr(value, f.name)) for f in fields(value)}
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {key: to_plain_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain_data(item) for item in value]
+    return value
+
+
 class WorkflowState(Enum):
     QUERY_NORMALIZATION = "query_normalization"
     DATA_PLANNING = "data_planning"
@@ -49,11 +68,19 @@ class SubQueryOutput:
 
 class PECWAgent:
     # init to BaseAgent
-    def __init__(self, llm: BaseChatOpenAI, tool_registry: Dict[str, Any] = None):
+    def __init__(self, llm: BaseChatOpenAI, tool_registry: Dict[str, Any] = None, config: SmwConfig = None):
         self.tool_registry = {tool.name: tool for tool in TOOLS}
         self.data_planner = DataPlanner(llm)
-        self.tool_executor = ToolExecutor(self.tool_registry)
-        self.recovery_mechanism = RecoveryMechanism(available_tools=tool_registry, llm=llm)
+        get = config.get if config is not None else (lambda key, default=None: default)
+        self.tool_executor = ToolExecutor(
+            self.tool_registry,
+            parallel=get("pecw_parallel_tools", True),
+            max_concurrency=get("pecw_tool_concurrency", 0),
+            timeout=get("pecw_tool_timeout", 60.0),
+        )
+        self.recovery_mechanism = RecoveryMechanism(available_tools=tool_registry, llm=llm,
+                                                    single_call=get("pecw_single_call_recovery", True))
+        self.rule_repairer = RuleRepairer(self.tool_registry) if get("pecw_rule_repair", True) else None
         self.workflow_graph = self._build_workflow()
         self.logger = setup_logger(name=__class__.__name__)
     
@@ -64,6 +91,7 @@ class PECWAgent:
         workflow.add_node("plan_data", self._plan_data_node)
         workflow.add_node("execute_tools", self._execute_tools_node)
         workflow.add_node("validate_results", self._validate_results_node)
+        workflow.add_node("rule_repair", self._rule_repair_node)
         workflow.add_node("recovery_action", self._recovery_action_node)
         workflow.add_node("organize_data", self._organize_data_node)
 
@@ -80,6 +108,14 @@ class PECWAgent:
         workflow.add_conditional_edges(
             "validate_results",
             self._route_after_validation,
+            {
+                "recovery": "rule_repair",
+                "end": "organize_data"
+            }
+        )
+        workflow.add_conditional_edges(
+            "rule_repair",
+            self._route_after_validation,
             {
                 "recovery": "recovery_action",
                 "end": "organize_data"
@@ -89,7 +125,7 @@ class PECWAgent:
             "recovery_action",
             self._route_before_recovery,
             {
-                "continue": "execute_tools",
+                "continue": "recovery_action",
                 "end": "organize_data"
             }
         )
@@ -118,38 +154,6 @@ class PECWAgent:
     
     @log_execution_time(func_name="ExecuteToolsNode")
     async def _execute_tools_node(self, state: AgentState) -> Dict[str, Any]:
-        if state.recovery_queue and len(state.recovery_queue) > 0:
-            # get first queue of the recovery queue 
-            current_recovery_item = state.recovery_queue[0]
-            target_sub_query = None
-            if state.query_plan and state.query_plan.sub_queries:
-                for sub_query in state.query_plan.sub_queries:
-                    if sub_query.id == current_recovery_item.query_id:
-                        target_sub_query = asdict(sub_query)
-                        break
-            result = None
-            if target_sub_query:
-                result = await self.tool_executor.execute(target_sub_query)
-                new_execution_results = []
-                # Refactor execution_results: New overwrites old, no change
-                for existing_result in state.execution_results:
-                    if existing_result.query_id != current_recovery_item.query_id:
-                        new_execution_results.append(existing_result)
-                new_execution_results.append(result)
-                if result.status == "success": # TODO success的时候 并且此时队列里面没有了东西 走到验证那里怎么办? ==> 交给跳转函数处理
-                    new_recovery_queue = state.recovery_queue[1:]
-                    return {
-                        "execution_results": new_execution_results,
-                        "recovery_queue": new_recovery_queue,
-                        "current_state": WorkflowState.VALIDATION
-                    }
-                else:
-                    return {
-                        "execution_results": new_execution_results,
-                        "current_state": WorkflowState.VALIDATION
-                    }
-            else:
-                raise ValueError(f"the target_sub_query is None, but expect it is not None: target_sub_query --> {target_sub_query}")
         sub_queries_dict = [asdict(sq) for sq in state.query_plan.sub_queries]
         results = await self.tool_executor.execute_batch(sub_queries_dict)
         return {
@@ -159,27 +163,6 @@ class PECWAgent:
     
     @log_execution_time(func_name="ValidateResultNode")
     def _validate_results_node(self, state: AgentState) -> Dict[str, Any]:
-        if state.recovery_queue and len(state.recovery_queue) > 0:
-            new_recovery_queue = []
-            for recovery_item in state.recovery_queue:
-                execution_result = None # 队列里面存在 且 在execution_results里面的 是需要处理的
-                if state.execution_results:
-                    for result in state.execution_results:
-                        if result.query_id == recovery_item.query_id:
-                            execution_result = result
-                            break
-                if execution_result:
-                    if execution_result.status == "success":
-                        pass
-                    else:
-                        new_recovery_queue.append(recovery_item)
-                else:
-                    raise IndexError("队列里面有的在执行结果里面一定得有 看看是哪里的逻辑出现了问题")
-            return {
-                "recovery_queue": new_recovery_queue,
-                "current_state": WorkflowState.VALIDATION
-            }
-        
         plan_dict = {
             "meta": state.query_plan.meta if state.query_plan.meta else {},
             "sub_queries": [asdict(sq) for sq in state.query_plan.sub_queries] if state.query_plan else []
@@ -194,73 +177,135 @@ class PECWAgent:
             "current_state": WorkflowState.VALIDATION
         }
     
+    @log_execution_time(func_name="RuleRepairNode")
+    async def _rule_repair_node(self, state: AgentState) -> Dict[str, Any]:
+        """
+        LLM 恢复之前先做确定性的规则修复(按错误特征: 参数校验失败/日期解析失败/工具名不存在)，修复后的子查询一起重新执行；
+        成功的移出队列，无规则适用或修复后仍失败的交给 recovery_action
+        """
+        if self.rule_repairer is None or not state.recovery_queue:
+            return {"current_state": WorkflowState.RECOVERY}
+        plan_by_id = {sub_query.id: sub_query for sub_query in state.query_plan.sub_queries}
+        repaired: Dict[str, SubQuery] = {}
+        for item in state.recovery_queue:
+            if item.query_id not in plan_by_id:
+                continue
+            outcome = self.rule_repairer.repair(item, plan_by_id[item.query_id], state.query_plan.meta)
+            if outcome is not None:
+                repaired[item.query_id], rules = outcome
+                self.rule_repairer.stats.record_rules(rules)
+                self.logger.info(f"Query_id={item.query_id} repaired by rules {rules}: {repaired[item.query_id]}")
+        if not repaired:
+            return {"current_state": WorkflowState.RECOVERY}
+
+        results = await self.tool_executor.execute_batch([asdict(sub_query) for sub_query in repaired.values()])
+        new_results = {result.query_id: result for result in results}
+        new_recovery_queue = []
+        for item in state.recovery_queue:
+            result = new_results.get(item.query_id)
+            if result is None:
+                new_recovery_queue.append(item)
+            elif result.status == "success" and result.exe_data_result is not None:
+                self.rule_repairer.stats.rule_repairs += 1
+            else:
+                # 以修复后的子查询及其错误信息继续交给 LLM
+                self.rule_repairer.stats.rule_escalations += 1
+                item.query_information = asdict(repaired[item.query_id])
+                item.error_information = result.error
+                new_recovery_queue.append(item)
+        updated_query_plan = QueryPlan(
+            meta=state.query_plan.meta,
+            sub_queries=[repaired.get(sub_query.id, sub_query) for sub_query in state.query_plan.sub_queries],
+            llm_response_meta=None,
+            status=state.query_plan.status
+        )
+        return {
+            "current_state": WorkflowState.RECOVERY,
+            "recovery_queue": new_recovery_queue,
+            "query_plan": updated_query_plan,
+            "execution_results": [new_results.get(r.query_id, r) for r in state.execution_results]
+        }
+
     @log_execution_time(func_name="RecoveryActionNode")
-    def _recovery_action_node(self, state: AgentState) -> Dict[str, Any]:
-        if not state.recovery_queue or len(state.recovery_queue) == 0:
-            return {
-                "queue_state": "no",
-                "current_state": WorkflowState.VALIDATION,
-            }
-        current_recovery_item = state.recovery_queue[0]
-        if current_recovery_item is None:
+    async def _recovery_action_node(self, state: AgentState) -> Dict[str, Any]:
+        """
+        队列中的失败子查询并发恢复: 每一项各自完成 可解判断 -> 生成重试子查询 -> 重新执行，全部结束后汇总；
+        重新执行仍失败的项留在队列中进入下一轮，不可解或超过重试次数的项从计划和执行结果中移除。
+        单项恢复过程出错(LLM 超时、返回无法解析等)只算该项本轮失败，不影响其它项的恢复结果
+        """
+        if not state.recovery_queue:
             return {
                 "queue_state": "no",
                 "current_state": WorkflowState.VALIDATION,
             }
+        self.logger.info(f"Processing Recovery Queue concurrently: {[item.query_id for item in state.recovery_queue]}")
+        outcomes = await asyncio.gather(
+            *(self._recover_item(item, state.query_plan) for item in state.recovery_queue),
+            return_exceptions=True
+        )
+        removed_ids = set()
+        new_sub_queries: Dict[str, SubQuery] = {}
+        new_results: Dict[str, ExecutionResult] = {}
+        new_recovery_queue = []
+        for item, outcome in zip(state.recovery_queue, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                self.logger.error(f"Query_id={item.query_id} recovery failed "
+                                  f"(attempt {item.retry_count}/{item.max_retries}): {type(outcome).__name__}: {outcome}")
+                if item.retry_count >= item.max_retries:
+                    removed_ids.add(item.query_id)
+                else:
+                    new_recovery_queue.append(item)
+                continue
+            new_sub_query, result = outcome
+            if new_sub_query is None:
+                removed_ids.add(item.query_id)
+                continue
+            new_sub_queries[item.query_id] = new_sub_query
+            new_results[item.query_id] = result
+            if result.status != "success":
+                new_recovery_queue.append(item)
+
+        updated_sub_queries = [
+            new_sub_queries.get(sub_query.id, sub_query)
+            for sub_query in state.query_plan.sub_queries if sub_query.id not in removed_ids
+        ]
+        updated_query_plan = QueryPlan(
+            meta=state.query_plan.meta,
+            sub_queries=updated_sub_queries,
+            llm_response_meta=None,
+            status=state.query_plan.status
+        )
+        # Refactor execution_results: New overwrites old, removed ones are dropped
+        updated_exe_results = [
+            new_results.get(existing_result.query_id, existing_result)
+            for existing_result in state.execution_results if existing_result.query_id not in removed_ids
+        ]
+        return {
+            "queue_state": "have" if new_recovery_queue else "no",
+            "current_state": WorkflowState.RECOVERY if new_recovery_queue else WorkflowState.VALIDATION,
+            "recovery_queue": new_recovery_queue,
+            "query_plan": updated_query_plan,
+            "execution_results": updated_exe_results
+        }
+
+    async def _recover_item(self, current_recovery_item: RecoveryOutput,
+                            query_plan: QueryPlan) -> Tuple[Optional[SubQuery], Optional[ExecutionResult]]:
+        """单个失败子查询的一轮恢复；返回 (None, None) 表示放弃该子查询"""
         if current_recovery_item.retry_count >= current_recovery_item.max_retries:
-            new_recovery_queue, new_query_plan, new_exe_results = self._remove_sub_query(state=state, current_recovery_item=current_recovery_item)
-            if len(new_recovery_queue) > 0:
-                queue_state = "have"
-            else:
-                queue_state = "no"
-            return {
-                "queue_state": queue_state,
-                "current_state": WorkflowState.VALIDATION,
-                "recovery_queue": new_recovery_queue,
-                "query_plan": new_query_plan,
-                "execution_results": new_exe_results
-            }
-        self.logger.info(f"{1/len(state.recovery_queue)*100}/% Processing Recovery Queue item: Query_id={current_recovery_item.query_id}, Retry={current_recovery_item.retry_count}")
+            return None, None
+        # 先计入本轮尝试: 即使本轮 LLM 调用出错，该项也不会无限重试
+        current_recovery_item.retry_count += 1
         self.logger.info(f"RecoverInformation: {current_recovery_item}")
-        is_solvable = self.recovery_mechanism.get_is_solvable(current_recovery_item=current_recovery_item) # TODO bool type -> to llm 都到recovery里面做
-        self.logger.info(f"this id is_solvable is : {is_solvable}")
-        if not is_solvable:
-            # 不可解situation
-            new_recovery_queue, new_query_plan, new_exe_results = self._remove_sub_query(state=state, current_recovery_item=current_recovery_item)
-            if len(new_recovery_queue) > 0:
-                queue_state = "have"
-            else:
-                queue_state = "no"
-            return {
-                "queue_state": queue_state,
-                "current_state": WorkflowState.VALIDATION,
-                "recovery_queue": new_recovery_queue,
-                "query_plan": new_query_plan,
-                "execution_results": new_exe_results
-            }
-        else:
-            new_sub_query = self.recovery_mechanism.generate_retry_result(current_recovery_item, state.query_plan)
-            current_recovery_item.retry_count += 1
-            updated_sub_queries = []
-            if state.query_plan and state.query_plan.sub_queries:
-                for sub_query in state.query_plan.sub_queries:
-                    if sub_query.id == current_recovery_item.query_id:
-                        updated_sub_queries.append(new_sub_query)
-                    else:
-                        updated_sub_queries.append(sub_query)
-            updated_query_plan = QueryPlan(
-                meta=state.query_plan.meta,
-                sub_queries=updated_sub_queries,
-                llm_response_meta=None,
-                status=state.query_plan.status
-            )
-            return {
-                "queue_state": "have",
-                "current_state": WorkflowState.TOOL_EXECUTION,
-                "recovery_queue": state.recovery_queue,
-                "query_plan": updated_query_plan,
-            }
-
+        new_sub_query = await self.recovery_mechanism.recover(current_recovery_item, query_plan)
+        self.logger.info(f"Query_id={current_recovery_item.query_id} is_solvable is : {new_sub_query is not None}")
+        if new_sub_query is None:
+            REPAIR_STATS.llm_unsolvable += 1
+            return None, None
+        REPAIR_STATS.llm_repairs += 1
+        result = await self.tool_executor.execute(asdict(new_sub_query))
+        return new_sub_query, result
 
     def _organize_data_node(self, state: AgentState) -> Dict[str, Any]:
         # For security reasons, a verification should be performed.
@@ -296,30 +341,13 @@ class PECWAgent:
             "current_state": WorkflowState.COMPLETED
         }
 
-    def _remove_sub_query(self, state: AgentState, current_recovery_item: RecoveryOutput):
-        new_recovery_queue = state.recovery_queue[1:]  # remove the recovery data
-        # remove the current subquery from the global subquery and exe_result.
-        new_sub_queries = []
-        new_exe_results = []
-        for sub_query in state.query_plan.sub_queries:
-            if sub_query.id != current_recovery_item.query_id:
-                new_sub_queries.append(sub_query)
-        new_query_plan = QueryPlan(meta=state.query_plan.meta, sub_queries=new_sub_queries, llm_response_meta=None,
-                                   status=state.query_plan.status)
-        for exe_result in state.execution_results:
-            if exe_result.query_id != current_recovery_item.query_id:
-                new_exe_results.append(exe_result)
-
-        return new_recovery_queue, new_query_plan, new_exe_results
     def _route_after_validation(self, state: AgentState) -> str:
         if state.recovery_queue is not None and len(state.recovery_queue) > 0:
             return "recovery"
         return "end"
     def _route_after_exe(self, state: AgentState) -> str:
-        # 一开始state.recovery_queue=None, exe节点正常向验证节点触发 --> 但只要state.recovery_queue不是None且队列为空的时候 那就结束
-        if state.recovery_queue is None or len(state.recovery_queue) > 0:
-            return "continue"
-        return "end"
+        # 工具只在计划生成后整体执行一次，之后的重试在恢复节点内完成
+        return "continue"
     def _route_before_recovery(self, state: AgentState):
         if state.queue_state == "no":
             return "end"
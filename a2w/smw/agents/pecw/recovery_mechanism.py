@@ -1,5 +1,6 @@
 import ast
 import json
+import re
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -13,6 +14,10 @@ from a2w.smw.utils.smw_util import normalize_subquery_params_single, parse_think
 from a2w.smw.agents.pecw.data_planner import SubQuery, QueryPlan
 
 
+TOOL_ERROR_REASON = "工具执行出错"
+EMPTY_RESULT_REASON = "工具执行成功，但得到的数据结果为空"
+
+
 class RecoveryAction(Enum):
     RETRY = "retry"
     SKIP = "skip"
@@ -30,9 +35,11 @@ class RecoveryOutput:
 
 
 class RecoveryMechanism:
-    def __init__(self, available_tools: Dict[str, Any], llm: ChatOpenAI):
+    def __init__(self, available_tools: Dict[str, Any], llm: ChatOpenAI, single_call: bool = True):
         self.available_tools = available_tools
         self.llm = llm
+        # True: 可解判断与重新规划合并为一次 LLM 调用(COMMON_PROMPT["recover"]); False: 先 is_solve 再 retry 两次调用
+        self.single_call = single_call
     
     def validate_execution_results(self, execution_results: List[Dict[str, Any]], original_plan: Dict[str, Any]) -> List[RecoveryOutput]:
         recovery_result: List[RecoveryOutput] = []
@@ -50,7 +57,7 @@ class RecoveryMechanism:
                             error_information=error,
                             query_information=query_des,
                             action=RecoveryAction.RETRY,
-                            reason="工具执行出错"
+                            reason=TOOL_ERROR_REASON
                         )
                     )
 
@@ -63,7 +70,7 @@ class RecoveryMechanism:
                             error_information=error,
                             query_information=query_des,
                             action=RecoveryAction.RETRY,
-                            reason="工具执行成功，但得到的数据结果为空"
+                            reason=EMPTY_RESULT_REASON
                         )
                     )
             return recovery_result
@@ -78,7 +85,7 @@ class RecoveryMechanism:
                 return sq
         return None
 
-    def get_is_solvable(self, current_recovery_item: RecoveryOutput) -> bool:
+    async def get_is_solvable(self, current_recovery_item: RecoveryOutput) -> bool:
         prompt = ChatPromptTemplate.from_messages([
                 ("system", COMMON_PROMPT["is_solve"]["system"]),
                 ('user', COMMON_PROMPT["is_solve"]["user"])
@@ -95,7 +102,7 @@ class RecoveryMechanism:
         current_func_des = self.available_tools.get(current_tool).description
 
         chain = prompt | self.llm
-        llm_response = chain.invoke({
+        llm_response = await chain.ainvoke({
             "available_tools": available_tools_des,
             "purpose": purpose,
             "func_name": current_tool,
@@ -112,45 +119,79 @@ class RecoveryMechanism:
         return result == "YES"
 
 
-    def generate_retry_result(self, current_recovery_item: RecoveryOutput, query_plan: QueryPlan) -> SubQuery:
+    async def recover(self, current_recovery_item: RecoveryOutput, query_plan: QueryPlan) -> Optional[SubQuery]:
+        """对一个失败子查询做一轮恢复，返回替代的子查询；不可解时返回 None"""
+        if not self.single_call:
+            if not await self.get_is_solvable(current_recovery_item=current_recovery_item):
+                return None
+            return await self.generate_retry_result(current_recovery_item, query_plan)
+
+        prompt = ChatPromptTemplate.from_messages([
+                ("system", COMMON_PROMPT["recover"]["system"]),
+                ('user', COMMON_PROMPT["recover"]["user"])
+            ])
+        chain = prompt | self.llm
+        llm_response = await chain.ainvoke(self._retry_inputs(current_recovery_item, query_plan))
+        think_text, context_part = parse_think_content(llm_response.content)
+        obj = RecoveryMechanism.parse_recover_response(context_part)
+        if not obj.get("solvable"):
+            return None
+        return self._to_sub_query(current_recovery_item, obj)
+
+    @staticmethod
+    def parse_recover_response(content: str) -> Dict[str, Any]:
+        json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', content)
+        if json_match:
+            content = json_match.group(1)
+        else:
+            start_idx, end_idx = content.find('{'), content.rfind('}')
+            if start_idx != -1 and end_idx > start_idx:
+                content = content[start_idx:end_idx + 1]
+        obj = json.loads(content)
+        if not isinstance(obj, dict) or not isinstance(obj.get("solvable"), bool):
+            raise ValueError(f"Invalid recovery response: {content}")
+        if obj["solvable"] and not obj.get("tool"):
+            raise ValueError(f"Recovery response is solvable but has no tool: {content}")
+        return obj
+
+    async def generate_retry_result(self, current_recovery_item: RecoveryOutput, query_plan: QueryPlan) -> SubQuery:
         prompt = ChatPromptTemplate.from_messages([
                 ("system", COMMON_PROMPT["retry"]["system"]),
                 ('user', COMMON_PROMPT["retry"]["user"])
             ])
+        chain = prompt | self.llm
+        llm_response = await chain.ainvoke(self._retry_inputs(current_recovery_item, query_plan))
+        think_text, context_part = parse_think_content(llm_response.content)
+        return self._to_sub_query(current_recovery_item, json.loads(context_part))
+
+    def _retry_inputs(self, current_recovery_item: RecoveryOutput, query_plan: QueryPlan) -> Dict[str, Any]:
         available_tools_des = "\n".join([
         f"---\n函数名称：{tool.name}\n函数描述和参数形式：{tool.description}\n---\n"
         for tool in TOOLS
         ])
         query_information = current_recovery_item.query_information
-        error_information = current_recovery_item.reason
-        purpose = query_information.get("purpose")
         current_tool = query_information.get("tool")
-        current_params = query_information.get("params")
-        current_func_des = self.available_tools.get(current_tool).description
-        start_date = query_plan.meta.get("start_date")
-        end_date = query_plan.meta.get("end_date")
-        cnty = query_plan.meta.get("cities")
-        weather_types = query_plan.meta.get("weather_types")
-        chain = prompt | self.llm
-        llm_response = chain.invoke({
+        return {
             "available_tools": available_tools_des,
-            "start_date": start_date,
-            "end_date": end_date,
-            "cnty": cnty,
-            "weather_types": weather_types,
-            "purpose": purpose,
+            "start_date": query_plan.meta.get("start_date"),
+            "end_date": query_plan.meta.get("end_date"),
+            "cnty": query_plan.meta.get("cities"),
+            "weather_types": query_plan.meta.get("weather_types"),
+            "purpose": query_information.get("purpose"),
             "func_name": current_tool,
-            "params": current_params,
-            "func_des": current_func_des,
-            "error_information": error_information
-        })
-        think_text, context_part = parse_think_content(llm_response.content)
-        obj = normalize_subquery_params_single(json.loads(context_part))
+            "params": query_information.get("params"),
+            "func_des": self.available_tools.get(current_tool).description,
+            "error_information": current_recovery_item.reason
+        }
 
+    @staticmethod
+    def _to_sub_query(current_recovery_item: RecoveryOutput, obj: Dict[str, Any]) -> SubQuery:
+        obj = normalize_subquery_params_single(obj)
+        query_information = current_recovery_item.query_information
         return SubQuery(
             id=current_recovery_item.query_id,
-            purpose=purpose,
+            purpose=query_information.get("purpose"),
             tool=obj.get("tool"),
             params=obj.get("params"),
             expected_fields=query_information.get("expected_fields")
-        )
\ No newline at end of file
+        )
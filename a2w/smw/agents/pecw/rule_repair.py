@@ -0,0 +1,227 @@
+import ast
+import difflib
+import json
+import re
+from dataclasses import replace
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from a2w.smw.funcalls.db_function_call import TOOL_PARAM_CHOICES
+from a2w.smw.agents.pecw.data_planner import SubQuery
+from a2w.smw.agents.pecw.recovery_mechanism import RecoveryOutput
+
+# LLM 规划中常见的枚举值同义写法
+_CHOICE_SYNONYMS: Dict[str, str] = {
+    "sum": "total", "accumulated": "total", "accumulation": "total", "cumulative": "total", "累计": "total", "总量": "total",
+    "avg": "average", "mean": "average", "平均": "average",
+    "maximum": "max", "highest": "max", "最大": "max", "最高": "max",
+    "minimum": "min", "lowest": "min", "最小": "min", "最低": "min",
+    "day": "daily", "per_day": "daily", "逐日": "daily", "每日": "daily",
+    "diff": "range", "difference": "range", "amplitude": "range", "温差": "range", "日较差": "range",
+    "temp": "temperature", "tem": "temperature", "气温": "temperature", "温度": "temperature",
+    "precip": "precipitation", "rain": "precipitation", "rainfall": "precipitation", "降水": "precipitation",
+    "wind_speed": "wind", "风": "wind", "风速": "wind",
+    "rhu": "humidity", "湿度": "humidity",
+    "pre": "pressure", "气压": "pressure", "vis": "visibility", "能见度": "visibility",
+    "rain_days": "rainy", "雨日": "rainy", "晴天": "sunny", "大风": "windy", "雾": "foggy", "低温": "cold", "高温": "hot",
+    "climate": "climatology", "normal": "climatology", "气候值": "climatology", "常年": "climatology",
+    "previous_year": "last_year", "去年": "last_year", "去年同期": "last_year", "历史同期": "same_period_last_year",
+}
+_DATE_PATTERNS = [
+    re.compile(r"^\s*(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})"),
+    re.compile(r"^\s*(\d{4})(\d{2})(\d{2})"),
+]
+# 各规则只处理对应的错误特征(执行错误原文)，其他失败(超时、数据库错误、结果为空等)直接交给 LLM
+_VALIDATION_ERROR = re.compile(r"validation error for|Input should be|Field required")
+_TOOL_NOT_FOUND = re.compile(r"Tool not found")
+_DATE_ERROR = re.compile(
+    r"(start_date|end_date)\s+(Field required|Input should be)"           # 日期参数缺失/类型错误(pydantic)
+    r"|does not match format|Invalid isoformat string|invalid literal for int\(\)"   # 日期解析失败
+    r"|converting date and/or time|out-of-range value"                     # SQL Server 日期转换失败
+)
+_TRUE_VALUES = {"true", "1", "yes", "y", "是"}
+_FALSE_VALUES = {"false", "0", "no", "n", "否"}
+
+
+class RepairStats:
+    """规则修复与 LLM 修复的累计计数(进程内)，经 /metrics 暴露"""
+    def __init__(self):
+        self.rule_repairs = 0       # 规则修复后重新执行成功
+        self.rule_escalations = 0   # 规则修复后仍失败，交给 LLM
+        self.llm_repairs = 0        # LLM 给出了重试子查询
+        self.llm_unsolvable = 0     # LLM 判定不可解
+        self.by_rule: Dict[str, int] = {}
+
+    def record_rules(self, rules: List[str]) -> None:
+        for rule in rules:
+            self.by_rule[rule] = self.by_rule.get(rule, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "rule_repairs": self.rule_repairs,
+            "rule_escalations": self.rule_escalations,
+            "llm_repairs": self.llm_repairs,
+            "llm_unsolvable": self.llm_unsolvable,
+            "by_rule": dict(self.by_rule),
+        }
+
+
+REPAIR_STATS = RepairStats()
+
+
+def _schema_type(prop: Dict[str, Any]) -> Optional[str]:
+    """JSON schema 中参数的类型，Optional[...] 取非 null 的那个"""
+    if "type" in prop:
+        return prop["type"]
+    for option in prop.get("anyOf", []):
+        if option.get("type") not in (None, "null"):
+            return option["type"]
+    return None
+
+
+def _normalize_date(value: Any) -> Optional[str]:
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    if not isinstance(value, str):
+        return None
+    for pattern in _DATE_PATTERNS:
+        match = pattern.match(value)
+        if match:
+            try:
+                return date(*(int(g) for g in match.groups())).strftime("%Y-%m-%d")
+            except ValueError:
+                return None
+    return None
+
+
+def _as_list(value: Any) -> List[Any]:
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("[") and text.endswith("]"):
+            for parse in (json.loads, ast.literal_eval):
+                try:
+                    parsed = parse(text)
+                    if isinstance(parsed, list):
+                        return parsed
+                except Exception:
+                    pass
+            text = text[1:-1]
+        return [part.strip(" '\"") for part in re.split(r"[,，、;；\s]+", text) if part.strip(" '\"")]
+    if isinstance(value, (tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _match_choice(value: Any, choices: List[str]) -> Optional[str]:
+    text = str(value).strip().lower()
+    if text in choices:
+        return text
+    if text in _CHOICE_SYNONYMS and _CHOICE_SYNONYMS[text] in choices:
+        return _CHOICE_SYNONYMS[text]
+    close = difflib.get_close_matches(text, choices, n=1, cutoff=0.75)
+    return close[0] if close else None
+
+
+class RuleRepairer:
+    """
+    失败子查询的确定性修复，在 LLM 恢复之前执行:
+        - unknown_tool: 工具名不存在时换成最相近的已注册工具，并丢弃新工具不认识的参数
+        - list_param / int_param / bool_param: 按工具参数 schema 纠正字符串化的列表、数字、布尔值
+        - date_format: 日期统一为 YYYY-MM-DD，缺失时取计划元数据中的日期，起止颠倒时交换
+        - choice_param: 枚举参数(aggregation 等)的同义词/拼写错误纠正为合法取值
+    每条规则只在执行错误符合对应特征时生效: 工具不存在(Tool not found)、参数校验失败(pydantic)、日期解析失败；
+    规则只纠正参数的写法，不改变查询的时间/空间范围(跨年范围由工具按年表 UNION 查询)；
+    没有任何规则适用时返回 None，由 RecoveryMechanism 走 LLM 恢复
+    """
+    def __init__(self, tool_registry: Dict[str, Any], stats: RepairStats = REPAIR_STATS):
+        self.tool_registry = tool_registry
+        self.stats = stats
+        self._rules: List[Tuple[str, re.Pattern, Callable[..., Optional[Tuple[str, Dict[str, Any]]]]]] = [
+            ("unknown_tool", _TOOL_NOT_FOUND, self._fix_unknown_tool),
+            ("date_format", _DATE_ERROR, self._fix_dates),
+            ("list_param", _VALIDATION_ERROR, self._fix_typed("array")),
+            ("int_param", _VALIDATION_ERROR, self._fix_typed("integer")),
+            ("bool_param", _VALIDATION_ERROR, self._fix_typed("boolean")),
+            ("choice_param", _VALIDATION_ERROR, self._fix_choices),
+        ]
+
+    def repair(self, item: RecoveryOutput, sub_query: SubQuery,
+               meta: Optional[Dict[str, Any]] = None) -> Optional[Tuple[SubQuery, List[str]]]:
+        """返回 (修复后的子查询, 生效的规则名)；无规则适用时返回 None"""
+        tool_name, params = sub_query.tool, dict(sub_query.params or {})
+        error = str(item.error_information or "")
+        applied = []
+        for name, signature, rule in self._rules:
+            if not signature.search(error):
+                continue
+            fixed = rule(tool_name, params, item, meta or {})
+            if fixed is not None:
+                tool_name, params = fixed
+                applied.append(name)
+        if not applied:
+            return None
+        return replace(sub_query, tool=tool_name, params=params), applied
+
+    def _schema(self, tool_name: str) -> Dict[str, Dict[str, Any]]:
+        tool = self.tool_registry.get(tool_name)
+        return dict(getattr(tool, "args", None) or {}) if tool is not None else {}
+
+    def _fix_unknown_tool(self, tool_name, params, item, meta):
+        if tool_name in self.tool_registry:
+            return None
+        candidates = difflib.get_close_matches(str(tool_name), list(self.tool_registry), n=1, cutoff=0.6)
+        if not candidates:
+            return None
+        schema = self._schema(candidates[0])
+        return candidates[0], {k: v for k, v in params.items() if not schema or k in schema}
+
+    def _fix_dates(self, tool_name, params, item, meta):
+        schema = self._schema(tool_name)
+        fixed = dict(params)
+        for key in ("start_date", "end_date"):
+            if schema and key not in schema:
+                continue
+            normalized = _normalize_date(fixed.get(key)) or _normalize_date(meta.get(key))
+            if normalized is not None:
+                fixed[key] = normalized
+        if fixed.get("start_date") and fixed.get("end_date") and fixed["start_date"] > fixed["end_date"]:
+            fixed["start_date"], fixed["end_date"] = fixed["end_date"], fixed["start_date"]
+        return (tool_name, fixed) if fixed != params else None
+
+    def _fix_typed(self, json_type: str):
+        def rule(tool_name, params, item, meta):
+            fixed = dict(params)
+            for key, prop in self._schema(tool_name).items():
+                value = fixed.get(key)
+                if value is None or _schema_type(prop) != json_type:
+                    continue
+                if json_type == "array" and not isinstance(value, list):
+                    fixed[key] = _as_list(value)
+                elif json_type == "integer" and not isinstance(value, int):
+                    digits = re.search(r"-?\d+", str(value))
+                    if digits:
+                        fixed[key] = int(digits.group(0))
+                elif json_type == "boolean" and not isinstance(value, bool):
+                    text = str(value).strip().lower()
+                    if text in _TRUE_VALUES or text in _FALSE_VALUES:
+                        fixed[key] = text in _TRUE_VALUES
+            return (tool_name, fixed) if fixed != params else None
+        return rule
+
+    def _fix_choices(self, tool_name, params, item, meta):
+        fixed = dict(params)
+        for key, choices in TOOL_PARAM_CHOICES.get(tool_name, {}).items():
+            value = fixed.get(key)
+            if value is None:
+                continue
+            if isinstance(value, list):
+                matched = [_match_choice(v, choices) for v in value]
+                fixed[key] = list(dict.fromkeys(m for m in matched if m is not None)) or None
+            elif str(value) not in choices:
+                matched = _match_choice(value, choices)
+                if matched is None:
+                    fixed.pop(key)  # 无法识别时回到工具默认值
+                else:
+                    fixed[key] = matched
+        fixed = {k: v for k, v in fixed.items() if v is not None or params.get(k) is None}
+        return (tool_name, fixed) if fixed != params else None
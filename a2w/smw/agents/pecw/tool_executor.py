@@ -1,9 +1,10 @@
 import time
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 
 from a2w.smw.funcalls import TOOLS
+from a2w.smw.funcalls.db_function_call import QueryBatch, bind_query_batch, get_db_pool_size
 
 
 @dataclass
@@ -18,9 +19,17 @@ class ExecutionResult:
 
 
 class ToolExecutor:
-    def __init__(self, tool_registry):
+    def __init__(self, tool_registry, batch_queries: bool = True, parallel: bool = True,
+                 max_concurrency: int = 0, timeout: float = 60.0):
         # name -> LangChain.StructuredTool
         self.tool_registry = tool_registry
+        # 扫描范围相同(日期范围 + 城市)的子查询合并为一次数据库往返
+        self.batch_queries = batch_queries
+        # 各组子查询并发执行; max_concurrency<=0 时与数据库连接池大小一致
+        self.parallel = parallel
+        self.max_concurrency = max_concurrency
+        # 单个子查询超时(秒)，超时后取消并记为失败; <=0 表示不限制
+        self.timeout = timeout
 
     async def execute(self, sub_query: Dict[str, Any]) -> ExecutionResult:
         start_time = time.time()
@@ -36,7 +45,10 @@ class ToolExecutor:
             tool = self.tool_registry[tool_name]
 
             # LangChain's unified entry point: parameter validation + execution
-            result = await tool.ainvoke(params)
+            if self.timeout and self.timeout > 0:
+                result = await asyncio.wait_for(tool.ainvoke(params), timeout=self.timeout)
+            else:
+                result = await tool.ainvoke(params)
             if result.get("status") == "success":
                 return ExecutionResult(
                     query_id=query_id,
@@ -58,6 +70,16 @@ class ToolExecutor:
                     execution_time=time.time() - start_time
                 )
 
+        except asyncio.TimeoutError:
+                return ExecutionResult(
+                    query_id=query_id,
+                    status="failed",
+                    exe_data_result=None,
+                    exe_message=None,
+                    exe_raw_count=None,
+                    error=f"Tool {tool_name} timed out after {self.timeout}s and was cancelled",
+                    execution_time=time.time() - start_time
+                )
         except Exception as e:
                 return ExecutionResult(
                     query_id=query_id,
@@ -70,32 +92,59 @@ class ToolExecutor:
                 )
 
     async def execute_batch(self, sub_queries: List[Dict[str, Any]]) -> List[ExecutionResult]:
-        results = []
-        for sub_query in sub_queries:
-            results.append(await self.execute(sub_query))
+        """
+        计划中的子查询通常都落在同一张年表、同一日期范围和城市上(降水/气温/风/湿度/日数统计...)，
+        按扫描范围分组，组内各工具的 SQL 合并为一个多结果集批次执行；各组之间并发执行(信号量限制在连接池大小以内)，
+        报告耗时取决于最慢的一组而不是所有查询之和。结果按 query_id 拆回，顺序与输入一致
+        """
+        groups = self._group_by_scan(sub_queries) if self.batch_queries else [[i] for i in range(len(sub_queries))]
+        results: List[Optional[ExecutionResult]] = [None] * len(sub_queries)
+        if self.parallel and len(groups) > 1:
+            semaphore = asyncio.Semaphore(self.max_concurrency if self.max_concurrency > 0 else get_db_pool_size())
+
+            async def run_group(indices: List[int]) -> List[ExecutionResult]:
+                async with semaphore:
+                    return await self._execute_group(sub_queries, indices)
+
+            group_results = await asyncio.gather(*(run_group(indices) for indices in groups))
+        else:
+            group_results = [await self._execute_group(sub_queries, indices) for indices in groups]
+        for indices, group_result in zip(groups, group_results):
+            for i, result in zip(indices, group_result):
+                results[i] = result
         return results
 
-    async def execute_batch_parallel(
-        self,
-        sub_queries: List[Dict[str, Any]]
-    ) -> List[ExecutionResult]:
-        tasks = [self.execute(q) for q in sub_queries]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        final_results = []
-        for i, r in enumerate(results):
-            if isinstance(r, Exception):
-                final_results.append(
-                    ExecutionResult(
-                        query_id=sub_queries[i].get("id"),
-                        exe_data_result=None,
-                        exe_message=None,
-                        exe_raw_count=None,
-                        status="failed",
-                        error=str(r)
-                    )
-                )
-            else:
-                final_results.append(r)
+    async def execute_batch_parallel(self, sub_queries: List[Dict[str, Any]]) -> List[ExecutionResult]:
+        """保留的旧入口，execute_batch 默认即并发执行"""
+        return await self.execute_batch(sub_queries)
+
+    async def _execute_group(self, sub_queries: List[Dict[str, Any]], indices: List[int]) -> List[ExecutionResult]:
+        if len(indices) == 1:
+            return [await self.execute(sub_queries[indices[0]])]
+        batch = QueryBatch(size=len(indices))
+        return list(await asyncio.gather(*(self._execute_in_batch(batch, sub_queries[i]) for i in indices)))
+
+    async def _execute_in_batch(self, batch: QueryBatch, sub_query: Dict[str, Any]) -> ExecutionResult:
+        member = bind_query_batch(batch)
+        try:
+            return await self.execute(sub_query)
+        finally:
+            batch.member_done(member)
+
+    @staticmethod
+    def _scan_key(sub_query: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        params = sub_query.get("params") or {}
+        start_date, end_date = params.get("start_date"), params.get("end_date")
+        if not start_date or not end_date:
+            return None
+        cities = params.get("cities") or []
+        cities = tuple(sorted(str(c) for c in cities)) if isinstance(cities, (list, tuple)) else (str(cities),)
+        return str(start_date), str(end_date), cities
 
-        return final_results
+    def _group_by_scan(self, sub_queries: List[Dict[str, Any]]) -> List[List[int]]:
+        """按首次出现的顺序返回各组下标，缺少日期参数的子查询单独成组"""
+        groups: Dict[Any, List[int]] = {}
+        for i, sub_query in enumerate(sub_queries):
+            key = self._scan_key(sub_query)
+            groups.setdefault(key if key is not None else ("single", i), []).append(i)
+        return list(groups.values())
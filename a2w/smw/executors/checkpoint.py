@@ -0,0 +1,75 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from a2w.utils.logger import setup_logger
+
+try:
+    import aiosqlite
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:  # 断点续跑可选, 未安装 langgraph-checkpoint-sqlite 时不落盘
+    aiosqlite = None
+    AsyncSqliteSaver = None
+
+logger = setup_logger(name="WorkflowCheckpoint")
+# 状态中唯一的自定义类型; PECW 结果写入 sql_data 前已经 to_plain_data 转为基础类型
+CHECKPOINT_TYPES = ("a2w.smw.agents.state", "StepStatus")
+
+
+@dataclass
+class CheckpointConfig:
+    enabled: bool = True
+    path: str = "data/local/a2w_checkpoints.db"   # LangGraph 检查点的本地 SQLite 文件, 按 run_id(thread_id) 区分
+    max_runs: int = 1000                          # 启动时只保留最近的 run 数, <=0 表示不清理
+
+    @classmethod
+    def from_smw_config(cls, config) -> "CheckpointConfig":
+        if config is None:
+            return cls(enabled=False)
+        return cls(
+            enabled=bool(config.get("checkpoint_enabled", cls.enabled)),
+            path=str(config.get("checkpoint_path", cls.path)),
+            max_runs=int(config.get("checkpoint_max_runs", cls.max_runs)),
+        )
+
+
+async def open_sqlite_checkpointer(config: CheckpointConfig) -> Optional["AsyncSqliteSaver"]:
+    """打开(必要时创建)检查点库并清理超出 max_runs 的旧 run；未启用或依赖缺失时返回 None"""
+    if not config.enabled:
+        return None
+    if AsyncSqliteSaver is None:
+        logger.warning("langgraph-checkpoint-sqlite is not installed, weather report checkpointing is disabled.")
+        return None
+    directory = os.path.dirname(config.path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = await aiosqlite.connect(config.path)
+    try:
+        # 新版 langgraph-checkpoint 对未登记类型的反序列化告警(后续版本会拒绝), 各环节的 status 是 StepStatus 枚举
+        serde = JsonPlusSerializer(allowed_msgpack_modules=[CHECKPOINT_TYPES])
+    except TypeError:  # 旧版本没有白名单参数
+        serde = None
+    saver = AsyncSqliteSaver(conn, serde=serde)
+    await saver.setup()
+    if config.max_runs > 0:
+        await prune_runs(saver, config.max_runs)
+    return saver
+
+
+async def prune_runs(saver: "AsyncSqliteSaver", keep: int) -> int:
+    """checkpoint_id 是按时间递增的 uuid6，按每个 run 最新的 checkpoint_id 排序，删除 keep 之外的旧 run"""
+    async with saver.conn.execute(
+        "SELECT thread_id FROM checkpoints GROUP BY thread_id ORDER BY MAX(checkpoint_id) DESC LIMIT -1 OFFSET ?", (keep,)
+    ) as cursor:
+        stale = [row[0] for row in await cursor.fetchall()]
+    for thread_id in stale:
+        await saver.adelete_thread(thread_id)
+    if stale:
+        logger.info(f"Pruned {len(stale)} old weather report runs from the checkpoint store")
+    return len(stale)
+
+
+async def close_checkpointer(saver: Optional["AsyncSqliteSaver"]) -> None:
+    if saver is not None:
+        await saver.conn.close()
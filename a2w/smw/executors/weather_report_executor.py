@@ -1,4 +1,5 @@
-from typing import Any, Dict, List
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
@@ -13,8 +14,32 @@ from a2w.smw.agents.summary_agent import SummaryAgent
 from a2w.smw.agents.brief_agent import BriefAgent
 from a2w.api.middleware.db.base_db import DBConnector
 from a2w.smw.managers.embedding_recall import EmbeddingRecallManager
+from a2w.smw.executors.checkpoint import CheckpointConfig, open_sqlite_checkpointer, close_checkpointer
 from a2w.utils.logger import setup_logger
 
+# 图节点 -> 输出到 state / 接口中的环节名
+SECTION_NODES: Dict[str, str] = {
+    "forecast_weather": "forecast",
+    "history_weather": "history",
+    "suggestion": "suggestion",
+    "summary": "summary",
+    "final_brief": "final_brief",
+}
+# 同一 run_id 续跑时必须与首次请求一致的字段
+RUN_KEY_FIELDS = ("task_type", "start_date", "end_date", "station_names")
+
+
+def section_payload(section: Dict[str, Any]) -> Dict[str, Any]:
+    """流式推送的环节内容: 只取文本与状态，sql_data 等中间数据不推送"""
+    status = section.get("status")
+    return {
+        "response": section.get("response", ""),
+        "think_response": section.get("think_response", ""),
+        "status": status.value if isinstance(status, StepStatus) else status,
+        "error": section.get("error"),
+    }
+
+
 class WeatherReportWorkflow:
     def __init__(self, llm: ChatOpenAI, db_connector: DBConnector, config: SmwConfig = None):
         self.llm = llm
@@ -25,10 +50,15 @@ class WeatherReportWorkflow:
         self.suggestion_agent = SuggestionAgent(llm, self.embedding_recall_mgr, config)
         self.summary_agent = SummaryAgent(llm, self.embedding_recall_mgr, config)
         self.brief_agent = BriefAgent(llm, config)
+        # 前期实况(history)与预报(forecast)互不依赖，并行执行后再汇合到依赖预报的后续环节
+        self.parallel_branches = config.get("parallel_branches", True) if config is not None else True
+        # 检查点在 open_checkpoint() 中异步打开后重新编译图；未打开时图不落盘, 与原来的行为一致
+        self.checkpoint_config = CheckpointConfig.from_smw_config(config)
+        self.checkpointer = None
         self.graph = self._build_graph()
         self.logger = setup_logger(name=__class__.__name__)
 
-    def _build_graph(self):
+    def _build_graph(self, checkpointer=None):
         workflow = StateGraph(WeatherReportState)
         workflow.add_node("input", self.input_node)
         workflow.add_node("weather_type_judge", self.weather_type_judge_node)
@@ -40,13 +70,85 @@ class WeatherReportWorkflow:
 
         workflow.set_entry_point("input")
         workflow.add_edge("input", "weather_type_judge")
-        workflow.add_edge("weather_type_judge", "forecast_weather")
-        workflow.add_edge("forecast_weather", "history_weather")
-        workflow.add_edge("history_weather", "suggestion")
+        if self.parallel_branches:
+            # fan out: 两个分支只写各自的 state key(forecast / history)，同一步内的并发写入不会冲突
+            workflow.add_edge("weather_type_judge", "forecast_weather")
+            workflow.add_edge("weather_type_judge", "history_weather")
+            # join: 两个分支都完成后才进入 suggestion
+            workflow.add_edge(["forecast_weather", "history_weather"], "suggestion")
+        else:
+            workflow.add_edge("weather_type_judge", "forecast_weather")
+            workflow.add_edge("forecast_weather", "history_weather")
+            workflow.add_edge("history_weather", "suggestion")
         workflow.add_edge("suggestion", "summary")
         workflow.add_edge("summary", "final_brief")
         workflow.add_edge("final_brief", END)
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
+
+    async def open_checkpoint(self) -> None:
+        """
+        按 run_id 把每一步的图状态写入本地 SQLite: 某个环节失败(如 LLM 超时)后用同一 run_id 重试，
+        从最后一个成功的节点继续，已完成的环节(包括并行分支中成功的一支)不再重新生成
+        """
+        if self.checkpointer is None:
+            self.checkpointer = await open_sqlite_checkpointer(self.checkpoint_config)
+            if self.checkpointer is not None:
+                self.graph = self._build_graph(self.checkpointer)
+
+    async def close_checkpoint(self) -> None:
+        await close_checkpointer(self.checkpointer)
+        self.checkpointer = None
+        self.graph = self._build_graph()
+
+    async def _prepare_run(self, user_input: Dict, run_id: str) -> Tuple[Optional[WeatherReportState], Optional[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        返回 (图输入, 运行配置, 已完成的环节):
+            - 未启用检查点: 初始状态, 无配置
+            - 新的 run_id: 初始状态
+            - 已有 run_id: 输入为 None，LangGraph 从该 run 的最新检查点继续(已全部完成时直接返回最终状态)
+        """
+        if self.checkpointer is None:
+            return self._init_state(user_input), None, {}
+        config = {"configurable": {"thread_id": run_id}}
+        snapshot = await self.graph.aget_state(config)
+        if not snapshot.values:
+            return self._init_state(user_input), config, {}
+        mismatch = self._run_mismatch(snapshot.values, user_input)
+        if mismatch:
+            raise ValueError(f"run {run_id} was started with a different request ({', '.join(mismatch)} differ)")
+        done = self._successful_sections(snapshot.values)
+        self.logger.info(f"从检查点继续 run {run_id}: 已完成 {list(done)}, 待执行 {list(snapshot.next)}")
+        return None, config, done
+
+    @staticmethod
+    def _run_mismatch(values: Dict[str, Any], user_input: Dict) -> List[str]:
+        return [key for key in RUN_KEY_FIELDS if values.get(key) != user_input.get(key)]
+
+    @staticmethod
+    def _successful_sections(values: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        sections = {}
+        for key in SECTION_NODES.values():
+            section = values.get(key) or {}
+            if section.get("status") in (StepStatus.SUCCESS, StepStatus.SUCCESS.value):
+                sections[key] = section
+        return sections
+
+    async def get_sections(self, run_id: Optional[str], user_input: Dict) -> Dict[str, Dict[str, Any]]:
+        """
+        某次运行中已成功生成的环节，供单环节接口复用上游结果；
+        无检查点、run 不存在或该 run 的请求(任务类型/日期/站点)与当前请求不一致时返回空, 由调用方重新生成
+        """
+        if self.checkpointer is None or not run_id:
+            return {}
+        snapshot = await self.graph.aget_state({"configurable": {"thread_id": run_id}})
+        if not snapshot.values:
+            return {}
+        mismatch = self._run_mismatch(snapshot.values, user_input)
+        if mismatch:
+            self.logger.warning(f"run {run_id} was started with a different request ({', '.join(mismatch)} differ), "
+                                f"its sections are not reused")
+            return {}
+        return self._successful_sections(snapshot.values)
 
     async def input_node(self, state: WeatherReportState) -> WeatherReportState:
         self.logger.info(f"开始处理任务:《{state['task_type']}》, 站点信息: {state['station_names']}, "
@@ -73,32 +175,38 @@ class WeatherReportWorkflow:
             raise
         return state
     
-    async def history_weather_node(self, state: WeatherReportState) -> WeatherReportState:
+    async def _run_section(self, agent, state: WeatherReportState, key: str) -> Dict[str, Any]:
+        """
+        各环节只返回自己负责的 state key: agent 在 state 的浅拷贝上运行(本环节的字典也单独拷贝)，
+        并行分支之间不会共享可变对象，也不会覆盖对方的结果
+        """
+        section_state = {**state, key: dict(state.get(key) or {})}
+        result = await agent.run(section_state)
+        return {key: result[key]}
+
+    async def history_weather_node(self, state: WeatherReportState) -> Dict[str, Any]:
         self.logger.info("开始生成前期天气实况")
-        return await self.history_agent.run(state)
+        return await self._run_section(self.history_agent, state, "history")
     
-    async def forecast_weather_node(self, state: WeatherReportState) -> WeatherReportState:
+    async def forecast_weather_node(self, state: WeatherReportState) -> Dict[str, Any]:
         self.logger.info("开始生成详细天气预报")
-        return await self.forecast_agent.run(state)
+        return await self._run_section(self.forecast_agent, state, "forecast")
     
-    async def suggestion_node(self, state: WeatherReportState) -> WeatherReportState:
+    async def suggestion_node(self, state: WeatherReportState) -> Dict[str, Any]:
         self.logger.info("开始生成关注建议")
-        return await self.suggestion_agent.run(state)
+        return await self._run_section(self.suggestion_agent, state, "suggestion")
     
-    async def summary_node(self, state: WeatherReportState) -> WeatherReportState:
+    async def summary_node(self, state: WeatherReportState) -> Dict[str, Any]:
         self.logger.info("开始生成摘要")
-        return await self.summary_agent.run(state)
+        return await self._run_section(self.summary_agent, state, "summary")
     
-    async def final_brief_node(self, state: WeatherReportState) -> WeatherReportState:
+    async def final_brief_node(self, state: WeatherReportState) -> Dict[str, Any]:
         self.logger.info("开始生成简短提示")
-        return await self.brief_agent.run(state)
+        return await self._run_section(self.brief_agent, state, "final_brief")
 
-    async def run(self, user_input: Dict) -> SmwReturn:
-        start_time = datetime.now()
-        self.logger.info("-" * 60)
-        user_task = user_input["task_type"]
-        self.logger.info(f"任务：{user_task} -> 开始执行: {start_time}")
-        init_state = WeatherReportState(
+    @staticmethod
+    def _init_state(user_input: Dict) -> WeatherReportState:
+        return WeatherReportState(
             task_type=user_input["task_type"],
             start_date=user_input["start_date"],
             end_date=user_input["end_date"],
@@ -112,9 +220,17 @@ class WeatherReportWorkflow:
             error=None,
             tasks_completed={}
         )
+
+    async def run(self, user_input: Dict, run_id: Optional[str] = None) -> SmwReturn:
+        start_time = datetime.now()
+        self.logger.info("-" * 60)
+        user_task = user_input["task_type"]
+        run_id = run_id or uuid.uuid4().hex
+        self.logger.info(f"任务：{user_task} -> 开始执行: {start_time}, run_id: {run_id}")
         final_state = None
         try:
-            final_state = await self.graph.ainvoke(init_state)
+            graph_input, run_config, _ = await self._prepare_run(user_input, run_id)
+            final_state = await self.graph.ainvoke(graph_input, config=run_config)
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             data = {
@@ -130,6 +246,7 @@ class WeatherReportWorkflow:
                 error=None,
                 meta_data={
                     "duration": f"{duration:.2f}s",
+                    "run_id": run_id,
                     "all_state": final_state
                 }
             )
@@ -143,6 +260,53 @@ class WeatherReportWorkflow:
                 error=str(e),
                 meta_data={
                     "duration": f"{duration:.2f}s",
+                    "run_id": run_id,
                     "all_state": final_state
                 }
-            )
\ No newline at end of file
+            )
+
+    async def stream(self, user_input: Dict, tokens: bool = False, run_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        基于 LangGraph astream_events 的分段输出，事件依次为:
+            {"event": "start", "section": "forecast"}                   某一环节开始执行
+            {"event": "section", "section": "forecast", "data": {...}}   某一环节完成后立即推送
+            {"event": "token", "section": "history", "content": "..."}   tokens=True 时推送各环节 LLM 的增量输出
+            {"event": "done", "status": ..., "data": {...}, "error": ..., "duration": ...}   全部完成(或失败)
+        PECW 内部的规划/恢复调用属于子图节点，不推送 token；续跑同一 run_id 时先推送检查点中已完成的环节
+        """
+        start_time = datetime.now()
+        run_id = run_id or uuid.uuid4().hex
+        self.logger.info(f"任务：{user_input['task_type']} -> 开始流式执行: {start_time}, run_id: {run_id}")
+        sections: Dict[str, Dict[str, Any]] = {}
+        error = None
+        try:
+            graph_input, run_config, sections = await self._prepare_run(user_input, run_id)
+            for key, section in sections.items():
+                yield {"event": "section", "section": key, "data": section_payload(section)}
+            async for event in self.graph.astream_events(graph_input, config=run_config, version="v2"):
+                node = event.get("metadata", {}).get("langgraph_node")
+                if node not in SECTION_NODES:
+                    continue
+                key = SECTION_NODES[node]
+                if tokens and event["event"] == "on_chat_model_stream":
+                    content = getattr(event["data"].get("chunk"), "content", "")
+                    if content:
+                        yield {"event": "token", "section": key, "content": content}
+                elif event["event"] == "on_chain_start" and event.get("name") == node:
+                    yield {"event": "start", "section": key}
+                elif event["event"] == "on_chain_end" and event.get("name") == node:
+                    output = event["data"].get("output") or {}
+                    sections[key] = output.get(key) or {}
+                    yield {"event": "section", "section": key, "data": section_payload(sections[key])}
+        except Exception as e:
+            self.logger.error(f"流式运行失败: {e}")
+            error = str(e)
+        failed = error is not None or len(sections) < len(SECTION_NODES)
+        yield {
+            "event": "done",
+            "status": (StepStatus.FAILED if failed else StepStatus.SUCCESS).value,
+            "data": {key: str(sections.get(key, {}).get("response", "")) for key in SECTION_NODES.values()},
+            "error": error,
+            "duration": f"{(datetime.now() - start_time).total_seconds():.2f}s",
+            "run_id": run_id
+        }
@@ -1,9 +1,13 @@
 import asyncio
-from typing import List, Dict, Any, Optional, Type
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Set, Tuple, Type
 from datetime import datetime, timedelta
 from langchain_core.tools import tool
 
 from a2w.api.middleware.db.sql_connector import SQLServerConnector
+from a2w.api.middleware.db.climatology import CLIMATOLOGY_TABLE
+from a2w.api.middleware.db.dialect import SQLSERVER
+from a2w.api.middleware.db.query_builder import bind_named, in_clause, limit_clause
 from a2w.smw.funcalls import register_tool
 
 _SQLServerExe: SQLServerConnector = None
@@ -11,11 +15,83 @@ def set_sqlserver_exe(db_instance: SQLServerConnector):
     global _SQLServerExe
     _SQLServerExe = db_instance
     
-async def _async_execute_query(sql: str) -> Dict[str, Any]:
+class QueryBatch:
+    """
+    ToolExecutor 合并执行扫描范围相同(表/日期/城市)的一组子查询时使用: 组内各工具构造好的 SQL 先登记，
+    所有成员都已登记(或未发出查询就已返回)后经 execute_query_batch 一次往返执行，再把结果分发回各工具。
+    成员在批次执行之后发出的查询(如同一工具的第二条 SQL)直接单独执行。
+    批次在独立任务中执行，某个成员超时被取消不会影响同组其他成员拿到结果。
+    按成员身份计数: 已登记查询的成员之后再返回(如超时被取消)不会被重复计入
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self._pending: List[Tuple[str, Optional[List[Any]], asyncio.Future]] = []
+        self._submitted: Set[object] = set()
+        self._finished: Set[object] = set()
+        self._flushed = False
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def submit(self, member: object, sql: str, values: Optional[List[Any]]) -> Optional[List[Dict[str, Any]]]:
+        if self._flushed:
+            return await _SQLServerExe.execute_query(sql, values)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((sql, values, future))
+        self._submitted.add(member)
+        self._flush_if_complete()
+        return await future
+
+    def member_done(self, member: object) -> None:
+        """成员工具返回(或异常、超时)后调用；只统计未发出查询的成员，已登记查询的成员已计入 _submitted"""
+        if not self._flushed and member not in self._submitted:
+            self._finished.add(member)
+            self._flush_if_complete()
+
+    def _flush_if_complete(self) -> None:
+        if self._flushed or len(self._submitted | self._finished) < self.size:
+            return
+        self._flushed = True
+        pending, self._pending = self._pending, []
+        if pending:
+            self._flush_task = asyncio.create_task(self._flush(pending))
+
+    @staticmethod
+    async def _flush(pending: List[Tuple[str, Optional[List[Any]], asyncio.Future]]) -> None:
+        try:
+            results = await _SQLServerExe.execute_query_batch([(sql, values) for sql, values, _ in pending])
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+_CURRENT_BATCH: ContextVar[Optional[Tuple[QueryBatch, object]]] = ContextVar("a2w_query_batch", default=None)
+
+def bind_query_batch(batch: Optional[QueryBatch]) -> object:
+    """
+    在当前任务中启用批次收集(asyncio 任务各自持有 context 副本，不影响其他任务)；
+    返回本任务的成员标识，结束时传给 batch.member_done
+    """
+    member = object()
+    _CURRENT_BATCH.set((batch, member) if batch is not None else None)
+    return member
+
+async def _async_execute_query(sql: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """sql 中的值一律用 :name 命名参数，执行前改写为 ? 占位符；SQL 文本只随查询结构变化，执行计划可复用"""
     if _SQLServerExe is None:
         raise ValueError("SQLServerExe 未初始化")
     try:
-        data = await _SQLServerExe.execute_query(sql)
+        values = None
+        if params:
+            sql, values = bind_named(sql, params)
+        current = _CURRENT_BATCH.get()
+        if current is not None:
+            batch, member = current
+            data = await batch.submit(member, sql, values)
+        else:
+            data = await _SQLServerExe.execute_query(sql, values)
         return {
             "status": "success",
             "message": "查询执行成功",
@@ -33,6 +109,17 @@ def get_table_name_by_date(date_str: str) -> str:
     except:
         return "automatic_station_his_day_data_2024"
 
+def get_day_table_source(start_date: str, end_date: str) -> str:
+    """
+    日表查询的 FROM 来源: 同一年份直接返回年表名；跨年时返回各年表 UNION ALL 的派生表，
+    调用方的 WHERE/GROUP BY 不变，日期条件由数据库下推到各年表
+    """
+    table_names = get_table_names_by_date_range(start_date, end_date)
+    if len(table_names) <= 1:
+        return get_table_name_by_date(start_date)
+    union_query = "\n            UNION ALL\n            ".join(f"SELECT * FROM {table}" for table in table_names)
+    return f"(\n            {union_query}\n        ) AS day_data"
+
 def get_table_names_by_date_range(start_date: str, end_date: str) -> List[str]:
     try:
         start_year = int(start_date[:4])
@@ -52,18 +139,95 @@ def get_table_names_for_year_range(start_year: int, end_year: int) -> List[str]:
         table_names.append(f"automatic_station_his_day_data_{year}")
     return table_names
 
-def build_city_conditions(cities: List[str]) -> str:
+def get_dialect() -> str:
+    return getattr(_SQLServerExe, "dialect", SQLSERVER)
+
+def build_limit(params: Dict[str, Any], limit: int) -> str:
+    """按当前连接器的方言生成取前 N 行子句(需放在 ORDER BY 之后)，N 写入 params"""
+    params["limit"] = int(limit)
+    return limit_clause(get_dialect())
+
+def get_db_pool_size(default: int = 4) -> int:
+    pool_config = getattr(_SQLServerExe, "pool_config", None)
+    return getattr(pool_config, "max_size", None) or default
+
+def get_station_index():
+    return getattr(_SQLServerExe, "station_index", None)
+
+def get_climatology_store():
+    return getattr(_SQLServerExe, "climatology", None)
+
+def use_climatology_store(years: List[int]) -> bool:
+    """这些年份可以从气候库读取时返回 True，否则(未构建/当年/构建失败)回退到逐年日表"""
+    store = get_climatology_store()
+    if store is None or not store.enabled:
+        return False
+    if store.covers(years):
+        store.routed += 1
+        return True
+    store.fallbacks += 1
+    return False
+
+def resolve_cities(cities: List[str]) -> List[str]:
+    """LLM 规划时偶尔会把站点名当作城市/区县传入，借助站点索引换成所属区县(去重、保持顺序)"""
+    index = get_station_index()
+    if not cities or index is None or not index.loaded:
+        return cities
+    resolved = []
+    for city in cities:
+        name = index.cnty_of(city) or city
+        if name not in resolved:
+            resolved.append(name)
+    return resolved
+
+def build_city_conditions(cities: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """
+    城市/区县条件及其参数。站点索引已加载时按名称解析为区县列表，生成精确匹配的 cnty IN (...)；
+    索引中找不到的名称仍按 city/cnty 模糊匹配(参数化的 LIKE)
+    """
     if not cities:
-        return "1=1"
+        return "1=1", {}
     
-    conditions = []
-    for city in cities:
-        conditions.append(f"(city LIKE '%{city}%' OR cnty LIKE '%{city}%')")
+    index = get_station_index()
+    cntys, patterns = [], []
+    for city in resolve_cities(cities):
+        matched = index.cntys_matching(city) if index is not None and index.loaded else []
+        if matched:
+            cntys.extend(cnty for cnty in matched if cnty not in cntys)
+        else:
+            patterns.append(f"%{city}%")
+    
+    conditions, params = [], {}
+    if cntys:
+        condition, params = in_clause("cnty", "cnty", cntys)
+        conditions.append(condition)
+    for i, pattern in enumerate(patterns):
+        conditions.append(f"(city LIKE :region_{i} OR cnty LIKE :region_{i})")
+        params[f"region_{i}"] = pattern
     
-    return f"({' OR '.join(conditions)})"
+    return f"({' OR '.join(conditions)})", params
 
-def build_date_condition(start_date: str, end_date: str) -> str:
-    return f"observation_time BETWEEN '{start_date}' AND '{end_date}'"
+def as_time_param(date_str: str) -> str:
+    """纯日期补齐为当天 00:00:00，与 SQL Server 把 '2024-01-31' 隐式转换为 datetime 的结果一致"""
+    return f"{date_str} 00:00:00" if len(date_str) == 10 else date_str
+
+def build_date_condition(start_date: str, end_date: str, prefix: str = "") -> Tuple[str, Dict[str, Any]]:
+    """prefix 用于同一条 SQL 中的多个日期范围(如历年同期的各年份)"""
+    return (f"observation_time BETWEEN :{prefix}start_time AND :{prefix}end_time",
+            {f"{prefix}start_time": as_time_param(start_date), f"{prefix}end_time": as_time_param(end_date)})
+
+def build_period_conditions(start_date: str, end_date: str, cities: List[str], prefix: str = "") -> Tuple[str, Dict[str, Any]]:
+    """日期范围 + 城市条件，返回 (WHERE 条件, 参数)"""
+    date_condition, params = build_date_condition(start_date, end_date, prefix)
+    city_condition, city_params = build_city_conditions(cities)
+    return f"{date_condition}\n          AND {city_condition}", {**params, **city_params}
+
+def build_month_day_condition(start_dt: datetime, end_dt: datetime, month_day_expr: str) -> Tuple[str, Dict[str, Any]]:
+    """历年同期按月日(MM * 100 + DD)筛选；跨月窗口按月日区间，跨年窗口(如 12-20 ~ 01-10)取首尾两段"""
+    params = {"start_md": start_dt.month * 100 + start_dt.day, "end_md": end_dt.month * 100 + end_dt.day}
+    if params["start_md"] <= params["end_md"]:
+        return f"{month_day_expr} BETWEEN :start_md AND :end_md", params
+    return f"({month_day_expr} >= :start_md OR {month_day_expr} <= :end_md)", params
 
 def build_union_sql_for_tables(tables: List[str], select_sql: str, where_conditions: str) -> str:
     union_parts = []
@@ -85,12 +249,10 @@ async def execute_cross_year_query(start_date: str, end_date: str, cities: List[
         select_fields: SELECT字段
         group_by: GROUP BY子句
         order_by: ORDER BY子句
-        limit: LIMIT子句
+        limit: 返回行数上限(按方言生成 OFFSET FETCH / LIMIT；未指定 order_by 时按任意顺序截取)
     """
     table_names = get_table_names_by_date_range(start_date, end_date)
-    city_condition = build_city_conditions(cities)
-    date_condition = build_date_condition(start_date, end_date)
-    where_condition = f"{date_condition} AND {city_condition}"
+    where_condition, params = build_period_conditions(start_date, end_date, cities)
     if len(table_names) == 1:
         sql = f"""
         SELECT {select_fields}
@@ -99,12 +261,12 @@ async def execute_cross_year_query(start_date: str, end_date: str, cities: List[
         """
         if group_by:
             sql += f" GROUP BY {group_by}"
-        if order_by:
-            sql += f" ORDER BY {order_by}"
+        if order_by or limit:
+            sql += f" ORDER BY {order_by or '(SELECT NULL)'}"
         if limit:
-            sql += f" LIMIT {limit}"
+            sql += f" {build_limit(params, limit)}"
         
-        return await _async_execute_query(sql)
+        return await _async_execute_query(sql, params)
     union_parts = []
     for table in table_names:
         union_sql = f"SELECT {select_fields} FROM {table} WHERE {where_condition}"
@@ -122,12 +284,22 @@ async def execute_cross_year_query(start_date: str, end_date: str, cities: List[
     else:
         sql = f"SELECT * FROM ({union_query}) AS combined_data"
     
-    if order_by:
-        sql += f" ORDER BY {order_by}"
+    if order_by or limit:
+        sql += f" ORDER BY {order_by or '(SELECT NULL)'}"
     if limit:
-        sql += f" LIMIT {limit}"
+        sql += f" {build_limit(params, limit)}"
     
-    return await _async_execute_query(sql)
+    return await _async_execute_query(sql, params)
+
+# 取值受限的参数(与各工具 docstring 一致)，PECW 规则修复据此纠正 LLM 规划出的参数值
+TOOL_PARAM_CHOICES: Dict[str, Dict[str, List[str]]] = {
+    "query_precipitation_data": {"aggregation": ["daily", "total", "average", "max"]},
+    "query_temperature_data": {"aggregation": ["daily", "average", "max", "min", "range"]},
+    "query_comprehensive_weather": {"include_metrics": ["temperature", "precipitation", "wind", "humidity", "pressure", "visibility"]},
+    "query_weather_days_statistics": {"weather_types": ["rainy", "sunny", "windy", "foggy", "cold", "hot"]},
+    "query_comparison_data": {"compare_period": ["climatology", "last_year", "same_period_last_year"]},
+    "query_historical_same_period": {"metrics": ["temperature", "precipitation", "humidity", "wind"]},
+}
 
 @register_tool
 @tool
@@ -150,8 +322,8 @@ async def query_precipitation_data(start_date: str, end_date: str, cities: List[
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     if aggregation == "daily":
         sql = f"""
         SELECT 
@@ -162,8 +334,7 @@ async def query_precipitation_data(start_date: str, end_date: str, cities: List[
             MAX(pre_max_1h) as max_hourly_precipitation,
             pre_max_1h_otime as max_precipitation_time
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY observation_time, city, cnty, pre_max_1h_otime
         ORDER BY observation_time, city
         """
@@ -177,8 +348,7 @@ async def query_precipitation_data(start_date: str, end_date: str, cities: List[
             COUNT(DISTINCT observation_time) as rainy_days,
             MAX(pre_max_1h) as max_hourly_precipitation
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY city, cnty
         ORDER BY total_precipitation DESC
         """
@@ -194,10 +364,9 @@ async def query_precipitation_data(start_date: str, end_date: str, cities: List[
             pre_time_2020 + pre_time_0808 as daily_precipitation,
             pre_max_1h_otime as occurrence_time
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         ORDER BY pre_max_1h DESC
-        LIMIT 10
+        {build_limit(params, 10)}
         """
     
     else:  # average
@@ -209,11 +378,10 @@ async def query_precipitation_data(start_date: str, end_date: str, cities: List[
             AVG(pre_max_1h) as avg_max_hourly_precipitation,
             COUNT(DISTINCT observation_time) as observation_days
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY {city_group}
         """
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -237,8 +405,8 @@ async def query_temperature_data(start_date: str, end_date: str, cities: List[st
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     
     if aggregation == "daily":
         sql = f"""
@@ -251,8 +419,7 @@ async def query_temperature_data(start_date: str, end_date: str, cities: List[st
             MIN(tem_min) as min_temperature,
             MAX(tem_max) - MIN(tem_min) as daily_range
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY observation_time, city, cnty
         ORDER BY observation_time
         """
@@ -268,11 +435,10 @@ async def query_temperature_data(start_date: str, end_date: str, cities: List[st
             tem_max_otime as occurrence_time,
             tem_avg as avg_temperature_on_day
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
           AND tem_max IS NOT NULL
         ORDER BY tem_max DESC
-        LIMIT 10
+        {build_limit(params, 10)}
         """
     
     elif aggregation == "min":
@@ -286,11 +452,10 @@ async def query_temperature_data(start_date: str, end_date: str, cities: List[st
             tem_min_otime as occurrence_time,
             tem_avg as avg_temperature_on_day
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
           AND tem_min IS NOT NULL
         ORDER BY tem_min ASC
-        LIMIT 10
+        {build_limit(params, 10)}
         """
     
     elif aggregation == "range":
@@ -302,8 +467,7 @@ async def query_temperature_data(start_date: str, end_date: str, cities: List[st
             MAX(tem_max - tem_min) as max_daily_range,
             MIN(tem_max - tem_min) as min_daily_range
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY {city_group}
         """
     
@@ -320,12 +484,11 @@ async def query_temperature_data(start_date: str, end_date: str, cities: List[st
             MAX(tem_max) - MIN(tem_min) as period_temperature_range,
             COUNT(DISTINCT observation_time) as observation_days
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY {city_group}
         """
     
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -350,8 +513,8 @@ async def query_wind_data(start_date: str, end_date: str, cities: List[str] = []
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     
     if include_extremes:
         sql = f"""
@@ -367,11 +530,10 @@ async def query_wind_data(start_date: str, end_date: str, cities: List[str] = []
             win_s_max_otime as max_speed_time,
             win_s_inst_max_otime as extreme_speed_time
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
           AND win_s_max IS NOT NULL
         ORDER BY win_s_max DESC
-        LIMIT 10
+        {build_limit(params, 10)}
         """
     
     elif include_direction:
@@ -384,8 +546,7 @@ async def query_wind_data(start_date: str, end_date: str, cities: List[str] = []
             AVG(win_s_2mi_avg) as avg_wind_speed,
             AVG(win_s_max) as avg_max_wind_speed
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
           AND win_d_avg_2mi_c IS NOT NULL
         GROUP BY {city_group}, win_d_avg_2mi_c
         ORDER BY {city_group}, occurrence_count DESC
@@ -400,13 +561,12 @@ async def query_wind_data(start_date: str, end_date: str, cities: List[str] = []
             AVG(win_s_10mi_avg) as avg_10min_wind_speed,
             COUNT(*) as observation_count
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
           AND win_s_2mi_avg IS NOT NULL
         GROUP BY {city_group}
         """
     
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -430,8 +590,8 @@ async def query_humidity_data(start_date: str, end_date: str, cities: List[str]
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     city_group = "city, cnty" if cities else "1"
     
     min_humidity_fields = ""
@@ -448,13 +608,12 @@ async def query_humidity_data(start_date: str, end_date: str, cities: List[str]
         COUNT(DISTINCT observation_time) as observation_days
         {min_humidity_fields}
     FROM {table_name}
-    WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-      AND {city_condition}
+    WHERE {where}
       AND rhu_avg IS NOT NULL {min_humidity_where}
     GROUP BY {city_group}
     """
     
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -479,8 +638,8 @@ async def query_pressure_data(start_date: str, end_date: str, cities: List[str]
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     
     if include_extremes:
         sql = f"""
@@ -495,11 +654,10 @@ async def query_pressure_data(start_date: str, end_date: str, cities: List[str]
             prs_min_otime as min_pressure_time,
             prs_sea_avg as sea_level_pressure
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
           AND prs_max IS NOT NULL AND prs_min IS NOT NULL
         ORDER BY (prs_max - prs_min) DESC
-        LIMIT 10
+        {build_limit(params, 10)}
         """
     
     else:
@@ -514,13 +672,12 @@ async def query_pressure_data(start_date: str, end_date: str, cities: List[str]
             AVG(prs_min) as avg_min_pressure
             {sea_level_field}
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
           AND prs_avg IS NOT NULL
         GROUP BY {city_group}
         """
     
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -544,8 +701,8 @@ async def query_visibility_data(start_date: str, end_date: str, cities: List[str
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     city_group = "city, cnty" if cities else "1"
     
     min_visibility_fields = ", MIN(vis_min) as min_visibility, AVG(vis_min) as avg_min_visibility" if include_min_visibility else ""
@@ -556,12 +713,11 @@ async def query_visibility_data(start_date: str, end_date: str, cities: List[str
         AVG(COALESCE(vis_min, 0)) as avg_visibility
         {min_visibility_fields}
     FROM {table_name}
-    WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-      AND {city_condition}
+    WHERE {where}
     GROUP BY {city_group}
     """
     
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -588,8 +744,8 @@ async def query_comprehensive_weather(start_date: str, end_date: str, cities: Li
     if include_metrics is None:
         include_metrics = ["temperature", "precipitation", "wind", "humidity"]
     
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     city_group = "city, cnty" if cities else "1"
 
     fields = []
@@ -638,12 +794,11 @@ async def query_comprehensive_weather(start_date: str, end_date: str, cities: Li
         {fields_str},
         COUNT(DISTINCT observation_time) as observation_days
     FROM {table_name}
-    WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-      AND {city_condition}
+    WHERE {where}
     GROUP BY {city_group}
     """
     
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -667,8 +822,8 @@ async def query_weather_days_statistics(start_date: str, end_date: str, cities:
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    table_name = get_table_name_by_date(start_date)
-    city_condition = build_city_conditions(cities)
+    table_name = get_day_table_source(start_date, end_date)
+    where, params = build_period_conditions(start_date, end_date, cities)
     city_group = "city, cnty" if cities else "1"
     
     # 构建天气类型条件
@@ -698,8 +853,7 @@ async def query_weather_days_statistics(start_date: str, end_date: str, cities:
             SUM(CASE WHEN win_s_max > 10.8 THEN 1 ELSE 0 END) as windy_days,
             SUM(CASE WHEN vis_min < 1000 THEN 1 ELSE 0 END) as foggy_days
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY {city_group}
         """
     else:
@@ -717,12 +871,11 @@ async def query_weather_days_statistics(start_date: str, end_date: str, cities:
             COUNT(DISTINCT observation_time) as total_days,
             {conditions_str}
         FROM {table_name}
-        WHERE observation_time BETWEEN '{start_date}' AND '{end_date}'
-          AND {city_condition}
+        WHERE {where}
         GROUP BY {city_group}
         """
     
-    result = await _async_execute_query(sql)
+    result = await _async_execute_query(sql, params)
     return result
 
 @register_tool
@@ -747,8 +900,10 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
             - row_count: 数据行数
             - query_time: 查询执行时间
     """
-    city_condition = build_city_conditions(cities)
+    city_condition, params = build_city_conditions(cities)
     city_group = "city, cnty" if cities else "1"
+    # 各年表 UNION 时只取原始列，聚合在外层完成
+    raw_fields = f"{'city, cnty,' if cities else ''} observation_time, tem_avg, pre_time_2020, pre_time_0808, rhu_avg"
     
     try:
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -759,6 +914,10 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
             last_year_end = (end_dt - timedelta(days=365)).strftime("%Y-%m-%d")
             current_tables = get_table_names_by_date_range(start_date, end_date)
             last_year_tables = get_table_names_by_date_range(last_year_start, last_year_end)
+            current_dates, date_params = build_date_condition(start_date, end_date)
+            last_year_dates, last_year_params = build_date_condition(last_year_start, last_year_end, "last_year_")
+            params.update(date_params)
+            params.update(last_year_params)
 
             current_select_fields = f"""
                 {'city, cnty,' if cities else ''}
@@ -779,16 +938,14 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
             WITH current_data AS (
                 SELECT {current_select_fields}
                 FROM (
-                    {build_union_sql_for_tables(current_tables, current_select_fields, 
-                                               f"{build_date_condition(start_date, end_date)} AND {city_condition}")}
+                    {build_union_sql_for_tables(current_tables, raw_fields, f"{current_dates} AND {city_condition}")}
                 ) AS t
                 GROUP BY {city_group}
             ),
             last_year_data AS (
                 SELECT {last_year_select_fields}
                 FROM (
-                    {build_union_sql_for_tables(last_year_tables, last_year_select_fields,
-                                               f"{build_date_condition(last_year_start, last_year_end)} AND {city_condition}")}
+                    {build_union_sql_for_tables(last_year_tables, raw_fields, f"{last_year_dates} AND {city_condition}")}
                 ) AS t
                 GROUP BY {city_group}
             )
@@ -827,6 +984,10 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
             climatology_start_year = start_dt.year - climatology_years
             climatology_end_year = start_dt.year - 1
             climatology_tables = get_table_names_for_year_range(climatology_start_year, climatology_end_year)
+            current_dates, date_params = build_date_condition(start_date, end_date)
+            params.update(date_params)
+            params.update(climatology_start_year=climatology_start_year, climatology_end_year=climatology_end_year,
+                          period_days=(end_dt - start_dt).days + 1)
 
             climatology_select_fields = f"""
                 {'city, cnty,' if cities else ''}
@@ -845,20 +1006,39 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
                 COUNT(DISTINCT observation_time) as current_days
             """
 
-            climatology_base_query = f"""
-            SELECT 
-                {'city, cnty,' if cities else ''}
-                year,
-                AVG(tem_avg) as year_avg_temperature,
-                AVG(COALESCE(pre_time_2020, 0) + COALESCE(pre_time_0808, 0)) as year_avg_precipitation,
-                AVG(rhu_avg) as year_avg_humidity
-            FROM (
-                {build_union_sql_for_tables(climatology_tables, 
-                                           f"{'city, cnty,' if cities else ''} year, tem_avg, pre_time_2020, pre_time_0808, rhu_avg",
-                                           f"MONTH(observation_time) = {start_dt.month} AND DAY(observation_time) BETWEEN {start_dt.day} AND {end_dt.day} AND {city_condition}")}
-            ) AS t
-            GROUP BY {'city, cnty,' if cities else ''} year
-            """
+            if use_climatology_store(list(range(climatology_start_year, climatology_end_year + 1))):
+                month_day_condition, md_params = build_month_day_condition(start_dt, end_dt, "month_day")
+                # 气候库: 区县 x 日 的 SUM/COUNT，按 (month_day, year) 索引查找，与逐年 AVG 结果一致
+                climatology_base_query = f"""
+                SELECT
+                    {'city, cnty,' if cities else ''}
+                    year,
+                    SUM(tem_avg_sum) / NULLIF(SUM(tem_avg_cnt), 0) as year_avg_temperature,
+                    SUM(precip_sum) / NULLIF(SUM(precip_cnt), 0) as year_avg_precipitation,
+                    SUM(rhu_avg_sum) / NULLIF(SUM(rhu_avg_cnt), 0) as year_avg_humidity
+                FROM {CLIMATOLOGY_TABLE}
+                WHERE {month_day_condition}
+                    AND year BETWEEN :climatology_start_year AND :climatology_end_year AND {city_condition}
+                GROUP BY {'city, cnty,' if cities else ''} year
+                """
+            else:
+                month_day_condition, md_params = build_month_day_condition(
+                    start_dt, end_dt, "MONTH(observation_time) * 100 + DAY(observation_time)")
+                climatology_base_query = f"""
+                SELECT
+                    {'city, cnty,' if cities else ''}
+                    year,
+                    AVG(tem_avg) as year_avg_temperature,
+                    AVG(COALESCE(pre_time_2020, 0) + COALESCE(pre_time_0808, 0)) as year_avg_precipitation,
+                    AVG(rhu_avg) as year_avg_humidity
+                FROM (
+                    {build_union_sql_for_tables(climatology_tables,
+                                               f"{'city, cnty,' if cities else ''} year, tem_avg, pre_time_2020, pre_time_0808, rhu_avg",
+                                               f"{month_day_condition} AND {city_condition}")}
+                ) AS t
+                GROUP BY {'city, cnty,' if cities else ''} year
+                """
+            params.update(md_params)
 
             sql = f"""
             WITH climatology_base AS (
@@ -868,7 +1048,7 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
                 SELECT 
                     {'city, cnty,' if cities else ''}
                     AVG(year_avg_temperature) as climatology_avg_temperature,
-                    AVG(year_avg_precipitation) * {((end_dt - start_dt).days + 1)} as climatology_avg_total_precipitation,
+                    AVG(year_avg_precipitation) * :period_days as climatology_avg_total_precipitation,
                     AVG(year_avg_humidity) as climatology_avg_humidity,
                     COUNT(DISTINCT year) as climatology_years_count
                 FROM climatology_base
@@ -877,8 +1057,7 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
             current_data AS (
                 SELECT {current_select_fields}
                 FROM (
-                    {build_union_sql_for_tables(current_tables, current_select_fields,
-                                               f"{build_date_condition(start_date, end_date)} AND {city_condition}")}
+                    {build_union_sql_for_tables(current_tables, raw_fields, f"{current_dates} AND {city_condition}")}
                 ) AS t
                 GROUP BY {city_group}
             )
@@ -910,7 +1089,7 @@ async def query_comparison_data(start_date: str, end_date: str, cities: List[str
         else:
             return await query_comprehensive_weather(start_date, end_date, cities)
         
-        result = await _async_execute_query(sql)
+        result = await _async_execute_query(sql, params)
         return result
         
     except Exception as e:
@@ -946,84 +1125,85 @@ async def query_historical_same_period(start_date: str, end_date: str, cities: L
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_dt = datetime.strptime(end_date, "%Y-%m-%d")
         
-        city_condition = build_city_conditions(cities)
-        city_group = "city, cnty" if cities else "1"
+        city_condition, params = build_city_conditions(cities)
         
-        # 构建每年查询的UNION部分
+        # 各指标在原表与气候库上的聚合写法，列名不带年份后缀，各年份的子查询才能 UNION ALL
+        metric_fields = {
+            "temperature": [
+                ("AVG(tem_avg)", "SUM(tem_avg_sum) / NULLIF(SUM(tem_avg_cnt), 0)", "avg_temp"),
+                ("MAX(tem_max)", "MAX(tem_max)", "max_temp"),
+                ("MIN(tem_min)", "MIN(tem_min)", "min_temp"),
+            ],
+            "precipitation": [
+                ("SUM(COALESCE(pre_time_2020, 0) + COALESCE(pre_time_0808, 0))", "SUM(precip_sum)", "total_precip"),
+                ("MAX(pre_max_1h)", "MAX(pre_max_1h)", "max_hourly_precip"),
+            ],
+            "humidity": [
+                ("AVG(rhu_avg)", "SUM(rhu_avg_sum) / NULLIF(SUM(rhu_avg_cnt), 0)", "avg_humidity"),
+                ("MIN(rhu_min)", "MIN(rhu_min)", "min_humidity"),
+            ],
+            "wind": [
+                ("AVG(win_s_2mi_avg)", "SUM(win_s_2mi_avg_sum) / NULLIF(SUM(win_s_2mi_avg_cnt), 0)", "avg_wind_speed"),
+                ("MAX(win_s_max)", "MAX(win_s_max)", "max_wind_speed"),
+            ],
+        }
+        selected = [field for metric in metric_fields if metric in metrics for field in metric_fields[metric]]
+        group_clause = "GROUP BY city, cnty" if cities else ""
+
+        # 构建每年查询的UNION部分: 已结束年份读气候库(按 obs_date 索引查找)，其余年份查逐年日表
         union_parts = []
         
-        for i in range(years_back + 1):
-            year_offset = i
+        for year_offset in range(years_back + 1):
             year_start = (start_dt.replace(year=start_dt.year - year_offset)).strftime("%Y-%m-%d")
             year_end = (end_dt.replace(year=end_dt.year - year_offset)).strftime("%Y-%m-%d")
-            
-            year_tables = get_table_names_by_date_range(year_start, year_end)
-            
-            # 构建每年的查询字段
-            year_fields = []
-            if "temperature" in metrics:
-                year_fields.extend([
-                    f"AVG(tem_avg) as avg_temp_year_{year_offset}",
-                    f"MAX(tem_max) as max_temp_year_{year_offset}",
-                    f"MIN(tem_min) as min_temp_year_{year_offset}"
-                ])
-            if "precipitation" in metrics:
-                year_fields.extend([
-                    f"SUM(COALESCE(pre_time_2020, 0) + COALESCE(pre_time_0808, 0)) as total_precip_year_{year_offset}",
-                    f"MAX(pre_max_1h) as max_hourly_precip_year_{year_offset}"
-                ])
-            if "humidity" in metrics:
-                year_fields.extend([
-                    f"AVG(rhu_avg) as avg_humidity_year_{year_offset}",
-                    f"MIN(rhu_min) as min_humidity_year_{year_offset}"
-                ])
-            if "wind" in metrics:
-                year_fields.extend([
-                    f"AVG(win_s_2mi_avg) as avg_wind_speed_year_{year_offset}",
-                    f"MAX(win_s_max) as max_wind_speed_year_{year_offset}"
-                ])
-            
-            fields_str = ", ".join(year_fields)
-            
-            # 构建每年的查询
-            year_query = f"""
-            SELECT 
-                {'city, cnty,' if cities else ''}
-                {start_dt.year - year_offset} as year,
-                {fields_str},
-                COUNT(DISTINCT observation_time) as observation_days
-            FROM (
-                {build_union_sql_for_tables(year_tables, 
-                                           f"{'city, cnty,' if cities else ''} tem_avg, tem_max, tem_min, pre_time_2020, pre_time_0808, pre_max_1h, rhu_avg, rhu_min, win_s_2mi_avg, win_s_max",
-                                           f"{build_date_condition(year_start, year_end)} AND {city_condition}")}
-            ) AS t
-            GROUP BY {city_group}
-            """
+            prefix = f"y{year_offset}_"
+            params[f"{prefix}year"] = start_dt.year - year_offset
+
+            if use_climatology_store(list(range(int(year_start[:4]), int(year_end[:4]) + 1))):
+                fields_str = ", ".join(f"{store_expr} as {name}" for _, store_expr, name in selected)
+                params.update({f"{prefix}start_day": year_start, f"{prefix}end_day": year_end})
+                year_query = f"""
+                SELECT
+                    {'city, cnty,' if cities else ''}
+                    :{prefix}year as year,
+                    {fields_str},
+                    COUNT(DISTINCT obs_date) as observation_days
+                FROM {CLIMATOLOGY_TABLE}
+                WHERE obs_date BETWEEN :{prefix}start_day AND :{prefix}end_day AND {city_condition}
+                {group_clause}
+                """
+            else:
+                year_tables = get_table_names_by_date_range(year_start, year_end)
+                fields_str = ", ".join(f"{raw_expr} as {name}" for raw_expr, _, name in selected)
+                date_condition, date_params = build_date_condition(year_start, year_end, prefix)
+                params.update(date_params)
+                year_query = f"""
+                SELECT
+                    {'city, cnty,' if cities else ''}
+                    :{prefix}year as year,
+                    {fields_str},
+                    COUNT(DISTINCT observation_time) as observation_days
+                FROM (
+                    {build_union_sql_for_tables(year_tables,
+                                               f"{'city, cnty,' if cities else ''} observation_time, tem_avg, tem_max, tem_min, pre_time_2020, pre_time_0808, pre_max_1h, rhu_avg, rhu_min, win_s_2mi_avg, win_s_max",
+                                               f"{date_condition} AND {city_condition}")}
+                ) AS t
+                {group_clause}
+                """
             
             union_parts.append(year_query)
         
-        # 合并所有年份的查询
+        # 合并所有年份的查询，每个城市/地区每年一行
         union_query = "\nUNION ALL\n".join(union_parts)
-        
-        # 按城市/地区分组，获取每年的数据
         sql = f"""
-        SELECT 
-            {'city, cnty,' if cities else ''}
-            year,
-            {', '.join([f'avg_temp_year_{i}' for i in range(years_back + 1)]) if 'temperature' in metrics else ''}
-            {', ' if 'temperature' in metrics and 'precipitation' in metrics else ''}
-            {', '.join([f'total_precip_year_{i}' for i in range(years_back + 1)]) if 'precipitation' in metrics else ''}
-            {', ' if ('temperature' in metrics or 'precipitation' in metrics) and 'humidity' in metrics else ''}
-            {', '.join([f'avg_humidity_year_{i}' for i in range(years_back + 1)]) if 'humidity' in metrics else ''}
-            {', ' if ('temperature' in metrics or 'precipitation' in metrics or 'humidity' in metrics) and 'wind' in metrics else ''}
-            {', '.join([f'avg_wind_speed_year_{i}' for i in range(years_back + 1)]) if 'wind' in metrics else ''}
+        SELECT *
         FROM (
             {union_query}
         ) AS all_years
         ORDER BY {'city, cnty,' if cities else ''} year
         """
         
-        result = await _async_execute_query(sql)
+        result = await _async_execute_query(sql, params)
         return result
         
     except Exception as e:
@@ -0,0 +1,116 @@
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from a2w.api.middleware.db.row_normalizer import HOUR_TABLE_NORMALIZER
+
+# (小时表列名, 聚合方式) —— 与 sql_template 中 TABLE_HOUR_* 的聚合口径一致
+HOUR_METRICS: List[Tuple[str, str]] = [
+    ("气温", "avg"),
+    ("气压", "avg"),
+    ("海平面气压", "avg"),
+    ("相对湿度", "avg"),
+    ("降水量", "sum"),
+    ("风速", "avg"),
+    ("水平能见度", "avg"),
+]
+
+# 输出列名与对应 SQL 模板保持一致(包括 TABLE_HOUR_DAY 中的历史列名)
+OUTPUT_COLUMNS: Dict[Tuple[str, bool], List[str]] = {
+    ("half", False): ["平均温度", "平均气压", "平均海平面气压", "平均相对湿度", "总降水量", "平均风速", "平均水平能见度"],
+    ("half", True): ["平均温度", "平均气压", "平均海平面气压", "平均相对湿度", "总降水量", "平均风速", "平均水平能见度"],
+    ("daily", False): ["日平均温度", "日平均气压", "日平均海平面雅琪", "日平均相对湿度", "日平均降水量", "日平均风速", "日平均水平能见度"],
+    ("daily", True): ["日平均温度", "日平均气压", "日平均海平面气压", "日平均相对湿度", "日降水量", "日平均风速", "日平均水平能见度"],
+}
+
+_ONE_DECIMAL = Decimal("0.1")
+
+
+def round1(value: Optional[float]) -> Optional[float]:
+    """与 SQL Server ROUND(x, 1) 一致的四舍五入(远离零)，避免 Python round 的银行家舍入"""
+    if value is None:
+        return None
+    return float(Decimal(repr(value)).quantize(_ONE_DECIMAL, rounding=ROUND_HALF_UP))
+
+
+def split_observation_time(value: Any) -> Tuple[str, int]:
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d"), value.hour
+    text = str(value)
+    return text[:10], int(text[11:13]) if len(text) >= 13 else 0
+
+
+class HourlyAggregator:
+    """
+    在应用侧增量聚合逐小时数据(上午/下午 或 逐日)，按批次 add_batch，内存只与分组数相关、与行数无关。
+    聚合口径复刻 TABLE_HOUR_HALF(_CNTY) / TABLE_HOUR_DAY(_CNTY)：
+        先按 站点-日期-时段 求 AVG/SUM 并 ROUND(1)，by_county 时再按 区县-日期-时段 对站点结果求 AVG/SUM 并 ROUND(1)
+    输入行需保留 NULL(TYPE_ONLY_NORMALIZER)，与 SQL 聚合忽略 NULL 的语义一致
+    """
+    def __init__(self, aggregation: str = "half", by_county: bool = False):
+        if aggregation not in ("half", "daily"):
+            raise ValueError(f"Unsupported aggregation for HourlyAggregator: {aggregation}")
+        self.aggregation = aggregation
+        self.by_county = by_county
+        self.rows_seen = 0
+        # (station_name, cnty, 日期, 时段) -> [sum_0, count_0, sum_1, count_1, ...]
+        self._station_acc: Dict[Tuple[str, str, str, str], List[float]] = {}
+
+    def add_batch(self, rows: Iterable[Dict[str, Any]]) -> None:
+        half = self.aggregation == "half"
+        acc = self._station_acc
+        width = len(HOUR_METRICS) * 2
+        for row in rows:
+            self.rows_seen += 1
+            day, hour = split_observation_time(row.get("observation_time"))
+            period = ("上午" if hour < 12 else "下午") if half else ""
+            key = (row.get("station_name"), row.get("cnty") or "", day, period)
+            slot = acc.get(key)
+            if slot is None:
+                slot = acc[key] = [0.0] * width
+            for i, (col, _) in enumerate(HOUR_METRICS):
+                value = row.get(col)
+                if value is not None:
+                    slot[2 * i] += value
+                    slot[2 * i + 1] += 1
+
+    def _station_values(self, slot: List[float]) -> List[Optional[float]]:
+        values = []
+        for i, (_, how) in enumerate(HOUR_METRICS):
+            total, count = slot[2 * i], slot[2 * i + 1]
+            if not count:
+                values.append(None)
+            else:
+                values.append(round1(total if how == "sum" else total / count))
+        return values
+
+    def result(self) -> List[Dict[str, Any]]:
+        names = OUTPUT_COLUMNS[(self.aggregation, self.by_county)]
+        half = self.aggregation == "half"
+        group_col = "站名" if self.by_county else "station_name"
+        key_cols = [group_col, "日期"] + (["时段"] if half else [])
+
+        grouped: Dict[Tuple[str, str, str], List[List[Optional[float]]]] = {}
+        for (station, cnty, day, period), slot in self._station_acc.items():
+            group = cnty if self.by_county else station
+            grouped.setdefault((group, day, period), []).append(self._station_values(slot))
+
+        rows = []
+        for (group, day, period) in sorted(grouped):
+            members = grouped[(group, day, period)]
+            if self.by_county:
+                values = []
+                for i, (_, how) in enumerate(HOUR_METRICS):
+                    column = [m[i] for m in members if m[i] is not None]
+                    if not column:
+                        values.append(None)
+                    else:
+                        values.append(round1(sum(column) if how == "sum" else sum(column) / len(column)))
+            else:
+                values = members[0]
+            key_values = [group, day] + ([period] if half else [])
+            rows.append(tuple(key_values + values))
+
+        description = [(name, None) for name in key_cols + names]
+        # 空值默认值与能见度哨兵值仍按小时表规则处理，保证与服务端聚合路径输出一致
+        return HOUR_TABLE_NORMALIZER.normalize(rows, description)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : climatology_build.py
+# @Description: 构建/重建历年同期、气候值预计算库 automatic_station_climatology_day
+#   服务启动后会在后台补建缺失的已结束年份；日表有订正或首次上线时用本脚本显式重建
+# 用法(在仓库根目录，数据库连接读取 .env):
+#   PYTHONPATH=. python pre_work/climatology_build.py               # 只补建缺失的年份
+#   PYTHONPATH=. python pre_work/climatology_build.py --full        # 重建全部已结束年份
+#   PYTHONPATH=. python pre_work/climatology_build.py --years 2020-2023
+#   PYTHONPATH=. python pre_work/climatology_build.py --sqlite data/local/a2w_weather.db   # 本地替身库
+# 重建后运行中的服务需调用 POST /smw/climatology/rebuild(或重启)以刷新已构建年份并清空结果缓存
+import argparse
+import asyncio
+import time
+from typing import List
+
+from a2w.api.middleware.db.climatology import ClimatologyConfig
+from a2w.api.middleware.db.pool import PoolConfig
+
+
+def parse_years(text: str) -> List[int]:
+    if not text:
+        return []
+    if "-" in text:
+        start, end = text.split("-", 1)
+        return list(range(int(start), int(end) + 1))
+    return [int(y) for y in text.split(",")]
+
+
+def build_connector(args):
+    if args.sqlite:
+        from a2w.api.middleware.db.local_connector import SQLiteConnector
+        return SQLiteConnector(args.sqlite, pool_config=PoolConfig(min_size=1, max_size=2),
+                               climatology_config=ClimatologyConfig(first_year=args.first_year))
+
+    from a2w.configs import GlobalConfig
+    config = GlobalConfig()
+    climatology_config = ClimatologyConfig.from_global_config(config)
+    climatology_config.first_year = args.first_year or climatology_config.first_year
+    if config.get("db_backend") == "sqlite":
+        from a2w.api.middleware.db.local_connector import SQLiteConnector
+        return SQLiteConnector(config.get("local_db_path"), pool_config=PoolConfig.from_global_config(config),
+                               climatology_config=climatology_config)
+    from a2w.api.middleware.db.sql_connector import SQLServerConnector
+    return SQLServerConnector(
+        config.get("db_host"), config.get("db_port"), config.get("db_name"), config.get("db_username"), config.get("db_password"),
+        pool_config=PoolConfig.from_global_config(config), climatology_config=climatology_config
+    )
+
+
+async def run(args) -> int:
+    db = build_connector(args)
+    await db.connect()
+    try:
+        start = time.perf_counter()
+        await db.climatology.load()
+        years = parse_years(args.years) if args.years else None
+        result = await db.climatology.rebuild(years=years, full=args.full)
+        snapshot = db.climatology.snapshot()
+        print(f"built {len(result['built'])} years, failed: {result['failed'] or 'none'}, "
+              f"store covers {snapshot['first_year']}~{snapshot['last_year']} ({snapshot['years']} years) "
+              f"in {time.perf_counter() - start:.1f}s")
+        return 1 if result["failed"] else 0
+    finally:
+        await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建/重建历年同期、气候值预计算库")
+    parser.add_argument("--years", default=None, help="只重建这些年份, 如 1991-2020 或 2022,2023")
+    parser.add_argument("--full", action="store_true", help="重建全部已结束年份(默认只补建缺失年份)")
+    parser.add_argument("--first-year", type=int, default=None, help="最早纳入的年份, 默认读取 CLIMATOLOGY_FIRST_YEAR")
+    parser.add_argument("--sqlite", default=None, help="直接指定本地替身库路径, 不读取 .env")
+    args = parser.parse_args()
+    if args.sqlite and args.first_year is None:
+        args.first_year = ClimatologyConfig.first_year
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
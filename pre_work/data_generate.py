@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : data_generate.py
+# @Description: 生成可复现(按 seed)的宜春市合成气象数据，写入本地替身库(SQLite)，用于压测/基准测试
+#   日表 automatic_station_his_day_data_YYYY: 每站每天一行
+#   小时表 automatic_station_data: 每站每小时一行，由同一天的日表状态展开，日/小时数据相互一致
+# 用法(在仓库根目录):
+#   PYTHONPATH=. python pre_work/data_generate.py --db data/local/a2w_weather.db --years 2015-2024 \
+#       --hour-years 2023-2024 --stations-per-county 20 --workers 8 --seed 42
+#   之后以 DB_BACKEND=sqlite LOCAL_DB_PATH=data/local/a2w_weather.db 启动服务
+# 并行方式: 按 年份 x 站点分组 切分任务，每个任务在子进程中写入独立的分片库(无写锁竞争)，
+#   主进程用 ATTACH + INSERT ... SELECT 合并，最后统一建索引；随机流按 站点-年份 播种，结果与并行度无关。
+#   分组是连续的站点段，分片按 年份、分组 的提交顺序合并，表中行的物理顺序(年份 -> 站点 -> 时间)也与 --workers 无关
+import argparse
+import datetime
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from a2w.api.middleware.db.local_connector import (
+    DAY_TABLE_COLUMNS, HOUR_TABLE_NAME, bulk_insert, create_indexes, create_schema, day_table_name, table_columns,
+)
+
+CITY = "宜春市"
+# 区县 -> (站点名前缀, 海拔偏移 m)
+COUNTIES: Dict[str, Tuple[str, int]] = {
+    "袁州区": ("袁州", 130),
+    "樟树市": ("樟树", 30),
+    "丰城市": ("丰城", 30),
+    "高安市": ("高安", 50),
+    "奉新县": ("奉新", 80),
+    "万载县": ("万载", 150),
+    "上高县": ("上高", 70),
+    "宜丰县": ("宜丰", 120),
+    "靖安县": ("靖安", 110),
+    "铜鼓县": ("铜鼓", 300),
+}
+
+VISIBILITY_SENTINEL = 999999
+WIND_DIRECTIONS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+# 各月降水日概率 / 雨日平均降水量(mm) / 平均相对湿度(%)，参考宜春亚热带季风气候(4-6 月为主汛期)
+RAIN_PROB = [0.40, 0.48, 0.58, 0.60, 0.62, 0.58, 0.40, 0.40, 0.30, 0.28, 0.33, 0.33]
+RAIN_MEAN = [5.0, 7.0, 9.0, 11.0, 14.0, 17.0, 12.0, 10.0, 8.0, 7.0, 6.0, 5.0]
+RHU_MEAN = [80, 81, 82, 81, 80, 82, 76, 77, 76, 74, 77, 76]
+BATCH_SIZE = 50000
+DIURNAL = [math.cos(2 * math.pi * (hour - 15) / 24) for hour in range(24)]  # 15 时最高、3 时最低
+
+
+@dataclass(frozen=True)
+class Station:
+    name: str
+    cnty: str
+    elevation: int
+
+
+@dataclass
+class DayState:
+    """一站一天的天气状态，日表行和小时表行都由它导出"""
+    date: datetime.date
+    tem_avg: float
+    tem_amp: float
+    rain: float
+    rain_hours: List[int]
+    wind_avg: float
+    wind_max: float
+    wind_gust: float
+    wind_dir: str
+    rhu_avg: float
+    prs_sea: float
+    prs_station: float
+    vis_min: float
+    cloud: float
+    fog: bool
+    snow: bool
+    thunder: bool
+    hail: bool
+    glaze: bool
+
+
+def build_stations(stations_per_county: int) -> List[Station]:
+    stations = []
+    for cnty, (prefix, elevation) in COUNTIES.items():
+        for i in range(stations_per_county):
+            # 第一个站为国家站(用区县简称命名)，其余为区域自动站
+            name = prefix if i == 0 else f"{prefix}{i:03d}"
+            stations.append(Station(name=name, cnty=cnty, elevation=elevation + 15 * (i % 7)))
+    return stations
+
+
+def climatological_temp(day_of_year: int) -> float:
+    """宜春年均温约 17.5℃，1 月中旬最冷(约 6℃)，7 月中旬最热(约 29℃)"""
+    return 17.5 - 11.5 * math.cos(2 * math.pi * (day_of_year - 15) / 365.25)
+
+
+def maybe_null(rng: random.Random, value, null_rate: float):
+    return None if rng.random() < null_rate else value
+
+
+def simulate_days(station: Station, year: int, seed: int) -> Iterator[DayState]:
+    # 每个 站点-年份 独立的随机流: 结果与进程调度、生成顺序无关
+    rng = random.Random(f"{seed}-{year}-{station.name}")
+    station_offset = random.Random(f"{seed}-{station.name}").gauss(0, 0.6) - station.elevation * 0.0065
+    anomaly, prs_anomaly = rng.gauss(0, 2), 0.0
+    day = datetime.date(year, 1, 1)
+    while day.year == year:
+        doy, month = day.timetuple().tm_yday, day.month
+        anomaly = 0.75 * anomaly + rng.gauss(0, 1.8)
+        prs_anomaly = 0.8 * prs_anomaly + rng.gauss(0, 2.0)
+        rainy = rng.random() < RAIN_PROB[month - 1]
+        rain = round(rng.gammavariate(0.7, RAIN_MEAN[month - 1] / 0.7), 1) if rainy else 0.0
+        tem_avg = climatological_temp(doy) + station_offset + anomaly - (1.5 if rain > 10 else 0.0)
+        tem_amp = max(1.5, rng.gauss(4.5, 1.2) - (2.0 if rainy else 0.0))
+        rhu_avg = min(99.0, max(30.0, rng.gauss(RHU_MEAN[month - 1] + (8 if rainy else -3), 6)))
+        wind_avg = max(0.2, rng.lognormvariate(0.5, 0.4))
+        strong = rng.random() < (0.04 if month in (3, 4, 5, 6, 7) else 0.015)  # 强对流/冷空气大风
+        wind_max = wind_avg * rng.uniform(1.8, 2.6) + (rng.uniform(6, 14) if strong else 0.0)
+        prs_sea = 1013.0 + 9.0 * math.cos(2 * math.pi * (doy - 15) / 365.25) + prs_anomaly
+        fog = rhu_avg > 88 and tem_amp < 4 and month in (11, 12, 1, 2, 3) and rng.random() < 0.6
+        vis_min = rng.uniform(50, 900) if fog else rng.lognormvariate(math.log(9000), 0.5)
+        if rng.random() < 0.02:
+            vis_min = VISIBILITY_SENTINEL
+        n_rain_hours = 0 if not rainy else min(24, max(1, int(rng.gauss(rain / 1.5 + 2, 2))))
+        yield DayState(
+            date=day,
+            tem_avg=tem_avg,
+            tem_amp=tem_amp,
+            rain=rain,
+            rain_hours=sorted(rng.sample(range(24), n_rain_hours)),
+            wind_avg=wind_avg,
+            wind_max=wind_max,
+            wind_gust=wind_max * rng.uniform(1.3, 1.7),
+            wind_dir=rng.choice(WIND_DIRECTIONS),
+            rhu_avg=rhu_avg,
+            prs_sea=prs_sea,
+            prs_station=prs_sea - station.elevation / 8.3,
+            vis_min=vis_min,
+            cloud=min(100.0, max(0.0, rng.gauss(80 if rainy else 45, 20))),
+            fog=fog,
+            snow=rainy and tem_avg < 1.5,
+            thunder=rainy and month in (4, 5, 6, 7, 8) and rain > 8 and rng.random() < 0.5,
+            hail=strong and rainy and rng.random() < 0.1,
+            glaze=rainy and tem_avg < 0 and rng.random() < 0.3,
+        )
+        day += datetime.timedelta(days=1)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+def day_row(station: Station, state: DayState, rng: random.Random, null_rate: float) -> Tuple:
+    date_str = state.date.isoformat()
+    at = lambda hour: f"{date_str} {hour:02d}:{rng.randint(0, 59):02d}:00"
+    rain_0820 = round(state.rain * rng.uniform(0.3, 0.7), 1)
+    pre_max_1h = round(state.rain / max(1, len(state.rain_hours)) * rng.uniform(1.0, 2.5), 1) if state.rain else 0.0
+    n = lambda v: maybe_null(rng, _round(v), null_rate)
+    values = {
+        "station_name": station.name, "city": CITY, "cnty": station.cnty,
+        "observation_time": f"{date_str} 00:00:00", "year": state.date.year,
+        "tem_avg": n(state.tem_avg), "tem_max": n(state.tem_avg + state.tem_amp), "tem_min": n(state.tem_avg - state.tem_amp),
+        "tem_max_otime": at(14), "tem_min_otime": at(5),
+        "rain": n(state.rain), "pre_max_1h": n(pre_max_1h),
+        "pre_max_1h_otime": at(state.rain_hours[0]) if state.rain_hours else None,
+        "pre_time_2008": n(state.rain - rain_0820), "pre_time_0820": n(rain_0820),
+        "pre_time_2020": n(state.rain), "pre_time_0808": n(state.rain * rng.uniform(0.8, 1.2)),
+        "win_s_max": n(state.wind_max), "win_s_max_otime": at(rng.randint(10, 18)),
+        "win_s_inst_max": n(state.wind_gust), "win_s_inst_max_otime": at(rng.randint(10, 18)),
+        "win_s_2mi_avg": n(state.wind_avg), "win_s_10mi_avg": n(state.wind_avg * rng.uniform(0.9, 1.1)),
+        "win_d_s_max": n(WIND_DIRECTIONS.index(state.wind_dir) * 22.5), "win_d_inst_max": n(rng.uniform(0, 360)),
+        "win_d_avg_2mi_c": state.wind_dir,
+        "vis_min": state.vis_min if state.vis_min == VISIBILITY_SENTINEL else n(state.vis_min),
+        "vis_min_otime": at(6 if state.fog else rng.randint(0, 23)),
+        "rhu_avg": n(state.rhu_avg), "rhu_min": n(max(15.0, state.rhu_avg - rng.uniform(10, 30))), "rhu_min_otime": at(14),
+        "prs_avg": n(state.prs_station), "prs_max": n(state.prs_station + rng.uniform(1, 4)), "prs_max_otime": at(10),
+        "prs_min": n(state.prs_station - rng.uniform(1, 4)), "prs_min_otime": at(16),
+        "prs_sea_avg": n(state.prs_sea),
+        "clo_cov_avg": n(state.cloud), "clo_cov_low_avg": n(state.cloud * rng.uniform(0.3, 0.8)),
+        "gst_avg": n(state.tem_avg + 1.5), "gst_max": n(state.tem_avg + state.tem_amp * 2.5), "gst_min": n(state.tem_avg - state.tem_amp),
+        "fog": "雾" if state.fog else "", "snow": "雪" if state.snow else "", "hail": "冰雹" if state.hail else "",
+        "thunder": "雷暴" if state.thunder else "", "glaze": "雨凇" if state.glaze else "",
+    }
+    return tuple(values[name] for name, _ in DAY_TABLE_COLUMNS)
+
+
+def hour_rows(station: Station, state: DayState, rng: random.Random, null_rate: float) -> Iterator[Tuple]:
+    date_str = state.date.isoformat()
+    rain_hours = state.rain_hours
+    weights = [rng.random() + 0.2 for _ in rain_hours]
+    total_weight = sum(weights) or 1.0
+    rain_by_hour = {h: state.rain * w / total_weight for h, w in zip(rain_hours, weights)}
+    for hour, diurnal in enumerate(DIURNAL):
+        temperature = state.tem_avg + state.tem_amp * diurnal + rng.gauss(0, 0.3)
+        humidity = min(100.0, max(15.0, state.rhu_avg - 12 * diurnal + rng.gauss(0, 2)))
+        if state.fog and hour < 10:
+            visibility = state.vis_min * rng.uniform(1.0, 3.0)
+        else:
+            visibility = min(30000.0, state.vis_min * rng.uniform(2.0, 4.0)) if state.vis_min != VISIBILITY_SENTINEL else 10000.0
+        if rng.random() < 0.01:
+            visibility = VISIBILITY_SENTINEL
+        yield (
+            station.name, CITY, station.cnty, f"{date_str} {hour:02d}:00:00",
+            maybe_null(rng, round(temperature, 1), null_rate),
+            maybe_null(rng, round(state.prs_station + 1.2 * diurnal * -1 + rng.gauss(0, 0.3), 1), null_rate),
+            maybe_null(rng, round(state.prs_sea - 1.2 * diurnal + rng.gauss(0, 0.3), 1), null_rate),
+            maybe_null(rng, round(humidity, 1), null_rate),
+            maybe_null(rng, round(rain_by_hour.get(hour, 0.0), 1), null_rate),
+            maybe_null(rng, round(max(0.0, state.wind_avg * (1 + 0.4 * diurnal) + rng.gauss(0, 0.3)), 1), null_rate),
+            visibility if visibility == VISIBILITY_SENTINEL else maybe_null(rng, round(visibility), null_rate),
+        )
+
+
+def batched(rows: Iterator[Tuple], size: int) -> Iterator[List[Tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_shard(year: int, shard_path: str, stations: Sequence[Station], with_hourly: bool,
+                   seed: int, null_rate: float) -> Tuple[int, int, int]:
+    """子进程: 生成一个 年份 x 站点分组 的日表(以及可选的小时数据)写入独立分片库，返回 (年份, 日表行数, 小时表行数)"""
+    conn = sqlite3.connect(shard_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    create_schema(conn, [year], hour_table=with_hourly, indexes=False)
+    day_table = day_table_name(year)
+    day_count = hour_count = 0
+    day_batch: List[Tuple] = []
+
+    def hourly_rows_for(station: Station, states: List[DayState]) -> Iterator[Tuple]:
+        rng = random.Random(f"{seed}-{year}-{station.name}-hourly")
+        for state in states:
+            yield from hour_rows(station, state, rng, null_rate)
+
+    for station in stations:
+        rng = random.Random(f"{seed}-{year}-{station.name}-day")
+        states = list(simulate_days(station, year, seed))
+        day_batch.extend(day_row(station, state, rng, null_rate) for state in states)
+        if len(day_batch) >= BATCH_SIZE:
+            day_count += bulk_insert(conn, day_table, day_batch)
+            day_batch = []
+        if with_hourly:
+            for batch in batched(hourly_rows_for(station, states), BATCH_SIZE):
+                hour_count += bulk_insert(conn, HOUR_TABLE_NAME, batch)
+    if day_batch:
+        day_count += bulk_insert(conn, day_table, day_batch)
+    conn.close()
+    return year, day_count, hour_count
+
+
+def merge_shard(conn: sqlite3.Connection, shard_path: str, tables: Sequence[str]) -> None:
+    conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+    try:
+        with conn:
+            for table in tables:
+                columns = ", ".join(table_columns(table))
+                conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM shard.{table} ORDER BY rowid")
+    finally:
+        conn.execute("DETACH DATABASE shard")
+
+
+def parse_years(text: str) -> List[int]:
+    if not text:
+        return []
+    if "-" in text:
+        start, end = text.split("-", 1)
+        return list(range(int(start), int(end) + 1))
+    return [int(y) for y in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成宜春市合成气象数据到本地 SQLite 替身库")
+    parser.add_argument("--db", default="data/local/a2w_weather.db", help="本地库路径(与 LOCAL_DB_PATH 一致)")
+    parser.add_argument("--years", default="2015-2024", help="日表年份, 如 2015-2024 或 2023,2024")
+    parser.add_argument("--hour-years", default=None, help="生成小时表的年份, 默认为日表的最后一年")
+    parser.add_argument("--stations-per-county", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--null-rate", type=float, default=0.01, help="各数值列独立的缺测(NULL)比例")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--overwrite", action="store_true", help="删除已存在的库文件后重新生成")
+    args = parser.parse_args()
+
+    years = parse_years(args.years)
+    hour_years = set(parse_years(args.hour_years) if args.hour_years else years[-1:])
+    stations = build_stations(args.stations_per_county)
+    if args.overwrite and os.path.exists(args.db):
+        os.remove(args.db)
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    all_years = sorted(set(years) | hour_years)
+    tables = create_schema(conn, all_years, hour_table=bool(hour_years), indexes=False)
+
+    start = time.perf_counter()
+    total_day = total_hour = 0
+    # 小时数据是主要耗时，含小时表的年份切得更细，使单个小时年份也能用满所有 worker
+    groups = max(1, math.ceil(args.workers / len(all_years)))
+    with tempfile.TemporaryDirectory(prefix="a2w_shards_", dir=os.path.dirname(os.path.abspath(args.db))) as shard_dir:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {}
+            for year in all_years:
+                n_groups = max(groups, args.workers) if year in hour_years else groups
+                size = math.ceil(len(stations) / n_groups)
+                for i in range(n_groups):
+                    group = stations[i * size:(i + 1) * size]
+                    if not group:
+                        continue
+                    shard_path = os.path.join(shard_dir, f"{year}_{i}.db")
+                    future = pool.submit(generate_shard, year, shard_path, group, year in hour_years, args.seed, args.null_rate)
+                    futures[future] = shard_path
+            # 按提交顺序合并(先完成的分片等待前面的分片)，保证行顺序确定
+            for future, shard_path in futures.items():
+                year, day_count, hour_count = future.result()
+                shard_tables = [day_table_name(year)] + ([HOUR_TABLE_NAME] if year in hour_years else [])
+                merge_shard(conn, shard_path, shard_tables)
+                os.remove(shard_path)
+                total_day += day_count
+                total_hour += hour_count
+                print(f"[{year}] +{day_count:,} day rows, +{hour_count:,} hourly rows, "
+                      f"elapsed: {time.perf_counter() - start:.1f}s")
+
+    create_indexes(conn, tables)
+    conn.execute("ANALYZE")
+    conn.close()
+    elapsed = time.perf_counter() - start
+    print(f"done: {len(stations)} stations, {len(all_years)} years, {total_day:,} day rows, {total_hour:,} hourly rows "
+          f"in {elapsed:.1f}s ({(total_day + total_hour) / max(elapsed, 1e-9):,.0f} rows/s) -> {args.db}")
+
+
+if __name__ == "__main__":
+    main()
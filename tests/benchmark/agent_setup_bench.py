@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : agent_setup_bench.py
+# @Description: 对比每个请求的工作流/agent 构建开销: 旧方式每个请求新建 WeatherReportWorkflow 与各单环节 agent
+#   (编译 PECW 图、读取并解析模板 json)，新方式在启动时构建一次、请求直接取共享实例。
+#   不连接 LLM 和数据库:
+#   PYTHONPATH=. python tests/benchmark/agent_setup_bench.py --requests 50
+import argparse
+import statistics
+import time
+
+from langchain_openai import ChatOpenAI
+
+from a2w.configs.smw_config import SmwConfig
+from a2w.api.core.dependencies import ProductionWorkflowFactory
+from a2w.smw.executors import WeatherReportWorkflow
+from a2w.smw.agents import HistoryWeatherAgent, ForecastWeatherAgent, SuggestionAgent, SummaryAgent, BriefAgent
+
+
+def build_legacy_request(llm, config):
+    """旧的 create_* 行为: /smw/WeatherReport 新建整个工作流，单环节接口各自新建 agent 并编译各自的 PECW 图"""
+    workflow = WeatherReportWorkflow(llm=llm, db_connector=None, config=config)
+    agents = [workflow.history_agent, workflow.forecast_agent, workflow.suggestion_agent,
+              workflow.summary_agent, workflow.brief_agent]
+    for agent in agents:
+        _ = agent.pecw_agent
+    return workflow
+
+
+def build_shared_factory(llm, config) -> ProductionWorkflowFactory:
+    factory = ProductionWorkflowFactory.__new__(ProductionWorkflowFactory)
+    factory.llm_instance = llm
+    factory.db = None
+    factory.smw_config = config
+    factory.weather_report_workflow = None
+    factory.build_agents()
+    return factory
+
+
+def measure(fn, requests: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples), statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每请求工作流/agent 构建开销对比")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--classify-path", default="data/sm/weather_classification_results.json")
+    args = parser.parse_args()
+
+    config = SmwConfig()
+    config.set("smw_weather_classify_path", args.classify_path)
+    llm = ChatOpenAI(model="bench", api_key="bench", base_url="http://127.0.0.1:9/v1")
+
+    legacy = measure(lambda: build_legacy_request(llm, config), args.requests)
+
+    start = time.perf_counter()
+    factory = build_shared_factory(llm, config)
+    startup_ms = (time.perf_counter() - start) * 1000
+
+    def shared_request():
+        factory.create_weather_report_workflow()
+        factory.create_wr_history()
+        factory.create_wr_forecast()
+        factory.create_wr_suggest()
+        factory.create_wr_summary()
+        factory.create_wr_brief()
+    shared = measure(shared_request, args.requests)
+
+    print(f"per-request setup, {args.requests} requests (mean / median / max ms)")
+    print(f"  rebuild per request : {legacy[0]:8.2f} / {legacy[1]:8.2f} / {legacy[2]:8.2f}")
+    print(f"  shared instances    : {shared[0]:8.4f} / {shared[1]:8.4f} / {shared[2]:8.4f}  (one-off startup build {startup_ms:.2f} ms)")
+    assert isinstance(factory.create_wr_history(), HistoryWeatherAgent)
+    assert isinstance(factory.create_wr_forecast(), ForecastWeatherAgent)
+    assert isinstance(factory.create_wr_suggest(), SuggestionAgent)
+    assert isinstance(factory.create_wr_summary(), SummaryAgent)
+    assert isinstance(factory.create_wr_brief(), BriefAgent)
+    assert factory.create_weather_report_workflow() is factory.create_weather_report_workflow()
+
+
+if __name__ == "__main__":
+    main()
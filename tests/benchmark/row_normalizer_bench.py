@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : row_normalizer_bench.py
+# @Description: 对比小时表/日表结果集规整的旧实现(逐单元格列名判断)与编译列计划实现
+import datetime
+import gc
+import random
+import time
+from decimal import Decimal
+
+from a2w.api.middleware.db.row_normalizer import DAY_TABLE_NORMALIZER, HOUR_TABLE_NORMALIZER
+
+
+def legacy_hour_normalize(rows, description):
+    columns = [col[0] for col in description]
+    results = []
+    for row in rows:
+        record = {}
+        for col_name, value in zip(columns, row):
+            if col_name in ["日平均水平能见度", "平均水平能见度"] and value == 999999:
+                record[col_name] = 10000
+            elif value is None:
+                if "降水" in col_name:
+                    record[col_name] = 0.0
+                elif "温度" in col_name:
+                    record[col_name] = 0.0
+                elif "风速" in col_name:
+                    record[col_name] = 0.0
+                elif "能见度" in col_name:
+                    record[col_name] = 10000
+                elif "湿度" in col_name:
+                    record[col_name] = None
+                else:
+                    record[col_name] = None
+            elif isinstance(value, Decimal):
+                record[col_name] = float(value)
+            elif isinstance(value, datetime.datetime):
+                record[col_name] = value.strftime("%Y-%m-%d %H:%M:%S")
+            elif isinstance(value, datetime.date):
+                record[col_name] = value.strftime("%Y-%m-%d")
+            else:
+                record[col_name] = value
+        results.append(record)
+    return results
+
+
+def legacy_day_normalize(rows, description, table_name):
+    columns = [col[0] for col in description]
+    results = []
+    for row in rows:
+        record = {}
+        for col_name, value in zip(columns, row):
+            if col_name in ["min_visibility", "vis_min"] and value == 999999:
+                record[col_name] = 10000
+            elif value is None:
+                if any(keyword in col_name for keyword in ["precip", "rain", "prcp"]):
+                    record[col_name] = 0.0
+                elif "temp" in col_name or "tem" in col_name:
+                    record[col_name] = 0.0 if "_time" not in col_name else None
+                elif "wind" in col_name or "win" in col_name:
+                    record[col_name] = 0.0 if "_time" not in col_name else None
+                elif "visibility" in col_name or "vis" in col_name:
+                    record[col_name] = 10000 if "_time" not in col_name else None
+                else:
+                    record[col_name] = None
+            elif isinstance(value, Decimal):
+                record[col_name] = float(value)
+            elif isinstance(value, datetime.datetime):
+                record[col_name] = value.strftime("%Y-%m-%d %H:%M:%S")
+            elif isinstance(value, datetime.date):
+                record[col_name] = value.strftime("%Y-%m-%d")
+            else:
+                record[col_name] = value
+        record["data_source"] = "day_table"
+        record["table_name"] = table_name
+        results.append(record)
+    return results
+
+
+def maybe_none(value, rng, ratio=0.05):
+    return None if rng.random() < ratio else value
+
+
+def make_hour_rows(n, rng):
+    description = [("站名", str), ("日期", datetime.date), ("时段", str), ("平均温度", Decimal), ("平均气压", Decimal),
+                   ("平均海平面气压", Decimal), ("平均相对湿度", Decimal), ("总降水量", Decimal),
+                   ("平均风速", Decimal), ("平均水平能见度", Decimal)]
+    base = datetime.date(2025, 1, 1)
+    rows = []
+    for i in range(n):
+        rows.append((
+            "袁州区",
+            base + datetime.timedelta(days=i % 365),
+            "上午" if i % 2 else "下午",
+            maybe_none(Decimal(f"{rng.uniform(-5, 38):.1f}"), rng),
+            maybe_none(Decimal(f"{rng.uniform(990, 1030):.1f}"), rng),
+            maybe_none(Decimal(f"{rng.uniform(995, 1035):.1f}"), rng),
+            maybe_none(Decimal(f"{rng.uniform(20, 100):.1f}"), rng),
+            maybe_none(Decimal(f"{rng.uniform(0, 30):.1f}"), rng, 0.3),
+            maybe_none(Decimal(f"{rng.uniform(0, 12):.1f}"), rng),
+            Decimal(999999) if rng.random() < 0.1 else maybe_none(Decimal(f"{rng.uniform(100, 30000):.1f}"), rng),
+        ))
+    return rows, description
+
+
+def make_day_rows(n, rng):
+    description = [("station_name", str), ("date", datetime.date), ("avg_temp", Decimal), ("min_temp", Decimal),
+                   ("max_temp", Decimal), ("min_temp_time", str), ("total_precip", Decimal),
+                   ("max_wind_speed", Decimal), ("min_visibility", int), ("avg_humidity", Decimal),
+                   ("weather_type", str)]
+    base = datetime.datetime(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        rows.append((
+            "宜春国家基准气候站",
+            (base + datetime.timedelta(days=i % 366)).date(),
+            maybe_none(Decimal(f"{rng.uniform(-5, 35):.1f}"), rng),
+            maybe_none(Decimal(f"{rng.uniform(-10, 25):.1f}"), rng),
+            maybe_none(Decimal(f"{rng.uniform(0, 40):.1f}"), rng),
+            maybe_none("0612", rng),
+            maybe_none(Decimal(f"{rng.uniform(0, 80):.1f}"), rng, 0.4),
+            maybe_none(Decimal(f"{rng.uniform(0, 20):.1f}"), rng),
+            999999 if rng.random() < 0.2 else maybe_none(rng.randint(50, 30000), rng),
+            maybe_none(Decimal(f"{rng.uniform(20, 100):.1f}"), rng),
+            "一般",
+        ))
+    return rows, description
+
+
+def timeit(fn, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(n_rows: int = 200_000):
+    rng = random.Random(42)
+
+    rows, description = make_hour_rows(n_rows, rng)
+    legacy_t, legacy = timeit(lambda: legacy_hour_normalize(rows, description))
+    new_t, new = timeit(lambda: HOUR_TABLE_NORMALIZER.normalize(rows, description))
+    assert legacy == new, "hour table normalization mismatch"
+    print(f"hour table {n_rows} rows: legacy {legacy_t:.3f}s -> column plan {new_t:.3f}s  (x{legacy_t / new_t:.2f})")
+
+    rows, description = make_day_rows(n_rows, rng)
+    table_name = "automatic_station_his_day_data_2024"
+    legacy_t, legacy = timeit(lambda: legacy_day_normalize(rows, description, table_name))
+    new_t, new = timeit(lambda: DAY_TABLE_NORMALIZER.normalize(
+        rows, description, extra={"data_source": "day_table", "table_name": table_name}))
+    assert legacy == new, "day table normalization mismatch"
+    print(f"day table  {n_rows} rows: legacy {legacy_t:.3f}s -> column plan {new_t:.3f}s  (x{legacy_t / new_t:.2f})")
+
+
+if __name__ == "__main__":
+    main()
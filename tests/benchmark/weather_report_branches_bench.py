@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : weather_report_branches_bench.py
+# @Description: 对比呈阅件工作流 forecast/history 串行与并行分支的端到端耗时
+#   各 agent 用固定延迟的替身代替(不需要 LLM 和数据库)，延迟比例参考线上一次呈阅件各环节的耗时:
+#   PYTHONPATH=. python tests/benchmark/weather_report_branches_bench.py --scale 0.1
+import argparse
+import asyncio
+import time
+
+from a2w.smw.agents.state import WeatherReportState
+from a2w.smw.executors.weather_report_executor import WeatherReportWorkflow
+from a2w.utils.logger import setup_logger
+
+# 各环节的典型耗时(秒): history 含 PECW 规划 + SQL + LLM 生成，是最慢的一环
+STAGE_SECONDS = {
+    "forecast": 40.0,
+    "history": 75.0,
+    "suggestion": 20.0,
+    "summary": 15.0,
+    "final_brief": 8.0,
+}
+
+
+class FakeAgent:
+    def __init__(self, key: str, seconds: float):
+        self.key = key
+        self.seconds = seconds
+
+    async def run(self, state: WeatherReportState) -> WeatherReportState:
+        await asyncio.sleep(self.seconds)
+        state[self.key]["response"] = f"{self.key} done"
+        state[self.key]["upstream"] = sorted(k for k in ("forecast", "history", "suggestion", "summary")
+                                             if state.get(k, {}).get("response"))
+        return state
+
+
+class FakeDB:
+    async def query_weather_metrics(self, regions, start_date, end_date):
+        return []
+
+
+def build_workflow(parallel: bool, scale: float) -> WeatherReportWorkflow:
+    workflow = WeatherReportWorkflow.__new__(WeatherReportWorkflow)
+    workflow.db = FakeDB()
+    workflow.logger = setup_logger(name="WeatherReportBranchesBench")
+    workflow.forecast_agent = FakeAgent("forecast", STAGE_SECONDS["forecast"] * scale)
+    workflow.history_agent = FakeAgent("history", STAGE_SECONDS["history"] * scale)
+    workflow.suggestion_agent = FakeAgent("suggestion", STAGE_SECONDS["suggestion"] * scale)
+    workflow.summary_agent = FakeAgent("summary", STAGE_SECONDS["summary"] * scale)
+    workflow.brief_agent = FakeAgent("final_brief", STAGE_SECONDS["final_brief"] * scale)
+    workflow.parallel_branches = parallel
+    workflow.graph = workflow._build_graph()
+    return workflow
+
+
+def init_state() -> WeatherReportState:
+    return WeatherReportState(
+        task_type="气象呈阅件", start_date="2024-07-01", end_date="2024-07-10", station_names=["袁州区"],
+        init_weather_data=[], history={}, forecast={}, suggestion={}, summary={}, final_brief={},
+        error=None, tasks_completed={}
+    )
+
+
+async def run_once(parallel: bool, scale: float):
+    workflow = build_workflow(parallel, scale)
+    start = time.perf_counter()
+    final_state = await workflow.graph.ainvoke(init_state())
+    return time.perf_counter() - start, final_state
+
+
+async def main(scale: float, rounds: int):
+    timings = {}
+    states = {}
+    for parallel in (False, True):
+        samples = []
+        for _ in range(rounds):
+            elapsed, states[parallel] = await run_once(parallel, scale)
+            samples.append(elapsed)
+        timings[parallel] = min(samples)
+
+    sections = ["forecast", "history", "suggestion", "summary", "final_brief"]
+    for key in sections:
+        assert states[True][key].get("response") == states[False][key].get("response"), key
+    # 依赖关系不变: suggestion 之后的环节仍能看到 forecast 的结果
+    assert "forecast" in states[True]["suggestion"]["upstream"]
+
+    expected_serial = sum(STAGE_SECONDS.values()) * scale
+    expected_parallel = (max(STAGE_SECONDS["forecast"], STAGE_SECONDS["history"]) + STAGE_SECONDS["suggestion"]
+                         + STAGE_SECONDS["summary"] + STAGE_SECONDS["final_brief"]) * scale
+    print(f"serial   : {timings[False]:.2f}s (stages sum {expected_serial:.2f}s)")
+    print(f"parallel : {timings[True]:.2f}s (critical path {expected_parallel:.2f}s)")
+    print(f"speedup  : {timings[False] / timings[True]:.2f}x, saved {timings[False] - timings[True]:.2f}s per report")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="呈阅件工作流串行/并行分支耗时对比")
+    parser.add_argument("--scale", type=float, default=0.02, help="按比例缩放各环节耗时, 1.0 为线上典型耗时")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.scale, args.rounds))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : recovery_concurrency.py
+# @Description: 验证 PECW 恢复流程不阻塞事件循环: 一份报告在 PECWAgent 的 recovery_action 节点中等待 LLM 时，
+#   同一事件循环上的其他请求(这里用周期性的短请求模拟)仍能按时得到响应。
+#   单次调用恢复(single_call=True)和 可解判断 + 生成重试 两次调用(single_call=False)两种模式都走真实的节点与 RecoveryMechanism；
+#   对照组的 LLM 在协程里同步等待(相当于旧实现的 chain.invoke)。
+#   LLM 用固定延迟的假模型代替，工具执行用假执行器代替，不需要真实的模型服务和数据库:
+#   PYTHONPATH=. python tests/smw/recovery_concurrency.py
+import asyncio
+import json
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from a2w.smw.funcalls import TOOLS
+from a2w.smw.agents.pecw.data_planner import QueryPlan, SubQuery
+from a2w.smw.agents.pecw.pecw_workflow import PECWAgent, AgentState
+from a2w.smw.agents.pecw.recovery_mechanism import RecoveryOutput, RecoveryAction
+from a2w.smw.agents.pecw.tool_executor import ExecutionResult
+
+LLM_LATENCY = 1.0      # 每次 LLM 调用的模拟耗时(秒)
+TICK_INTERVAL = 0.02   # 模拟的其他请求的发起间隔(秒)
+MAX_ALLOWED_DELAY = 0.2
+FAILED_QUERIES = 3     # 同一轮恢复的失败子查询数
+
+
+class Config:
+    def __init__(self, single_call: bool):
+        self.values = {"pecw_single_call_recovery": single_call, "pecw_rule_repair": False}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+def retry_sub_query(cities) -> dict:
+    return {
+        "tool": "query_precipitation_data",
+        "params": {"start_date": "2024-07-01", "end_date": "2024-07-31", "cities": cities, "aggregation": "total"},
+    }
+
+
+def answer(prompt_value) -> AIMessage:
+    """按提示词类型(系统提示中各自特有的段落)给出回答: 可解判断回答 YES，重试/单次恢复返回把城市名修正后的子查询"""
+    system = prompt_value.to_messages()[0].content
+    if "## 判定原则" in system:
+        return AIMessage(content="YES")
+    fixed = retry_sub_query(["袁州区"])
+    if '"solvable"' in system:
+        fixed = {"solvable": True, **fixed}
+    return AIMessage(content=json.dumps(fixed, ensure_ascii=False))
+
+
+def build_fake_llm(blocking: bool):
+    """blocking=True 时在协程中用 time.sleep 等待，模拟在事件循环上同步调用阻塞式 HTTP 客户端"""
+    def invoke(prompt_value):
+        time.sleep(LLM_LATENCY)
+        return answer(prompt_value)
+
+    async def ainvoke(prompt_value):
+        if blocking:
+            time.sleep(LLM_LATENCY)
+        else:
+            await asyncio.sleep(LLM_LATENCY)
+        return answer(prompt_value)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+class FakeToolExecutor:
+    """重新执行修复后的子查询: 城市名正确时返回数据"""
+    async def execute(self, sub_query: dict) -> ExecutionResult:
+        await asyncio.sleep(0.01)
+        ok = sub_query["params"].get("cities") == ["袁州区"]
+        return ExecutionResult(query_id=sub_query["id"], status="success" if ok else "failed",
+                               exe_data_result=[{"total_precip": 123.4}] if ok else None)
+
+
+def build_state() -> AgentState:
+    sub_queries, results, queue = [], [], []
+    for i in range(FAILED_QUERIES):
+        query_id = f"q{i}"
+        query_information = {
+            "id": query_id,
+            "purpose": "获取袁州区7月累计降水量",
+            **retry_sub_query(["袁州州"]),
+            "expected_fields": ["total_precip"],
+        }
+        sub_queries.append(SubQuery(id=query_id, purpose=query_information["purpose"], tool=query_information["tool"],
+                                    params=query_information["params"], expected_fields=["total_precip"]))
+        results.append(ExecutionResult(query_id=query_id, status="success", exe_data_result=[]))
+        queue.append(RecoveryOutput(query_id=query_id, error_information="no data", query_information=query_information,
+                                    action=RecoveryAction.RETRY, reason="工具执行成功，但得到的数据结果为空"))
+    plan = QueryPlan(meta={"start_date": "2024-07-01", "end_date": "2024-07-31", "cities": ["袁州区"],
+                           "weather_types": ["降水"]}, sub_queries=sub_queries, llm_response_meta={})
+    return AgentState(user_query={}, template="", plan_template="", query_plan=plan,
+                      execution_results=results, recovery_queue=queue, queue_state="have")
+
+
+async def other_requests(stop: asyncio.Event) -> dict:
+    """周期性发起的短请求，记录每次实际被调度的延迟"""
+    delays = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_INTERVAL)
+        delays.append(time.perf_counter() - start - TICK_INTERVAL)
+    return {"served": len(delays), "max_delay": max(delays) if delays else 0.0}
+
+
+async def measure(single_call: bool, blocking: bool) -> dict:
+    agent = PECWAgent(llm=build_fake_llm(blocking), tool_registry={tool.name: tool for tool in TOOLS},
+                      config=Config(single_call))
+    agent.tool_executor = FakeToolExecutor()
+    state = build_state()
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(other_requests(stop))
+    await asyncio.sleep(TICK_INTERVAL * 2)
+    start = time.perf_counter()
+    update = await agent._recovery_action_node(state)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    stats = await ticker
+    assert update["queue_state"] == "no", update["recovery_queue"]
+    assert all(sq.params["cities"] == ["袁州区"] for sq in update["query_plan"].sub_queries), update["query_plan"]
+    assert all(r.status == "success" for r in update["execution_results"]), update["execution_results"]
+    stats["recovery_seconds"] = elapsed
+    return stats
+
+
+async def main():
+    failures = []
+    for single_call in (True, False):
+        calls = FAILED_QUERIES * (1 if single_call else 2)
+        mode = "single call" if single_call else "solve + retry"
+        for blocking in (True, False):
+            stats = await measure(single_call, blocking)
+            name = f"{mode}, {'blocking llm' if blocking else 'ainvoke'}"
+            print(f"{name:<28} {calls} llm calls, recovery {stats['recovery_seconds']:.2f}s, "
+                  f"other requests served {stats['served']:>4}, max scheduling delay {stats['max_delay'] * 1000:.0f}ms")
+            if blocking and stats["max_delay"] < LLM_LATENCY * 0.9:
+                failures.append(f"{name}: expected the blocking baseline to block the event loop")
+            if not blocking and stats["max_delay"] >= MAX_ALLOWED_DELAY:
+                failures.append(f"{name}: event loop blocked for {stats['max_delay']:.2f}s during recovery")
+    assert not failures, "\n".join(failures)
+    print("OK: other requests keep being served while a report is in recovery")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())